@@ -1,9 +1,14 @@
 """Flask Web - Esteira Geo com Mapa Interativo"""
-from flask import Flask, render_template, jsonify
+from flask import Flask, Response, render_template, jsonify, make_response, request, stream_with_context
 import psycopg2
 from psycopg2.extras import RealDictCursor
+import functools
 import json
+import math
 import os
+import threading
+import time
+from collections import OrderedDict, deque
 from datetime import datetime
 import logging
 
@@ -14,6 +19,13 @@ try:
 except ImportError:
     HAS_FOLIUM = False
 
+try:
+    import numpy as np
+    import shapely
+    HAS_SHAPELY = True
+except ImportError:
+    HAS_SHAPELY = False
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -26,42 +38,580 @@ DB_CONFIG = {
     'password': os.getenv('RDS_PASSWORD', 'esteira_local_2025')
 }
 
+# Pool de conexões
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+DB_POOL_IDLE_CHECK = float(os.getenv('DB_POOL_IDLE_CHECK', 30))
+
+# Linhas por lote do cursor server-side em /api/geojson
+GEOJSON_FETCH_SIZE = int(os.getenv('GEOJSON_FETCH_SIZE', 2000))
+
+# Versão do dataset (último run_id de pipeline_runs), consultada no máximo a cada TTL
+DATASET_VERSION_TTL = float(os.getenv('DATASET_VERSION_TTL', 5))
+
+# /map: 'cluster' (FastMarkerCluster) ou 'markers' (um marcador por cidadão, legado)
+MAP_RENDER_MODE = os.getenv('MAP_RENDER_MODE', 'cluster')
+
+# Vector tiles
+TILE_CACHE_SIZE = int(os.getenv('TILE_CACHE_SIZE', 4096))
+
+# Cache de respostas (/, /api/stats, /api/geojson) por versão do dataset: no máximo
+# RESPONSE_CACHE_SIZE entradas, cada uma até RESPONSE_CACHE_MAX_BYTES e, somadas,
+# até RESPONSE_CACHE_TOTAL_BYTES (teto de memória do cache por processo)
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 64))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+RESPONSE_CACHE_TOTAL_BYTES = int(os.getenv('RESPONSE_CACHE_TOTAL_BYTES', 128 * 1024 * 1024))
+TILE_MAX_ZOOM = int(os.getenv('TILE_MAX_ZOOM', 22))
+# Abaixo deste zoom, cidadãos no mesmo bloco de 16x16 px do tile viram um ponto agregado
+TILE_CLUSTER_MAX_ZOOM = int(os.getenv('TILE_CLUSTER_MAX_ZOOM', 14))
+
+# /api/lookup: máximo de pontos por requisição em lote
+LOOKUP_MAX_POINTS = int(os.getenv('LOOKUP_MAX_POINTS', 10000))
+
+
+class PoolTimeout(Exception):
+    """Nenhuma conexão livre dentro do timeout de checkout"""
+
+
+class ConnectionPool:
+    """
+    Pool de conexões psycopg2 limitado e thread-safe
+
+    - no máximo `maxconn` conexões abertas; checkout espera até `timeout`
+    - conexões ociosas há mais de `idle_check` segundos são validadas com
+      SELECT 1 antes de serem entregues (descartadas se o banco caiu)
+    - devolução faz rollback, então nenhuma conexão volta "idle in transaction"
+    """
+
+    def __init__(self, maxconn, timeout, idle_check, **conn_kwargs):
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.idle_check = idle_check
+        self.conn_kwargs = conn_kwargs
+        self._idle = deque()
+        self._in_use = set()
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0, 'waits': 0, 'timeouts': 0, 'discarded': 0,
+            'wait_time_total': 0.0, 'wait_time_max': 0.0,
+        }
+
+    def _connect(self):
+        return psycopg2.connect(**self.conn_kwargs)
+
+    def _healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.idle_check:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats['discarded'] += 1
+            self._cond.notify()
+
+    def getconn(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        while True:
+            with self._cond:
+                while not self._idle and self._size >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(f"Sem conexão livre após {timeout:.1f}s")
+                    waited = True
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                else:
+                    conn, idle_since = None, None
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._healthy(conn, idle_since):
+                self._discard(conn)
+                continue
+
+            wait = time.monotonic() - started
+            with self._cond:
+                self._in_use.add(id(conn))
+                self._stats['checkouts'] += 1
+                if waited:
+                    self._stats['waits'] += 1
+                self._stats['wait_time_total'] += wait
+                self._stats['wait_time_max'] = max(self._stats['wait_time_max'], wait)
+            return conn
+
+    def putconn(self, conn):
+        with self._cond:
+            if id(conn) not in self._in_use:
+                return
+            self._in_use.discard(id(conn))
+
+        if conn.closed:
+            self._discard(conn)
+            return
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            checkouts = self._stats['checkouts']
+            return {
+                'size': self._size,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'max': self.maxconn,
+                'checkouts': checkouts,
+                'waits': self._stats['waits'],
+                'timeouts': self._stats['timeouts'],
+                'discarded': self._stats['discarded'],
+                'wait_time_avg_ms': round(1000 * self._stats['wait_time_total'] / checkouts, 3) if checkouts else 0.0,
+                'wait_time_max_ms': round(1000 * self._stats['wait_time_max'], 3),
+            }
+
+
+db_pool = ConnectionPool(DB_POOL_MAX, DB_POOL_TIMEOUT, DB_POOL_IDLE_CHECK, **DB_CONFIG)
+
+
 def get_db_connection():
+    """
+    Retira uma conexão do pool (None se o banco estiver offline)
+
+    Pool esgotado não é banco offline: PoolTimeout sobe e vira 503 com
+    Retry-After (pool_exhausted), sem marcar o banco como fora do ar.
+    """
     try:
-        return psycopg2.connect(**DB_CONFIG)
+        return db_pool.getconn()
+    except PoolTimeout:
+        raise
     except Exception as e:
         logger.error(f"Conexão falhou: {e}")
         return None
 
+
+def release_db_connection(conn):
+    """Devolve a conexão ao pool"""
+    if conn is not None:
+        db_pool.putconn(conn)
+
+
+@app.errorhandler(PoolTimeout)
+def pool_exhausted(e):
+    """Pool sem conexão livre dentro de DB_POOL_TIMEOUT: 503 temporário, com Retry-After"""
+    logger.warning(f"⚠ Pool de conexões esgotado: {e}")
+    response = jsonify({'error': 'Servidor ocupado, tente novamente', 'pool': db_pool.stats()})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(max(1, math.ceil(DB_POOL_TIMEOUT)))
+    return response
+
+_dataset_version = {'value': None, 'checked_at': 0.0}
+_dataset_version_lock = threading.Lock()
+
+
+def get_dataset_version():
+    """
+    Versão do dataset publicado: último run_id gravado pelo loader em pipeline_runs
+
+    Cacheada por DATASET_VERSION_TTL segundos para não custar uma consulta por
+    requisição. Retorna 0 se o loader ainda não rodou e None se o banco estiver offline.
+    """
+    now = time.monotonic()
+    with _dataset_version_lock:
+        if _dataset_version['value'] is not None and now - _dataset_version['checked_at'] < DATASET_VERSION_TTL:
+            return _dataset_version['value']
+    
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(MAX(run_id), 0) FROM pipeline_runs")
+            version = cursor.fetchone()[0]
+    except psycopg2.Error:
+        version = 0
+    finally:
+        release_db_connection(conn)
+    
+    with _dataset_version_lock:
+        _dataset_version.update(value=version, checked_at=now)
+    return version
+
+
+class VersionedCache:
+    """
+    Cache LRU em memória, esvaziado quando a versão do dataset muda
+
+    Versão None (banco offline) não esvazia nem consulta o cache: o conteúdo
+    da última versão conhecida fica intacto até o banco voltar. Com `max_bytes`
+    o total guardado também é limitado (tamanho de cada valor via `sizeof`);
+    valores maiores que o limite não entram.
+    """
+
+    def __init__(self, max_entries, max_bytes=None, sizeof=len):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, version, key):
+        if version is None:
+            return None
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self._bytes = 0
+                self.version = version
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, version, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if version is None or version != self.version:
+                return
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or \
+                    (self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._bytes -= self._entries.popitem(last=False)[1][1]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'version': self.version, 'entries': len(self._entries), 'max': self.max_entries,
+                'bytes': self._bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses,
+            }
+
+
+tile_cache = VersionedCache(TILE_CACHE_SIZE)
+# Valores: (corpo, mimetype)
+response_cache = VersionedCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TOTAL_BYTES, sizeof=lambda value: len(value[0]))
+
+
+def _cache_stream(chunks, version, key, mimetype):
+    """Repassa um stream e, se ele terminar inteiro e couber no limite, guarda no cache"""
+    body, size = [], 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        if body is not None:
+            body.append(chunk)
+            size += len(chunk)
+            if size > min(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TOTAL_BYTES):
+                body = None
+        yield chunk
+    if body is not None:
+        response_cache.put(version, key, (b''.join(body), mimetype))
+
+
+def versioned(cache=True):
+    """
+    Respostas condicionadas à versão do dataset
+
+    - ETag = versão (run_id); If-None-Match igual responde 304 sem tocar no banco
+    - cache=True guarda o corpo das respostas 200 em memória por versão
+      (streams são guardados ao terminar, até RESPONSE_CACHE_MAX_BYTES; o total
+      fica limitado a RESPONSE_CACHE_TOTAL_BYTES)
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            version = get_dataset_version()
+            if version is None:
+                return view(*args, **kwargs)
+            
+            etag = f"v{version}"
+            if etag in request.if_none_match:
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+            
+            key = request.full_path
+            cached = response_cache.get(version, key) if cache else None
+            if cached is not None:
+                response = Response(cached[0], mimetype=cached[1])
+                response.headers['X-Response-Cache'] = 'HIT'
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if cache:
+                    response.headers['X-Response-Cache'] = 'MISS'
+                    if response.is_streamed:
+                        response.response = _cache_stream(response.response, version, key, response.mimetype)
+                    else:
+                        response_cache.put(version, key, (response.get_data(), response.mimetype))
+            
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+MVT_SQL = """
+    WITH bounds AS (
+        SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS geom,
+               ST_Transform(ST_TileEnvelope(%(z)s, %(x)s, %(y)s), 4326) AS geom_4326
+    ),
+    areas AS (
+        SELECT ST_AsMVTGeom(ST_Transform(f.geometry, 3857), b.geom, 4096, 64, true) AS geom,
+               f.area_id, f.area_name, f.severity, f.flood_date::text AS flood_date
+        FROM flooding_areas f, bounds b
+        WHERE f.geometry && b.geom_4326
+    ),
+    citizens_px AS (
+        SELECT ST_SnapToGrid(ST_AsMVTGeom(ST_Transform(c.geometry, 3857), b.geom, 4096, 64, true), %(grid)s) AS geom,
+               c.citizen_id, c.name, c.affected_by_flooding
+        FROM citizens c, bounds b
+        WHERE c.geometry && b.geom_4326
+    ),
+    citizens_layer AS (
+        SELECT geom,
+               COUNT(*) AS citizens,
+               COUNT(*) FILTER (WHERE affected_by_flooding) AS affected,
+               MIN(citizen_id) AS citizen_id,
+               MIN(name) AS name
+        FROM citizens_px
+        WHERE geom IS NOT NULL
+        GROUP BY geom
+    )
+    SELECT COALESCE((SELECT ST_AsMVT(areas, 'flooding_areas', 4096, 'geom') FROM areas WHERE geom IS NOT NULL), ''::bytea)
+        || COALESCE((SELECT ST_AsMVT(citizens_layer, 'citizens', 4096, 'geom') FROM citizens_layer), ''::bytea)
+"""
+
+
+SUMMARY_STATS_SQL = """
+    SELECT 
+        run_id, run_date,
+        total_citizens,
+        affected_citizens as affected,
+        unaffected_citizens as unaffected,
+        ROUND(100.0 * affected_citizens / NULLIF(total_citizens, 0), 2) as affected_pct
+    FROM pipeline_runs
+    ORDER BY run_id DESC
+    LIMIT 1
+"""
+
+# Fallback para bancos carregados antes do resumo existir
+LIVE_STATS_SQL = """
+    SELECT 
+        NULL as run_id, NULL as run_date,
+        COUNT(*) as total_citizens,
+        COUNT(CASE WHEN affected_by_flooding THEN 1 END) as affected,
+        COUNT(CASE WHEN NOT affected_by_flooding THEN 1 END) as unaffected,
+        ROUND(100.0 * COUNT(CASE WHEN affected_by_flooding THEN 1 END) / NULLIF(COUNT(*), 0), 2) as affected_pct
+    FROM citizens
+"""
+
+
+def fetch_summary_stats(conn):
+    """
+    Totais da última carga, lidos do resumo gravado pelo loader (pipeline_runs)
+
+    Custo constante, independente do número de cidadãos; só agrega citizens
+    se o resumo ainda não existir.
+    """
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        cursor.execute(SUMMARY_STATS_SQL)
+        stats = cursor.fetchone()
+    except psycopg2.Error:
+        conn.rollback()
+        stats = None
+    if stats is None:
+        cursor.execute(LIVE_STATS_SQL)
+        stats = cursor.fetchone()
+    cursor.close()
+    return stats
+
+
 @app.route('/')
+@versioned()
 def index():
     conn = get_db_connection()
     if not conn:
         return render_template('index.html', error="Banco offline"), 500
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
     try:
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total,
-                COUNT(CASE WHEN affected_by_flooding THEN 1 END) as affected,
-                COUNT(CASE WHEN NOT affected_by_flooding THEN 1 END) as unaffected
-            FROM citizens
-        """)
-        stats = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        return render_template('index.html', stats=stats, last_update=datetime.now().isoformat())
+        stats = fetch_summary_stats(conn)
+        release_db_connection(conn)
+        last_update = (stats['run_date'] or datetime.now()).isoformat()
+        return render_template('index.html', stats=stats, last_update=last_update)
     except Exception as e:
-        cursor.close()
-        conn.close()
+        release_db_connection(conn)
         return render_template('index.html', error=str(e)), 500
 
+map_cache = {}
+_map_cache_lock = threading.Lock()
+
+# Marcador por ponto do FastMarkerCluster: row = [lat, lon, citizen_id]
+CLUSTER_MARKER_CALLBACK = """
+function (row) {{
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {{
+        radius: 6, color: '{color}', fillColor: '{color}', fillOpacity: 0.8, weight: 1
+    }});
+    marker.bindPopup('ID: ' + row[2] + '<br>Status: {status}');
+    return marker;
+}}
+"""
+
+
+def _add_citizen_markers(m, citizens):
+    """Um folium.Marker com popup por cidadão (modo legado 'markers')"""
+    # Grupo de cidadãos afetados
+    affected_group = folium.FeatureGroup(name='Cidadãos Afetados (Vermelho)', show=True)
+    unaffected_group = folium.FeatureGroup(name='Cidadãos Não Afetados (Azul)', show=True)
+    
+    # Adicionar cidadãos ao mapa
+    for citizen in citizens:
+        if citizen['lat'] and citizen['lon']:
+            color = 'red' if citizen['affected_by_flooding'] else 'blue'
+            icon = 'exclamation-triangle' if citizen['affected_by_flooding'] else 'info-sign'
+            
+            popup_text = f"""
+            <b>{citizen['name']}</b><br>
+            ID: {citizen['citizen_id']}<br>
+            Endereço: {citizen['address']}<br>
+            Telefone: {citizen['phone']}<br>
+            Status: {'🔴 AFETADO' if citizen['affected_by_flooding'] else '🟢 SEGURO'}
+            """
+            
+            marker = folium.Marker(
+                location=[citizen['lat'], citizen['lon']],
+                popup=folium.Popup(popup_text, max_width=300),
+                icon=folium.Icon(color=color, icon=icon, prefix='glyphicon')
+            )
+            
+            if citizen['affected_by_flooding']:
+                affected_group.add_child(marker)
+            else:
+                unaffected_group.add_child(marker)
+    
+    m.add_child(affected_group)
+    m.add_child(unaffected_group)
+
+
+def _add_citizen_clusters(m, citizens):
+    """
+    Clusters no cliente (FastMarkerCluster): coordenadas vão como array compacto
+    [lat, lon, citizen_id] e os marcadores são criados em JS
+    """
+    affected = [[row['lat'], row['lon'], row['citizen_id']] for row in citizens if row['affected_by_flooding']]
+    unaffected = [[row['lat'], row['lon'], row['citizen_id']] for row in citizens if not row['affected_by_flooding']]
+    
+    plugins.FastMarkerCluster(
+        affected,
+        callback=CLUSTER_MARKER_CALLBACK.format(color='#e53e3e', status='🔴 AFETADO'),
+        name='Cidadãos Afetados (Vermelho)'
+    ).add_to(m)
+    plugins.FastMarkerCluster(
+        unaffected,
+        callback=CLUSTER_MARKER_CALLBACK.format(color='#3182ce', status='🟢 SEGURO'),
+        name='Cidadãos Não Afetados (Azul)'
+    ).add_to(m)
+
+
+def _add_flood_areas(m, flood_areas):
+    """Polígonos das áreas de enchente"""
+    flood_group = folium.FeatureGroup(name='Áreas de Enchente (Verde)', show=True)
+    
+    for area in flood_areas:
+        if area['geometry']:
+            geom = json.loads(area['geometry'])
+            
+            popup_text = f"""
+            <b>{area['area_name']}</b><br>
+            Data: {area['flood_date']}<br>
+            Severidade: {area['severity']}
+            """
+            
+            # Adicionar polígono
+            folium.GeoJson(
+                geom,
+                style_function=lambda x: {
+                    'fillColor': 'green',
+                    'color': 'darkgreen',
+                    'weight': 2,
+                    'opacity': 0.7,
+                    'fillOpacity': 0.3
+                },
+                popup=folium.Popup(popup_text, max_width=300)
+            ).add_to(flood_group)
+    
+    m.add_child(flood_group)
+
+
 @app.route('/map')
+@versioned(cache=False)
 def map_view():
-    """Retorna um mapa interativo com Folium"""
+    """
+    Retorna um mapa interativo com Folium
+
+    ?mode=cluster (padrão: MAP_RENDER_MODE) agrupa os cidadãos no cliente;
+    ?mode=markers mantém um marcador com popup por cidadão.
+    O HTML gerado fica em cache por modo e versão do dataset.
+    """
     if not HAS_FOLIUM:
         return "Folium não instalado. Instale com: pip install folium", 501
     
+    mode = request.args.get('mode', MAP_RENDER_MODE)
+    if mode not in ('cluster', 'markers'):
+        return f"Modo de mapa inválido: {mode}", 400
+    
+    version = get_dataset_version()
+    with _map_cache_lock:
+        cached = map_cache.get(mode)
+    if cached and version is not None and cached[0] == version:
+        return cached[1]
+    
     conn = get_db_connection()
     if not conn:
         return "Banco de dados offline", 500
@@ -70,14 +620,25 @@ def map_view():
     
     try:
         # Buscar cidadãos com coordenadas
-        cursor.execute("""
-            SELECT 
-                citizen_id, name, address, phone,
-                ST_Y(geometry) as lat, ST_X(geometry) as lon,
-                affected_by_flooding
-            FROM citizens
-            ORDER BY citizen_id
-        """)
+        if mode == 'cluster':
+            cursor.execute("""
+                SELECT 
+                    citizen_id,
+                    ROUND(ST_Y(geometry)::numeric, 6)::float8 as lat,
+                    ROUND(ST_X(geometry)::numeric, 6)::float8 as lon,
+                    affected_by_flooding
+                FROM citizens
+                WHERE geometry IS NOT NULL
+            """)
+        else:
+            cursor.execute("""
+                SELECT 
+                    citizen_id, name, address, phone,
+                    ST_Y(geometry) as lat, ST_X(geometry) as lon,
+                    affected_by_flooding
+                FROM citizens
+                ORDER BY citizen_id
+            """)
         citizens = cursor.fetchall()
         
         # Buscar áreas de enchente (centroide para popup)
@@ -93,7 +654,7 @@ def map_view():
         flood_areas = cursor.fetchall()
         
         cursor.close()
-        conn.close()
+        release_db_connection(conn)
         
         # Centro do mapa (Porto Alegre)
         center_lat = -30.0277
@@ -106,190 +667,392 @@ def map_view():
             tiles='OpenStreetMap'
         )
         
-        # Grupo de cidadãos afetados
-        affected_group = folium.FeatureGroup(name='Cidadãos Afetados (Vermelho)', show=True)
-        unaffected_group = folium.FeatureGroup(name='Cidadãos Não Afetados (Azul)', show=True)
-        flood_group = folium.FeatureGroup(name='Áreas de Enchente (Verde)', show=True)
-        
-        # Adicionar cidadãos ao mapa
-        for citizen in citizens:
-            if citizen['lat'] and citizen['lon']:
-                color = 'red' if citizen['affected_by_flooding'] else 'blue'
-                icon = 'exclamation-triangle' if citizen['affected_by_flooding'] else 'info-sign'
-                
-                popup_text = f"""
-                <b>{citizen['name']}</b><br>
-                ID: {citizen['citizen_id']}<br>
-                Endereço: {citizen['address']}<br>
-                Telefone: {citizen['phone']}<br>
-                Status: {'🔴 AFETADO' if citizen['affected_by_flooding'] else '🟢 SEGURO'}
-                """
-                
-                marker = folium.Marker(
-                    location=[citizen['lat'], citizen['lon']],
-                    popup=folium.Popup(popup_text, max_width=300),
-                    icon=folium.Icon(color=color, icon=icon, prefix='glyphicon')
-                )
-                
-                if citizen['affected_by_flooding']:
-                    affected_group.add_child(marker)
-                else:
-                    unaffected_group.add_child(marker)
-        
-        # Adicionar áreas de enchente ao mapa
-        for area in flood_areas:
-            if area['geometry']:
-                geom = json.loads(area['geometry'])
-                
-                popup_text = f"""
-                <b>{area['area_name']}</b><br>
-                Data: {area['flood_date']}<br>
-                Severidade: {area['severity']}
-                """
-                
-                # Adicionar polígono
-                folium.GeoJson(
-                    geom,
-                    style_function=lambda x: {
-                        'fillColor': 'green',
-                        'color': 'darkgreen',
-                        'weight': 2,
-                        'opacity': 0.7,
-                        'fillOpacity': 0.3
-                    },
-                    popup=folium.Popup(popup_text, max_width=300)
-                ).add_to(flood_group)
-        
-        # Adicionar grupos ao mapa
-        m.add_child(affected_group)
-        m.add_child(unaffected_group)
-        m.add_child(flood_group)
+        if mode == 'cluster':
+            _add_citizen_clusters(m, citizens)
+        else:
+            _add_citizen_markers(m, citizens)
+        _add_flood_areas(m, flood_areas)
         
         # Adicionar layer control
         folium.LayerControl().add_to(m)
         
-        # Retornar HTML do mapa
-        return m._repr_html_()
+        # Página completa no modo cluster (sem iframe com data URI); legado mantém _repr_html_
+        html = m.get_root().render() if mode == 'cluster' else m._repr_html_()
+        
+        if version is not None:
+            with _map_cache_lock:
+                map_cache[mode] = (version, html)
+        return html
         
     except Exception as e:
         logger.error(f"Erro ao gerar mapa: {e}")
         cursor.close()
-        conn.close()
+        release_db_connection(conn)
         return f"Erro: {str(e)}", 500
 
+GEOJSON_FEATURES_SQL = """
+    SELECT json_build_object(
+        'type', 'Feature',
+        'properties', json_build_object(
+            'id', citizen_id,
+            'name', name,
+            'address', address,
+            'phone', phone,
+            'affected', affected_by_flooding,
+            'type', 'citizen'
+        ),
+        'geometry', ST_AsGeoJSON(geometry)::json
+    )::text
+    FROM (SELECT * FROM citizens WHERE geometry IS NOT NULL ORDER BY citizen_id) c
+    UNION ALL
+    SELECT json_build_object(
+        'type', 'Feature',
+        'properties', json_build_object(
+            'id', area_id,
+            'name', area_name,
+            'date', flood_date,
+            'severity', severity,
+            'type', 'flood_area'
+        ),
+        'geometry', ST_AsGeoJSON(geometry)::json
+    )::text
+    FROM flooding_areas
+    WHERE geometry IS NOT NULL
+"""
+
+
 @app.route('/api/geojson')
+@versioned()
 def api_geojson():
-    """Retorna todos os dados em formato GeoJSON"""
+    """
+    Retorna todos os dados em formato GeoJSON (streaming)
+
+    O PostGIS monta o JSON de cada feature; um cursor nomeado (server-side)
+    entrega lotes de GEOJSON_FETCH_SIZE linhas, escritos na resposta à medida
+    que chegam. Memória e tempo até o primeiro byte não dependem do tamanho
+    da tabela.
+    """
     conn = get_db_connection()
     if not conn:
         return jsonify({'error': 'Database offline'}), 500
     
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor = conn.cursor(name='api_geojson')
+    cursor.itersize = GEOJSON_FETCH_SIZE
     
     try:
-        # Cidadãos
-        cursor.execute("""
-            SELECT 
-                citizen_id, name, address, phone,
-                ST_AsGeoJSON(geometry) as geometry,
-                affected_by_flooding
-            FROM citizens
-            ORDER BY citizen_id
-        """)
-        
-        citizens = cursor.fetchall()
-        features = []
-        
-        for citizen in citizens:
-            if citizen['geometry']:
-                geom = json.loads(citizen['geometry'])
-                features.append({
-                    'type': 'Feature',
-                    'properties': {
-                        'id': citizen['citizen_id'],
-                        'name': citizen['name'],
-                        'address': citizen['address'],
-                        'phone': citizen['phone'],
-                        'affected': citizen['affected_by_flooding'],
-                        'type': 'citizen'
-                    },
-                    'geometry': geom
-                })
-        
-        # Áreas de enchente
-        cursor.execute("""
-            SELECT 
-                area_id, area_name, flood_date, severity,
-                ST_AsGeoJSON(geometry) as geometry
-            FROM flooding_areas
-        """)
-        
-        areas = cursor.fetchall()
-        
-        for area in areas:
-            if area['geometry']:
-                geom = json.loads(area['geometry'])
-                features.append({
-                    'type': 'Feature',
-                    'properties': {
-                        'id': area['area_id'],
-                        'name': area['area_name'],
-                        'date': area['flood_date'].isoformat() if area['flood_date'] else None,
-                        'severity': area['severity'],
-                        'type': 'flood_area'
-                    },
-                    'geometry': geom
-                })
-        
-        cursor.close()
-        conn.close()
-        
-        geojson = {
-            'type': 'FeatureCollection',
-            'features': features
-        }
-        
-        return jsonify(geojson)
-    
+        cursor.execute(GEOJSON_FEATURES_SQL)
     except Exception as e:
         logger.error(f"Erro na API GeoJSON: {e}")
-        cursor.close()
-        conn.close()
+        release_db_connection(conn)
         return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        try:
+            yield '{"type": "FeatureCollection", "features": ['
+            separator = ''
+            while True:
+                rows = cursor.fetchmany(GEOJSON_FETCH_SIZE)
+                if not rows:
+                    break
+                yield separator + ','.join(row[0] for row in rows)
+                separator = ','
+            yield ']}'
+        except Exception as e:
+            # Status já enviado: só resta abortar o stream (nunca fica em cache)
+            logger.error(f"Erro no streaming GeoJSON: {e}")
+            raise
+        finally:
+            try:
+                cursor.close()
+            except psycopg2.Error:
+                pass
+            release_db_connection(conn)
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 @app.route('/api/stats')
+@versioned()
 def api_stats():
-    """API: retorna estatísticas em JSON"""
+    """API: retorna estatísticas em JSON (resumos pré-calculados na carga)"""
     conn = get_db_connection()
     if not conn:
         return jsonify({'error': 'Database offline'}), 500
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
     try:
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_citizens,
-                COUNT(CASE WHEN affected_by_flooding THEN 1 END) as affected,
-                COUNT(CASE WHEN NOT affected_by_flooding THEN 1 END) as unaffected,
-                ROUND(100.0 * COUNT(CASE WHEN affected_by_flooding THEN 1 END) / NULLIF(COUNT(*), 0), 2) as affected_pct
-            FROM citizens
-        """)
-        stats = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        stats = fetch_summary_stats(conn)
+        stats['areas'] = []
+        stats['severity'] = {}
+        if stats['run_id'] is not None:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute("""
+                SELECT area_id, area_name, severity, citizens
+                FROM flood_area_stats
+                WHERE run_id = %s
+                ORDER BY area_id
+            """, (stats['run_id'],))
+            stats['areas'] = cursor.fetchall()
+            cursor.execute("""
+                SELECT severity, citizens
+                FROM severity_stats
+                WHERE run_id = %s
+            """, (stats['run_id'],))
+            stats['severity'] = {row['severity']: row['citizens'] for row in cursor.fetchall()}
+            cursor.close()
+        release_db_connection(conn)
         return jsonify(stats)
     except Exception as e:
-        cursor.close()
-        conn.close()
+        release_db_connection(conn)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/tiles/<int:z>/<int:x>/<int:y>.mvt')
+@versioned(cache=False)
+def vector_tile(z, x, y):
+    """
+    Mapbox Vector Tile (camadas flooding_areas e citizens) gerado com ST_AsMVT
+
+    Tiles ficam em um cache LRU em memória invalidado a cada nova carga do pipeline.
+    Em zooms baixos os cidadãos são agregados por bloco de pixels (propriedades
+    citizens/affected), mantendo o tamanho do tile limitado em escala estadual.
+    """
+    if not (0 <= z <= TILE_MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return jsonify({'error': 'Tile fora dos limites'}), 404
+    
+    version = get_dataset_version()
+    tile = tile_cache.get(version, (z, x, y))
+    cache_status = 'HIT'
+    
+    if tile is None:
+        cache_status = 'MISS'
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'error': 'Database offline'}), 500
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(MVT_SQL, {
+                    'z': z, 'x': x, 'y': y,
+                    'grid': 1 if z >= TILE_CLUSTER_MAX_ZOOM else 16,
+                })
+                tile = bytes(cursor.fetchone()[0])
+        except Exception as e:
+            logger.error(f"Erro ao gerar tile {z}/{x}/{y}: {e}")
+            return jsonify({'error': str(e)}), 500
+        finally:
+            release_db_connection(conn)
+        tile_cache.put(version, (z, x, y), tile)
+    
+    response = Response(tile, mimetype='application/vnd.mapbox-vector-tile')
+    response.headers['X-Tile-Cache'] = cache_status
+    return response
+
+FLOOD_AREA_INDEX_SQL = """
+    SELECT area_id, area_name, severity, flood_date, ST_AsBinary(geometry)
+    FROM flooding_areas
+    WHERE geometry IS NOT NULL
+    ORDER BY area_id
+"""
+
+
+class FloodAreaIndex:
+    """
+    STRtree em memória dos polígonos de flooding_areas
+
+    Reconstruído só quando a versão do dataset muda; entre cargas as consultas
+    ponto-em-polígono não tocam no PostGIS. Se o banco cair, continua
+    respondendo com o último índice carregado.
+    """
+
+    def __init__(self):
+        self.builds = 0
+        self.lookups = 0
+        self._snapshot = None  # (versão, STRtree, atributos das áreas, construído em)
+        self._lock = threading.Lock()
+
+    def get(self, version):
+        snapshot = self._snapshot
+        if snapshot is not None and (version is None or snapshot[0] == version):
+            return snapshot
+        
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or (version is not None and snapshot[0] != version):
+                try:
+                    snapshot = self._build(version)
+                    self._snapshot = snapshot
+                except PoolTimeout:
+                    # Sem índice anterior para servir: 503 com Retry-After (pool_exhausted)
+                    if snapshot is None:
+                        raise
+                    logger.warning("⚠ Pool esgotado: mantendo o índice de áreas anterior")
+                except Exception as e:
+                    logger.error(f"Falha ao construir índice de áreas de enchente: {e}")
+        return snapshot
+
+    def _build(self, version):
+        conn = get_db_connection()
+        if not conn:
+            raise RuntimeError("Database offline")
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(FLOOD_AREA_INDEX_SQL)
+                rows = cursor.fetchall()
+        finally:
+            release_db_connection(conn)
+        
+        areas = [
+            {
+                'area_id': area_id,
+                'area_name': area_name,
+                'severity': severity,
+                'flood_date': flood_date.isoformat() if flood_date else None,
+            }
+            for area_id, area_name, severity, flood_date, _ in rows
+        ]
+        geometries = shapely.from_wkb([bytes(row[4]) for row in rows])
+        tree = shapely.STRtree(geometries)
+        self.builds += 1
+        logger.info(f"✓ Índice de áreas de enchente: {len(areas)} polígonos (versão {version})")
+        return version, tree, areas, datetime.now()
+
+    def lookup(self, snapshot, lats, lons):
+        """Lista de áreas que contêm cada ponto (mesma ordem da entrada)"""
+        _, tree, areas, _ = snapshot
+        points = shapely.points(np.asarray(lons, dtype='float64'), np.asarray(lats, dtype='float64'))
+        point_idx, area_idx = tree.query(points, predicate='within')
+        matches = [[] for _ in range(len(points))]
+        for p, a in zip(point_idx.tolist(), area_idx.tolist()):
+            matches[p].append(areas[a])
+        self.lookups += len(points)
+        return matches
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'version': snapshot[0] if snapshot else None,
+            'areas': len(snapshot[2]) if snapshot else 0,
+            'built_at': snapshot[3].isoformat() if snapshot else None,
+            'builds': self.builds,
+            'lookups': self.lookups,
+        }
+
+
+flood_area_index = FloodAreaIndex()
+
+
+def _parse_coordinate(value, low, high):
+    """float dentro de [low, high] ou None"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not (low <= value <= high):
+        return None
+    return value
+
+
+def _lookup_result(lat, lon, areas, point_id=None):
+    result = {'lat': lat, 'lon': lon, 'in_flood_area': bool(areas), 'areas': areas}
+    if point_id is not None:
+        result['id'] = point_id
+    return result
+
+
+@app.route('/api/lookup', methods=['GET', 'POST'])
+def api_lookup():
+    """
+    API: o ponto está em área de enchente? Em qual?
+
+    GET  /api/lookup?lat=-23.55&lon=-46.63
+    POST /api/lookup  {"points": [{"lat": .., "lon": .., "id": ..}, [lat, lon], ...]}
+
+    Respondido pelo STRtree em memória (FloodAreaIndex), sem consulta ao PostGIS.
+    """
+    if not HAS_SHAPELY:
+        return jsonify({'error': 'shapely não instalado'}), 500
+    
+    if request.method == 'GET':
+        lat = _parse_coordinate(request.args.get('lat'), -90, 90)
+        lon = _parse_coordinate(request.args.get('lon'), -180, 180)
+        if lat is None or lon is None:
+            return jsonify({'error': 'Parâmetros lat/lon inválidos'}), 400
+        points = [(lat, lon, None)]
+    else:
+        payload = request.get_json(silent=True)
+        raw_points = payload.get('points') if isinstance(payload, dict) else payload
+        if not isinstance(raw_points, list):
+            return jsonify({'error': 'Corpo deve ser {"points": [...]}'}), 400
+        if len(raw_points) > LOOKUP_MAX_POINTS:
+            return jsonify({'error': f'Máximo de {LOOKUP_MAX_POINTS} pontos por requisição'}), 413
+        
+        points = []
+        for i, raw in enumerate(raw_points):
+            if isinstance(raw, dict):
+                lat, lon, point_id = raw.get('lat'), raw.get('lon'), raw.get('id')
+            elif isinstance(raw, (list, tuple)) and len(raw) == 2:
+                (lat, lon), point_id = raw, None
+            else:
+                return jsonify({'error': f'Ponto {i} inválido'}), 400
+            lat = _parse_coordinate(lat, -90, 90)
+            lon = _parse_coordinate(lon, -180, 180)
+            if lat is None or lon is None:
+                return jsonify({'error': f'Ponto {i} com lat/lon inválidos'}), 400
+            points.append((lat, lon, point_id))
+    
+    snapshot = flood_area_index.get(get_dataset_version())
+    if snapshot is None:
+        return jsonify({'error': 'Índice de áreas indisponível (banco offline)'}), 503
+    
+    lats = [p[0] for p in points]
+    lons = [p[1] for p in points]
+    matches = flood_area_index.lookup(snapshot, lats, lons)
+    results = [_lookup_result(lat, lon, areas, point_id) for (lat, lon, point_id), areas in zip(points, matches)]
+    
+    response = jsonify(results[0] if request.method == 'GET' else {
+        'dataset_version': snapshot[0],
+        'count': len(results),
+        'in_flood_area': sum(r['in_flood_area'] for r in results),
+        'results': results,
+    })
+    response.headers['X-Dataset-Version'] = str(snapshot[0])
+    return response
+
+@app.route('/map/tiles')
+def map_tiles():
+    """Mapa (MapLibre GL) consumindo os vector tiles de /tiles"""
+    return render_template('tiles.html')
+
+@app.route('/api/tiles/cache')
+def api_tile_cache():
+    """API: estatísticas do cache de tiles"""
+    return jsonify(tile_cache.stats())
+
+@app.route('/api/cache')
+def api_cache():
+    """API: versão do dataset e estatísticas dos caches"""
+    return jsonify({
+        'dataset_version': get_dataset_version(),
+        'responses': response_cache.stats(),
+        'tiles': tile_cache.stats(),
+        'lookup_index': flood_area_index.stats(),
+    })
+
+@app.route('/api/pool')
+def api_pool():
+    """API: estatísticas do pool de conexões"""
+    return jsonify(db_pool.stats())
+
 @app.route('/health')
 def health():
     """Health check"""
     conn = get_db_connection()
     if conn:
-        conn.close()
-        return jsonify({'status': 'ok'})
-    return jsonify({'status': 'offline'}), 503
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return jsonify({'status': 'ok', 'pool': db_pool.stats()})
+        except psycopg2.Error as e:
+            logger.error(f"Health check falhou: {e}")
+        finally:
+            release_db_connection(conn)
+    return jsonify({'status': 'offline', 'pool': db_pool.stats()}), 503
 
 if __name__ == '__main__':
     logger.info("Iniciando Flask - Esteira Geo")
@@ -38,6 +38,69 @@ RDS_DATABASE = os.getenv('RDS_NAME', os.getenv('RDS_DATABASE', 'esteira_geo'))
 RDS_USER = os.getenv('RDS_USER', 'postgres')
 RDS_PASSWORD = os.getenv('RDS_PASSWORD', 'postgrespw')
 
+# Método de carga no PostGIS: 'copy' (COPY binário em lotes) ou 'insert' (linha a linha, legado)
+POSTGIS_LOAD_METHOD = os.getenv('POSTGIS_LOAD_METHOD', 'copy')
+POSTGIS_COPY_BATCH_SIZE = int(os.getenv('POSTGIS_COPY_BATCH_SIZE', 50000))
+
+# Modo de recarga: 'replace' (DELETE + recarga in-place), 'swap' (staging + rename atômico)
+# ou 'upsert' (diferencial por citizen_id)
+POSTGIS_LOAD_MODE = os.getenv('POSTGIS_LOAD_MODE', 'replace')
+POSTGIS_SWAP_LOCK_TIMEOUT = os.getenv('POSTGIS_SWAP_LOCK_TIMEOUT', '2s')
+POSTGIS_SWAP_RETRIES = int(os.getenv('POSTGIS_SWAP_RETRIES', 5))
+
+# Silver: cidadãos lidos da Bronze e gravados em lotes de até N linhas (0 = arquivo inteiro em memória);
+# citizen_id repetido entre lotes é descartado via bitmap de ids em [0, SILVER_DEDUP_BITMAP_MAX_ID).
+# O bitmap cresce até o maior id visto, com teto de SILVER_DEDUP_BITMAP_MAX_ID / 8 bytes
+# (padrão 2**28 ids = 32 MB); ids fora da faixa custam 8 bytes cada num array à parte
+SILVER_BATCH_SIZE = int(os.getenv('SILVER_BATCH_SIZE', 100000))
+SILVER_DEDUP_BITMAP_MAX_ID = int(os.getenv('SILVER_DEDUP_BITMAP_MAX_ID', 2 ** 28))
+# Conversor CSV/GeoJSON: schema de colunas declarado ou inferido de uma amostra de N linhas
+# e guardado em cache na Silver (CONVERTER_SCHEMA_FILE)
+CONVERTER_SCHEMA_SAMPLE_ROWS = int(os.getenv('CONVERTER_SCHEMA_SAMPLE_ROWS', 10000))
+# Processos da conversão paralela de arquivos (1 = sequencial, 0 = todos os núcleos)
+CONVERTER_WORKERS = int(os.getenv('CONVERTER_WORKERS', 1))
+# Formatos aceitos pelo conversor, em ordem de preferência: um único arquivo por dataset (stem)
+# é convertido e as demais cópias em outros formatos são ignoradas
+CONVERTER_FORMAT_PRIORITY = [f.strip().lower() for f in os.getenv('CONVERTER_FORMAT_PRIORITY', 'parquet,csv,geojson').split(',') if f.strip()]
+
+# Gold: cidadãos lidos da Silver em lotes de até N linhas (0 = arquivo inteiro em memória)
+GOLD_BATCH_SIZE = int(os.getenv('GOLD_BATCH_SIZE', 100000))
+# Processos do batimento paralelo (1 = sequencial, 0 = todos os núcleos) e shards por worker em cada lote
+GOLD_WORKERS = int(os.getenv('GOLD_WORKERS', 1))
+GOLD_SHARDS_PER_WORKER = int(os.getenv('GOLD_SHARDS_PER_WORKER', 4))
+# Motor do batimento: 'strtree' (teste exato de todo ponto), 'grid' (grade pré-classificada,
+# teste exato só nas células de borda) ou 'raster' (raster de rótulos, exato só nos pixels de borda);
+# GOLD_GRID_SIZE = células no eixo maior da extensão
+GOLD_JOIN_ENGINE = os.getenv('GOLD_JOIN_ENGINE', 'strtree')
+GOLD_GRID_SIZE = int(os.getenv('GOLD_GRID_SIZE', 512))
+# Motor 'raster': polígonos queimados num raster de rótulos com resolução GOLD_RASTER_RESOLUTION
+# (unidades do CRS, graus em EPSG:4326), limitado a GOLD_RASTER_MAX_PIXELS pixels (int32)
+GOLD_RASTER_RESOLUTION = float(os.getenv('GOLD_RASTER_RESOLUTION', 0.0005))
+GOLD_RASTER_MAX_PIXELS = int(os.getenv('GOLD_RASTER_MAX_PIXELS', 50_000_000))
+# 'full' (batimento de todos) ou 'incremental' (só o que mudou desde o último estado salvo)
+GOLD_MODE = os.getenv('GOLD_MODE', 'full')
+GOLD_STATE_PATH = os.getenv('GOLD_STATE_PATH', os.path.join(LOCAL_GOLD_PATH, '_state'))
+# Histórico de eventos por cidadão (um evento por flood_date), particionado por data em
+# GOLD_HISTORY_PATH; só eventos novos/alterados são recalculados. Desligado por padrão
+# (batimento extra por evento novo/alterado): habilitar com GOLD_FLOOD_HISTORY=true
+GOLD_FLOOD_HISTORY = os.getenv('GOLD_FLOOD_HISTORY', 'false').lower() in ('1', 'true', 'yes')
+GOLD_HISTORY_PATH = os.getenv('GOLD_HISTORY_PATH', os.path.join(LOCAL_GOLD_PATH, 'flood_events'))
+
+# Distância ao polígono de enchente mais próximo, em metros num CRS projetado (SIRGAS 2000 / UTM 22S),
+# e faixas de risco por distância: 'inside' + uma faixa por limite em metros + 'beyond_<último>m'
+GOLD_DISTANCE_CRS = os.getenv('GOLD_DISTANCE_CRS', 'EPSG:31982')
+GOLD_RISK_BANDS = sorted(float(m) for m in os.getenv('GOLD_RISK_BANDS', '200,1000').split(',') if m.strip())
+
+# Raster de profundidade (GeoTIFF, metros) amostrado em cada cidadão ('' = desligado); limites em
+# metros das severidades por profundidade low/medium/high/very_high e blocos do raster em cache
+FLOOD_DEPTH_RASTER = os.getenv('FLOOD_DEPTH_RASTER', '')
+GOLD_DEPTH_BANDS = sorted(float(m) for m in os.getenv('GOLD_DEPTH_BANDS', '0.5,1.5,3.0').split(',') if m.strip())
+GOLD_DEPTH_BLOCK_CACHE = int(os.getenv('GOLD_DEPTH_BLOCK_CACHE', 64))
+
+# Polígonos de enchente subdivididos na Silver em partes de até N vértices (0 = sem subdivisão);
+# o batimento Gold e o PostGIS (ST_Subdivide) testam contra as partes
+FLOOD_SUBDIVIDE_MAX_VERTICES = int(os.getenv('FLOOD_SUBDIVIDE_MAX_VERTICES', 256))
+
 # ====== LOGGING CONFIGURATION ======
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 LOG_FILE = os.getenv('LOG_FILE', 'logs/pipeline.log')
@@ -58,9 +121,12 @@ S3_GOLD_PREFIX = 'gold/'
 # File names
 FLOODING_AREAS_FILE = 'flooding_areas_porto_alegre.parquet'
 CITIZENS_FILE = 'citizens_data.parquet'
+FLOODING_AREA_PARTS_FILE = 'silver_flooding_areas_porto_alegre_parts.parquet'
 AFFECTED_CITIZENS_FILE = 'affected_citizens.parquet'
 UNAFFECTED_CITIZENS_FILE = 'unaffected_citizens.parquet'
 ALL_CITIZENS_FILE = 'all_citizens_evaluated.parquet'
+FLOOD_HISTORY_MANIFEST_FILE = '_manifest.json'
+CONVERTER_SCHEMA_FILE = '_schemas.json'
 
 # ====== STATUS ======
 print(f"✓ Configuration loaded (Mode: {STORAGE_MODE.upper()})")
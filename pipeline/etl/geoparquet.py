@@ -0,0 +1,127 @@
+"""
+GeoParquet em lotes - leitura e escrita incremental usadas pela Silver e pela Gold
+
+A escrita não usa a API interna do geopandas: a geometria vira WKB (shapely),
+a tabela Arrow é montada com pa.Table.from_pandas sobre um schema explícito e
+os metadados 'geo' (GeoParquet 1.0) são gravados por este módulo.
+"""
+
+import json
+import logging
+from pathlib import Path
+
+import geopandas as gpd
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import shapely
+from pyproj import CRS
+
+logger = logging.getLogger(__name__)
+
+GEOPARQUET_VERSION = '1.0.0'
+
+
+def geo_metadata(geometry_column, crs):
+    """Metadados 'geo' de um GeoParquet com uma coluna WKB (sem bbox: não conhecido na escrita em lotes)"""
+    column = {
+        'encoding': 'WKB',
+        'geometry_types': [],
+        'crs': CRS.from_user_input(crs).to_json_dict() if crs is not None else None,
+    }
+    return {'version': GEOPARQUET_VERSION, 'primary_column': geometry_column, 'columns': {geometry_column: column}}
+
+
+def arrow_schema(gdf, column_types):
+    """
+    Schema Arrow das colunas do GeoDataFrame (na ordem do GeoDataFrame)
+
+    Tipos vêm de `column_types` (nome -> tipo Arrow) e a geometria é WKB
+    (binary). Colunas não declaradas usam o tipo inferido do próprio lote;
+    se o lote só tiver nulos nelas, viram string.
+    """
+    geometry_column = gdf.geometry.name
+    fields = []
+    for name in gdf.columns:
+        if name == geometry_column:
+            arrow_type = pa.binary()
+        elif name in column_types:
+            arrow_type = column_types[name]
+        else:
+            arrow_type = pa.Schema.from_pandas(pd.DataFrame({name: gdf[name]}), preserve_index=False).field(name).type
+            if pa.types.is_null(arrow_type):
+                logger.warning(f"⚠ Coluna '{name}' sem tipo declarado e só com nulos: gravada como string")
+                arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    metadata = {b'geo': json.dumps(geo_metadata(geometry_column, gdf.crs)).encode()}
+    return pa.schema(fields, metadata=metadata)
+
+
+def geodataframe_to_table(gdf, schema):
+    """Converte um GeoDataFrame numa tabela Arrow com o `schema` dado (geometria em WKB)"""
+    geometry_column = gdf.geometry.name
+    df = pd.DataFrame({name: gdf[name] for name in schema.names if name != geometry_column}, index=gdf.index)
+    for field in schema:
+        # Lista só com nulos chega como float (NaN), que o Arrow não converte para list
+        if pa.types.is_nested(field.type) and field.name in df and df[field.name].isna().all():
+            df[field.name] = pd.Series([None] * len(df), index=df.index, dtype=object)
+    df[geometry_column] = shapely.to_wkb(gdf.geometry.values)
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False, safe=False)
+
+
+def iter_geoparquet_batches(filepath, batch_size):
+    """
+    Lê um GeoParquet em lotes de até `batch_size` linhas (0 = arquivo inteiro)
+
+    Cada lote vira um GeoDataFrame com o CRS declarado nos metadados 'geo';
+    o arquivo nunca é carregado inteiro.
+    """
+    parquet_file = pq.ParquetFile(filepath)
+    geo = json.loads(parquet_file.schema_arrow.metadata[b'geo'])
+    geometry_column = geo['primary_column']
+    crs = geo['columns'][geometry_column].get('crs', 'OGC:CRS84')
+
+    logger.info(
+        f"Lendo em lotes: {filepath} "
+        f"({parquet_file.metadata.num_rows} registros, {parquet_file.num_row_groups} row group(s))"
+    )
+    batch_size = batch_size or parquet_file.metadata.num_rows or 1
+    for batch in parquet_file.iter_batches(batch_size=batch_size):
+        df = batch.to_pandas()
+        df[geometry_column] = gpd.GeoSeries.from_wkb(df[geometry_column], crs=crs)
+        yield gpd.GeoDataFrame(df, geometry=geometry_column, crs=crs)
+
+
+class GeoParquetWriter:
+    """
+    Escrita incremental de um GeoParquet, um lote por row group
+
+    O schema é fixado no primeiro lote (mesmo vazio) por arrow_schema: as
+    colunas são as do lote, mas os tipos vêm de `column_types`, não dos
+    valores, então um primeiro lote só com nulos numa coluna não muda o tipo
+    dela. Sem nenhum lote, close() grava um arquivo vazio só com a geometria.
+    """
+
+    def __init__(self, filepath, column_types=None, crs=None):
+        self.filepath = Path(filepath)
+        self.filepath.parent.mkdir(parents=True, exist_ok=True)
+        self.column_types = column_types or {}
+        self.crs = crs
+        self.rows = 0
+        self._writer = None
+
+    def write(self, gdf):
+        if self._writer is None:
+            self.schema = arrow_schema(gdf, self.column_types)
+        table = geodataframe_to_table(gdf, self.schema)
+        if self._writer is None:
+            # O schema da 1ª tabela traz também os metadados 'pandas' (Int64 etc. voltam na leitura)
+            self._writer = pq.ParquetWriter(str(self.filepath), table.schema)
+        if len(gdf):
+            self._writer.write_table(table)
+            self.rows += len(gdf)
+
+    def close(self):
+        if self._writer is None:
+            self.write(gpd.GeoDataFrame(geometry=[], crs=self.crs))
+        self._writer.close()
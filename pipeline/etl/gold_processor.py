@@ -5,20 +5,88 @@ Gold Processor - Processamento geoespacial e batimento de dados
   1. affected_citizens.parquet - cidadãos em área atingida
   2. unaffected_citizens.parquet - cidadãos fora de área atingida
   3. all_citizens_evaluated.parquet - todos os avaliados com status
+
+Cidadãos são processados em lotes (GOLD_BATCH_SIZE) lidos da Silver e
+anexados aos arquivos Gold; a memória de pico depende do lote, não da população.
+Com GOLD_WORKERS > 1 cada lote é dividido em shards espacialmente coerentes
+(curva de Hilbert) testados contra os polígonos em paralelo por um pool de processos.
+Cada cidadão gera exatamente uma linha, com a lista de áreas que o contêm.
+
+Modo incremental (GOLD_MODE=incremental): um estado em GOLD_STATE_PATH guarda o
+hash da geometria e as áreas de cada cidadão, além dos polígonos da última
+execução. Só são reclassificados cidadãos novos, que se moveram, ou dentro do
+bbox de polígonos incluídos/removidos/alterados; os demais reaproveitam as áreas
+do estado.
+
+Histórico de eventos (GOLD_FLOOD_HISTORY=true, desligado por padrão): cada
+flood_date é um evento; o histórico cidadão × área fica em GOLD_HISTORY_PATH
+particionado por data do evento, e só eventos novos ou alterados são batidos
+de novo.
+
+Profundidade (FLOOD_DEPTH_RASTER): um GeoTIFF de profundidade é amostrado em
+cada cidadão por blocos (flood_depth_m + depth_severity), sem carregar o raster.
 """
 
+import functools
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+import numpy as np
 import geopandas as gpd
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import shapely
 import logging
 from pathlib import Path
 from config import (
     LOCAL_SILVER_PATH, LOCAL_GOLD_PATH,
     AWS_S3_GOLD_BUCKET, S3_GOLD_PREFIX,
-    AFFECTED_CITIZENS_FILE, UNAFFECTED_CITIZENS_FILE, ALL_CITIZENS_FILE
+    AFFECTED_CITIZENS_FILE, UNAFFECTED_CITIZENS_FILE, ALL_CITIZENS_FILE,
+    GOLD_BATCH_SIZE, GOLD_WORKERS, GOLD_SHARDS_PER_WORKER,
+    GOLD_MODE, GOLD_STATE_PATH, GOLD_JOIN_ENGINE, GOLD_GRID_SIZE,
+    GOLD_RASTER_RESOLUTION, GOLD_RASTER_MAX_PIXELS,
+    FLOODING_AREA_PARTS_FILE, FLOOD_SUBDIVIDE_MAX_VERTICES,
+    GOLD_DISTANCE_CRS, GOLD_RISK_BANDS,
+    GOLD_FLOOD_HISTORY, GOLD_HISTORY_PATH, FLOOD_HISTORY_MANIFEST_FILE,
+    FLOOD_DEPTH_RASTER, GOLD_DEPTH_BANDS, GOLD_DEPTH_BLOCK_CACHE
 )
+import pyarrow.dataset as ds
+from etl.geoparquet import GeoParquetWriter, iter_geoparquet_batches
 
 logger = logging.getLogger(__name__)
 
+# Ordem de severidade das áreas de enchente (desconhecida < low < ... < very_high)
+SEVERITY_RANK = {'low': 1, 'medium': 2, 'high': 3, 'very_high': 4}
+
+# Tipos Arrow das colunas dos arquivos Gold: o schema não depende dos valores do
+# 1º lote (um lote sem afetados tem area_name/flood_date/max_severity só nulos)
+GOLD_COLUMN_TYPES = {
+    'citizen_id': pa.int64(),
+    'name': pa.string(),
+    'address': pa.string(),
+    'phone': pa.string(),
+    'registration_date': pa.timestamp('us'),
+    'affected_by_flooding': pa.bool_(),
+    'affected_area_id': pa.int64(),
+    'affected_area_ids': pa.list_(pa.int64()),
+    'area_name': pa.string(),
+    'flood_date': pa.timestamp('us'),
+    'max_severity': pa.string(),
+    'nearest_area_id': pa.int64(),
+    'distance_to_flood_m': pa.float64(),
+    'risk_band': pa.string(),
+    'flood_depth_m': pa.float64(),
+    'depth_severity': pa.string(),
+    'normalized_date': pa.timestamp('us'),
+    'data_quality_score': pa.float64(),
+    'processing_date': pa.timestamp('us'),
+}
+
 
 def load_from_silver(filename):
     """Carrega arquivos da camada Silver"""
@@ -29,47 +97,562 @@ def load_from_silver(filename):
     return gdf
 
 
-def perform_spatial_join(flooding_gdf, citizens_gdf):
+def iter_silver_batches(filename, batch_size=GOLD_BATCH_SIZE):
+    """Lê um GeoParquet da Silver em lotes de até `batch_size` linhas (0 = arquivo inteiro)"""
+    return iter_geoparquet_batches(Path(LOCAL_SILVER_PATH) / filename, batch_size)
+
+
+def load_flood_parts(flooding_gdf):
+    """
+    Partes subdivididas das áreas (Silver), ou None se ausentes/desatualizadas
+
+    As partes só são usadas se cobrirem os mesmos area_id e, somadas, a mesma
+    área de cada polígono atual (Silver regerada sem subdividir de novo).
+    """
+    filepath = Path(LOCAL_SILVER_PATH) / FLOODING_AREA_PARTS_FILE
+    if FLOOD_SUBDIVIDE_MAX_VERTICES <= 0 or not filepath.exists():
+        return None
+    parts_gdf = gpd.read_parquet(filepath)
+    part_area = pd.Series(shapely.area(parts_gdf.geometry.values)).groupby(parts_gdf['area_id'].to_numpy()).sum()
+    area = pd.Series(shapely.area(flooding_gdf.geometry.values), index=flooding_gdf['area_id'].to_numpy())
+    if not part_area.index.sort_values().equals(area.index.sort_values()) or \
+            not np.allclose(part_area.reindex(area.index).to_numpy(), area.to_numpy(), rtol=1e-9, atol=0):
+        logger.warning(f"⚠ Partes subdivididas não correspondem às áreas atuais, ignorando {filepath}")
+        return None
+    logger.info(f"✓ Partes subdivididas: {len(parts_gdf)} partes de {len(flooding_gdf)} áreas")
+    return parts_gdf
+
+
+class FloodPolygons:
+    """
+    Geometrias preparadas para o batimento ponto-em-polígono
+
+    Com `parts_gdf` (partes subdivididas da Silver) o teste roda contra as
+    partes, de poucos vértices cada, mapeadas de volta para a posição da área.
+    O preparo fica em cache nas geometrias e é refeito após pickle (workers).
+    """
+
+    def __init__(self, flooding_gdf, parts_gdf=None):
+        self.polygons = np.asarray(flooding_gdf.geometry.values)
+        if parts_gdf is None:
+            self.parts, self.part_area = None, None
+        else:
+            positions = pd.Series(np.arange(len(flooding_gdf)), index=flooding_gdf['area_id'].to_numpy())
+            self.parts = np.asarray(parts_gdf.geometry.values)
+            self.part_area = positions.reindex(parts_gdf['area_id'].to_numpy()).to_numpy().astype(np.intp)
+        self.prepare()
+
+    def prepare(self):
+        shapely.prepare(self.polygons)
+        if self.parts is not None:
+            shapely.prepare(self.parts)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.prepare()
+
+
+def match_points_within(flood, geometries):
     """
-    Batimento geográfico: identifica cidadãos em áreas atingidas
-    Utiliza sjoin com geometria de polígonos (flooding) e pontos (cidadãos)
+    Pares (point_idx, area_idx) com geometries[point_idx] 'within' da área area_idx
+
+    Como o gpd.sjoin, inverte o teste: indexa os pontos do lote num STRtree e
+    consulta com os polígonos preparados e o predicado 'contains', muito mais
+    barato que testar ponto a ponto contra polígonos com muitos vértices.
+
+    Com partes subdivididas, 'covers' pega também pontos sobre os cortes;
+    só esses (na borda da parte) são conferidos contra a área inteira, e os
+    pares repetidos por partes vizinhas são removidos.
     """
-    logger.info("Realizando spatial join (batimento geográfico)...")
+    if len(geometries) == 0:
+        return np.array([], dtype=np.intp), np.array([], dtype=np.intp)
+    tree = shapely.STRtree(geometries)
+    if flood.parts is None:
+        area_idx, point_idx = tree.query(flood.polygons, predicate='contains')
+        return point_idx, area_idx
     
-    # Spatial join: cidadãos dentro de polígonos de enchente
-    sjoin_result = gpd.sjoin(
-        citizens_gdf,
-        flooding_gdf,
-        how='left',
-        predicate='within'
-    )
+    part_idx, point_idx = tree.query(flood.parts, predicate='covers')
+    area_idx = flood.part_area[part_idx]
+    on_cut = ~shapely.contains(flood.parts[part_idx], geometries[point_idx])
+    if not on_cut.any():
+        return point_idx, area_idx
     
-    logger.info(f"✓ Spatial join completado: {len(sjoin_result)} registros")
-    return sjoin_result
+    keep = ~on_cut
+    keep[on_cut] = shapely.within(geometries[point_idx[on_cut]], flood.polygons[area_idx[on_cut]])
+    pairs = np.unique(np.stack([point_idx[keep], area_idx[keep]]), axis=1)
+    return pairs[0], pairs[1]
+
+
+def expand_csr(offsets, rows):
+    """
+    Expande listas em formato CSR (offsets) para as linhas `rows`
+
+    Retorna (posição em `rows` de cada elemento, índice do elemento em values).
+    """
+    starts = offsets[rows]
+    counts = offsets[rows + 1] - starts
+    owners = np.repeat(np.arange(len(rows)), counts)
+    value_idx = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    return owners, value_idx
+
 
+class GridIndex:
+    """
+    Grade regular sobre a extensão das áreas de enchente
+
+    Cada célula é classificada por área como interna (contida no interior do
+    polígono), externa ou de borda. Pontos em células sem borda são resolvidos
+    por consulta em array (as áreas internas da célula); só os pontos em
+    células de borda, fora da grade de forma ambígua ou que não são pontos
+    passam pelo teste exato (match_points_within).
+    """
+
+    # Pontos a menos de EDGE_TOLERANCE (em frações de célula) de uma aresta vão para o teste exato
+    EDGE_TOLERANCE = 1e-9
+
+    def __init__(self, flooding_gdf, grid_size=None, parts_gdf=None):
+        started = time.perf_counter()
+        self.flood = FloodPolygons(flooding_gdf, parts_gdf)
+        geometries = self.flood.polygons
+        self.minx, self.miny, maxx, maxy = flooding_gdf.total_bounds
+        grid_size = grid_size or GOLD_GRID_SIZE
+        width, height = max(maxx - self.minx, 1e-12), max(maxy - self.miny, 1e-12)
+        cell = max(width, height) / grid_size
+        self.nx = max(1, int(np.ceil(width / cell)))
+        self.ny = max(1, int(np.ceil(height / cell)))
+        self.dx, self.dy = width / self.nx, height / self.ny
+        
+        boundary = np.zeros(self.nx * self.ny, dtype=bool)
+        inside_cells, inside_areas = [], []
+        for area, polygon in enumerate(geometries):
+            if polygon is None or polygon.is_empty:
+                continue
+            bx0, by0, bx1, by1 = polygon.bounds
+            i0, i1 = self._cell_range(bx0, bx1, self.minx, self.dx, self.nx)
+            j0, j1 = self._cell_range(by0, by1, self.miny, self.dy, self.ny)
+            ii, jj = np.meshgrid(np.arange(i0, i1 + 1), np.arange(j0, j1 + 1))
+            ii, jj = ii.ravel(), jj.ravel()
+            cells = shapely.box(
+                self.minx + ii * self.dx, self.miny + jj * self.dy,
+                self.minx + (ii + 1) * self.dx, self.miny + (jj + 1) * self.dy,
+            )
+            inside = shapely.contains_properly(polygon, cells)
+            touches = shapely.intersects(polygon, cells)
+            cell_ids = jj * self.nx + ii
+            boundary[cell_ids[touches & ~inside]] = True
+            inside_cells.append(cell_ids[inside])
+            inside_areas.append(np.full(inside.sum(), area))
+        
+        inside_cells = np.concatenate(inside_cells) if inside_cells else np.array([], dtype=np.int64)
+        inside_areas = np.concatenate(inside_areas) if inside_areas else np.array([], dtype=np.intp)
+        order = np.lexsort((inside_areas, inside_cells))
+        self.inside_areas = inside_areas[order].astype(np.intp)
+        self.inside_offsets = np.concatenate([[0], np.cumsum(np.bincount(inside_cells, minlength=self.nx * self.ny))])
+        self.boundary = boundary
+        self.build_seconds = time.perf_counter() - started
+        self.last_exact = 0
+        
+        logger.info(
+            f"✓ Grade {self.nx}x{self.ny}: {int((np.diff(self.inside_offsets) > 0).sum())} células internas, "
+            f"{int(boundary.sum())} de borda ({self.build_seconds:.2f}s)"
+        )
+
+    @staticmethod
+    def _cell_range(low, high, origin, size, cells):
+        first = int(np.clip(np.floor((low - origin) / size), 0, cells - 1))
+        last = int(np.clip(np.floor((high - origin) / size), 0, cells - 1))
+        return first, last
+
+    def query(self, geometries):
+        """Pares (point_idx, area_idx) com o predicado 'within', como match_points_within"""
+        fx = (shapely.get_x(geometries) - self.minx) / self.dx
+        fy = (shapely.get_y(geometries) - self.miny) / self.dy
+        with np.errstate(invalid='ignore'):
+            ix, iy = np.floor(fx), np.floor(fy)
+            near_edge = (
+                (fx - ix < self.EDGE_TOLERANCE) | (ix + 1 - fx < self.EDGE_TOLERANCE)
+                | (fy - iy < self.EDGE_TOLERANCE) | (iy + 1 - fy < self.EDGE_TOLERANCE)
+            )
+            in_grid = (ix >= 0) & (ix < self.nx) & (iy >= 0) & (iy < self.ny)
+        non_point = shapely.get_type_id(geometries) != 0
+        
+        cell_ids = np.where(in_grid, iy * self.nx + ix, 0).astype(np.int64)
+        exact = non_point | (in_grid & (near_edge | self.boundary[cell_ids]))
+        lookup = np.flatnonzero(in_grid & ~exact)
+        
+        # Células internas/externas: áreas vêm direto do array da grade
+        owners, value_idx = expand_csr(self.inside_offsets, cell_ids[lookup])
+        point_idx, area_idx = [lookup[owners]], [self.inside_areas[value_idx]]
+        
+        # Células de borda: teste exato só desses pontos
+        exact = np.flatnonzero(exact)
+        self.last_exact = len(exact)
+        if len(exact):
+            exact_points, exact_areas = match_points_within(self.flood, geometries[exact])
+            point_idx.append(exact[exact_points])
+            area_idx.append(exact_areas)
+        return np.concatenate(point_idx), np.concatenate(area_idx).astype(np.intp)
+
+
+class RasterIndex:
+    """
+    Raster de rótulos (bitmap) com as áreas de enchente queimadas
+
+    Os polígonos são rasterizados (rasterio.features) na resolução
+    GOLD_RASTER_RESOLUTION; cada pixel recebe o rótulo do conjunto de áreas
+    que o contém (0 = nenhuma), e os pixels tocados por algum contorno, com
+    um pixel de folga, recebem -1. Fora da borda o pixel está inteiro dentro
+    ou fora de cada polígono, então um único índice de array lon/lat -> pixel
+    classifica o ponto; só pontos em pixels de borda (ou não pontuais) passam
+    pelo teste exato (match_points_within), e o resultado é idêntico.
+    """
+
+    EDGE = -1
+
+    def __init__(self, flooding_gdf, resolution=None, parts_gdf=None, max_pixels=GOLD_RASTER_MAX_PIXELS):
+        from rasterio.features import rasterize
+        from rasterio.transform import from_origin
+        
+        started = time.perf_counter()
+        self.flood = FloodPolygons(flooding_gdf, parts_gdf)
+        polygons = self.flood.polygons
+        minx, miny, maxx, maxy = flooding_gdf.total_bounds
+        self.resolution = resolution or GOLD_RASTER_RESOLUTION
+        pixels = (np.ceil((maxx - minx) / self.resolution) + 4) * (np.ceil((maxy - miny) / self.resolution) + 4)
+        if pixels > max_pixels:
+            self.resolution *= float(np.sqrt(pixels / max_pixels))
+            logger.warning(f"⚠ Raster acima de {max_pixels} pixels: resolução ajustada para {self.resolution:g}")
+        
+        # Dois pixels de margem: pontos no limite da extensão caem em pixels de borda
+        self.width = int(np.ceil((maxx - minx) / self.resolution)) + 4
+        self.height = int(np.ceil((maxy - miny) / self.resolution)) + 4
+        self.x0, self.y0 = minx - 2 * self.resolution, maxy + 2 * self.resolution
+        transform = from_origin(self.x0, self.y0, self.resolution, self.resolution)
+        
+        # Rótulos: conjuntos de áreas (tuplas ordenadas) que contêm cada pixel
+        labels = np.zeros((self.height, self.width), dtype=np.int32)
+        combos = {(): 0}
+        for area, polygon in enumerate(polygons):
+            if polygon is None or polygon.is_empty:
+                continue
+            bx0, by0, bx1, by1 = polygon.bounds
+            c0, c1 = self._pixel_range(bx0 - self.x0, bx1 - self.x0, self.width)
+            r0, r1 = self._pixel_range(self.y0 - by1, self.y0 - by0, self.height)
+            burned = rasterize(
+                [(polygon, 1)], out_shape=(r1 - r0, c1 - c0), dtype='uint8',
+                transform=from_origin(self.x0 + c0 * self.resolution, self.y0 - r0 * self.resolution,
+                                      self.resolution, self.resolution),
+            ).astype(bool)
+            window = labels[r0:r1, c0:c1]
+            current, inverse = np.unique(window[burned], return_inverse=True)
+            combo_keys = list(combos)
+            updated = [combos.setdefault(combo_keys[label] + (area,), len(combos)) for label in current]
+            window[burned] = np.asarray(updated, dtype=np.int32)[inverse]
+        
+        # Pixels tocados por contornos (all_touched) + um pixel de folga: teste exato
+        boundaries = [(line, 1) for line in shapely.boundary(polygons) if line is not None and not line.is_empty]
+        edges = rasterize(boundaries, out_shape=labels.shape, transform=transform,
+                          all_touched=True, dtype='uint8').astype(bool) if boundaries \
+            else np.zeros(labels.shape, dtype=bool)
+        dilated = edges.copy()
+        dilated[1:, :] |= edges[:-1, :]
+        dilated[:-1, :] |= edges[1:, :]
+        dilated[:, 1:] |= dilated[:, :-1].copy()
+        dilated[:, :-1] |= dilated[:, 1:].copy()
+        labels[dilated] = self.EDGE
+        self.labels = labels
+        
+        combo_areas = list(combos)
+        self.combo_offsets = np.concatenate([[0], np.cumsum([len(c) for c in combo_areas])]).astype(np.int64)
+        self.combo_areas = np.array([a for combo in combo_areas for a in combo], dtype=np.intp)
+        self.build_seconds = time.perf_counter() - started
+        self.last_exact = 0
+        
+        logger.info(
+            f"✓ Raster {self.width}x{self.height} (resolução {self.resolution:g}): {len(combos) - 1} rótulo(s), "
+            f"{int(dilated.sum())} pixels de borda, {labels.nbytes / 1e6:.0f} MB ({self.build_seconds:.2f}s)"
+        )
+
+    def _pixel_range(self, low, high, size):
+        first = int(np.clip(np.floor(low / self.resolution), 0, size))
+        last = int(np.clip(np.ceil(high / self.resolution) + 1, first, size))
+        return first, last
 
-def classify_citizens(spatial_join_result, flooding_gdf):
+    def query(self, geometries):
+        """Pares (point_idx, area_idx) com o predicado 'within', como match_points_within"""
+        with np.errstate(invalid='ignore'):
+            cols = np.floor((shapely.get_x(geometries) - self.x0) / self.resolution)
+            rows = np.floor((self.y0 - shapely.get_y(geometries)) / self.resolution)
+            in_raster = (cols >= 0) & (cols < self.width) & (rows >= 0) & (rows < self.height)
+        non_point = shapely.get_type_id(geometries) != 0
+        
+        label = np.zeros(len(geometries), dtype=np.int32)
+        label[in_raster] = self.labels[rows[in_raster].astype(np.int64), cols[in_raster].astype(np.int64)]
+        exact = non_point | (label == self.EDGE)
+        lookup = np.flatnonzero(~exact & (label > 0))
+        
+        # Pixels internos: áreas vêm direto do rótulo
+        owners, value_idx = expand_csr(self.combo_offsets, label[lookup])
+        point_idx, area_idx = [lookup[owners]], [self.combo_areas[value_idx]]
+        
+        # Pixels de borda: teste exato só desses pontos
+        exact = np.flatnonzero(exact)
+        self.last_exact = len(exact)
+        if len(exact):
+            exact_points, exact_areas = match_points_within(self.flood, geometries[exact])
+            point_idx.append(exact[exact_points])
+            area_idx.append(exact_areas)
+        return np.concatenate(point_idx), np.concatenate(area_idx).astype(np.intp)
+
+
+# Motores com índice pré-classificado e teste exato só nas bordas
+INDEXED_ENGINES = {'grid': GridIndex, 'raster': RasterIndex}
+
+
+def build_point_matcher(flooding_gdf, engine=None, parts_gdf=None):
     """
-    Classifica cidadãos como afetados ou não
+    Função geometrias -> (point_idx, area_idx) do motor de batimento escolhido
+
+    - 'strtree': teste exato de todos os pontos (padrão)
+    - 'grid': GridIndex, teste exato só nas células de borda
+    - 'raster': RasterIndex, teste exato só nos pixels de borda
+    """
+    engine = engine or GOLD_JOIN_ENGINE
+    if engine in INDEXED_ENGINES:
+        return INDEXED_ENGINES[engine](flooding_gdf, parts_gdf=parts_gdf).query
+    if engine != 'strtree':
+        raise ValueError(f"Motor de batimento desconhecido: {engine}")
+    return functools.partial(match_points_within, FloodPolygons(flooding_gdf, parts_gdf))
+
+
+class NearestFloodIndex:
+    """
+    Área de enchente mais próxima de cada cidadão e a distância em metros
+
+    Os contornos dos polígonos são projetados uma vez em GOLD_DISTANCE_CRS e
+    quebrados em segmentos, indexados num STRtree: cada lote é projetado e
+    consultado com query_nearest, O(n·log m) em vez do CROSS JOIN n·m do
+    postgis_setup.sql, e cada candidato custa um teste ponto-segmento.
+    Vale para pontos fora das áreas, onde a distância ao polígono é a
+    distância ao contorno (os afetados têm distância 0).
+    """
+
+    def __init__(self, flooding_gdf, crs=GOLD_DISTANCE_CRS):
+        started = time.perf_counter()
+        self.crs = crs
+        self.source_crs = flooding_gdf.crs
+        rings, ring_area = shapely.get_parts(
+            shapely.boundary(np.asarray(flooding_gdf.geometry.to_crs(crs).values)), return_index=True
+        )
+        coords, ring_idx = shapely.get_coordinates(rings, return_index=True)
+        same_ring = ring_idx[1:] == ring_idx[:-1]
+        self.segments = shapely.linestrings(np.stack([coords[:-1][same_ring], coords[1:][same_ring]], axis=1))
+        self.segment_area = ring_area[ring_idx[:-1][same_ring]]
+        self.tree = shapely.STRtree(self.segments)
+        logger.info(
+            f"✓ Índice de proximidade: {len(self.segments)} segmentos de contorno "
+            f"({time.perf_counter() - started:.2f}s)"
+        )
+
+    def query(self, geometries):
+        """Posição da área mais próxima (-1 se nenhuma) e distância em metros (NaN) por geometria"""
+        nearest = np.full(len(geometries), -1, dtype=np.intp)
+        distance = np.full(len(geometries), np.nan)
+        if len(geometries) == 0 or len(self.segments) == 0:
+            return nearest, distance
+        projected = gpd.GeoSeries(geometries, crs=self.source_crs).to_crs(self.crs).values
+        (point_idx, segment_idx), found = self.tree.query_nearest(
+            np.asarray(projected), return_distance=True, all_matches=False
+        )
+        nearest[point_idx] = self.segment_area[segment_idx]
+        distance[point_idx] = found
+        return nearest, distance
+
+
+def risk_band_labels(bands=GOLD_RISK_BANDS):
+    """Rótulos das faixas de risco: inside, within_<limite>m..., beyond_<último>m"""
+    labels = ['inside'] + [f"within_{limit:g}m" for limit in bands]
+    return labels + [f"beyond_{bands[-1]:g}m"] if bands else labels + ['outside']
+
+
+def classify_citizens(citizens_gdf, flooding_gdf, point_idx, area_idx):
+    """
+    Classifica cidadãos como afetados ou não (uma linha por cidadão)
+
+    Uma passada vetorizada sobre os pares do spatial join:
+    - affected_area_ids: area_id de todas as áreas que contêm o cidadão
+      (área principal primeiro)
+    - affected_area_id, area_name, flood_date: área principal, a de maior
+      severidade (empate: menor area_id)
+    - max_severity: severidade da área principal
     """
     logger.info("Classificando cidadãos...")
     
-    gdf = spatial_join_result.copy()
+    n = len(citizens_gdf)
+    areas = flooding_gdf.reset_index(drop=True)
+    area_ids = areas['area_id'].to_numpy()
+    severity_rank = areas['severity'].map(SEVERITY_RANK).fillna(0).to_numpy()
     
-    # Identifica afetados: têm index_right (correspondem a uma área de enchente)
-    gdf['affected_by_flooding'] = gdf['index_right'].notna()
-    gdf['affected_area_id'] = gdf['index_right'].astype('Int64')
+    # Pares agrupados por cidadão, área principal primeiro
+    order = np.lexsort((area_ids[area_idx], -severity_rank[area_idx], point_idx))
+    point_idx, area_idx = point_idx[order], area_idx[order]
+    counts = np.bincount(point_idx, minlength=n)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
     
-    affected_count = gdf['affected_by_flooding'].sum()
-    unaffected_count = (~gdf['affected_by_flooding']).sum()
+    affected = counts > 0
+    primary = np.full(n, -1)
+    primary[affected] = area_idx[offsets[:-1][affected]]
+    
+    gdf = citizens_gdf.copy()
+    gdf['affected_by_flooding'] = affected
+    gdf['affected_area_id'] = areas['area_id'].reindex(primary).astype('Int64').array
+    gdf['affected_area_ids'] = pa.ListArray.from_arrays(
+        pa.array(offsets, type=pa.int32()), pa.array(area_ids[area_idx], type=pa.int64())
+    ).to_pandas().to_numpy()
+    for col in ('area_name', 'flood_date'):
+        gdf[col] = areas[col].reindex(primary).to_numpy()
+    gdf['max_severity'] = areas['severity'].reindex(primary).to_numpy()
+    
+    affected_count = int(affected.sum())
+    unaffected_count = n - affected_count
+    overlapping = int((counts > 1).sum())
     
     logger.info(f"  Cidadãos afetados: {affected_count}")
     logger.info(f"  Cidadãos não afetados: {unaffected_count}")
+    if overlapping:
+        logger.info(f"  Em mais de uma área: {overlapping}")
     
     return gdf
 
 
-def generate_affected_citizens(gdf):
+def add_flood_proximity(classified, flooding_gdf, nearest_index, bands=GOLD_RISK_BANDS):
+    """
+    Acrescenta nearest_area_id, distance_to_flood_m e risk_band
+
+    Afetados ficam com a área principal, distância 0 e faixa 'inside'; só os
+    demais consultam o NearestFloodIndex e recebem a faixa pelo primeiro
+    limite de GOLD_RISK_BANDS que a distância não alcança.
+    """
+    affected = classified['affected_by_flooding'].to_numpy()
+    outside = np.flatnonzero(~affected)
+    area_ids = flooding_gdf['area_id'].reset_index(drop=True)
+    labels = np.array(risk_band_labels(bands), dtype=object)
+    
+    nearest, distance = nearest_index.query(classified.geometry.values[outside])
+    nearest_area_id = classified['affected_area_id'].array.copy()
+    nearest_area_id[outside] = area_ids.reindex(nearest).astype('Int64').array
+    distances = np.zeros(len(classified))
+    distances[outside] = distance
+    band = np.full(len(classified), labels[0], dtype=object)
+    band[outside] = labels[1 + np.searchsorted(np.asarray(bands, dtype=float), distance, side='right')]
+    band[outside[np.isnan(distance)]] = None
+    
+    classified['nearest_area_id'] = nearest_area_id
+    classified['distance_to_flood_m'] = distances.round(2)
+    classified['risk_band'] = band
+    
+    counts = pd.Series(band).value_counts()
+    logger.info("  Faixas de risco: " + ", ".join(f"{label}={counts.get(label, 0)}" for label in labels))
+    return classified
+
+
+class FloodDepthSampler:
+    """
+    Amostra um raster de profundidade (GeoTIFF, metros) nas posições dos cidadãos
+
+    O raster nunca é lido inteiro: os pontos do lote são projetados no CRS do
+    raster, convertidos em linha/coluna e agrupados pelo bloco interno (tile ou
+    faixa) do GeoTIFF; cada bloco tocado é lido uma vez, numa janela alinhada
+    ao bloco. Um cache LRU de até GOLD_DEPTH_BLOCK_CACHE blocos evita reler
+    blocos entre lotes. Fora do raster ou em nodata a profundidade é NaN.
+    """
+
+    def __init__(self, path, band=1, cache_blocks=GOLD_DEPTH_BLOCK_CACHE):
+        import rasterio
+        
+        self.dataset = rasterio.open(path)
+        self.band = band
+        self.block_height, self.block_width = self.dataset.block_shapes[band - 1]
+        self.blocks_x = -(-self.dataset.width // self.block_width)
+        self.nodata = self.dataset.nodatavals[band - 1]
+        self.scale = self.dataset.scales[band - 1]
+        self.offset = self.dataset.offsets[band - 1]
+        self.blocks_read = 0
+        self._block = functools.lru_cache(maxsize=max(cache_blocks, 0))(self._read_block)
+        logger.info(
+            f"✓ Raster de profundidade: {path} ({self.dataset.width}x{self.dataset.height}, "
+            f"blocos {self.block_width}x{self.block_height})"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.dataset.close()
+
+    def _read_block(self, block_row, block_col):
+        from rasterio.windows import Window
+        
+        row0, col0 = block_row * self.block_height, block_col * self.block_width
+        window = Window(col0, row0, min(self.block_width, self.dataset.width - col0),
+                        min(self.block_height, self.dataset.height - row0))
+        data = self.dataset.read(self.band, window=window).astype(np.float32)
+        if self.nodata is not None:
+            data[data == self.nodata] = np.nan
+        self.blocks_read += 1
+        return data * self.scale + self.offset
+
+    def sample(self, geometries, crs=None):
+        """Profundidade (m) em cada ponto; NaN fora do raster, em nodata ou em geometria não pontual"""
+        depth = np.full(len(geometries), np.nan)
+        if len(geometries) == 0:
+            return depth
+        points = gpd.GeoSeries(geometries, crs=crs)
+        if crs is not None and self.dataset.crs is not None and points.crs != self.dataset.crs:
+            points = points.to_crs(self.dataset.crs)
+        cols, rows = ~self.dataset.transform * (shapely.get_x(points.values), shapely.get_y(points.values))
+        with np.errstate(invalid='ignore'):
+            rows, cols = np.floor(rows), np.floor(cols)
+            inside = (rows >= 0) & (rows < self.dataset.height) & (cols >= 0) & (cols < self.dataset.width)
+        
+        # Pontos agrupados por bloco: cada bloco é lido uma vez
+        idx = np.flatnonzero(inside)
+        rows, cols = rows[idx].astype(np.int64), cols[idx].astype(np.int64)
+        block = (rows // self.block_height) * self.blocks_x + cols // self.block_width
+        order = np.argsort(block, kind='stable')
+        idx, rows, cols, block = idx[order], rows[order], cols[order], block[order]
+        starts = np.flatnonzero(np.diff(block, prepend=-1))
+        for start, end in zip(starts, np.append(starts[1:], len(block))):
+            block_row, block_col = divmod(int(block[start]), self.blocks_x)
+            data = self._block(block_row, block_col)
+            depth[idx[start:end]] = data[rows[start:end] - block_row * self.block_height,
+                                         cols[start:end] - block_col * self.block_width]
+        return depth
+
+
+def depth_severity(depth, bands=GOLD_DEPTH_BANDS):
+    """Severidade pela profundidade: um limite de GOLD_DEPTH_BANDS entre cada nível de SEVERITY_RANK"""
+    labels = np.array(list(SEVERITY_RANK), dtype=object)
+    if len(bands) != len(labels) - 1:
+        raise ValueError(f"GOLD_DEPTH_BANDS precisa de {len(labels) - 1} limites, recebeu {len(bands)}")
+    severity = labels[np.minimum(np.searchsorted(np.asarray(bands, dtype=float), depth, side='right'), len(labels) - 1)]
+    with np.errstate(invalid='ignore'):
+        severity[~(depth > 0)] = None
+    return severity
+
+
+def add_flood_depth(classified, sampler, bands=GOLD_DEPTH_BANDS):
+    """Acrescenta flood_depth_m (amostrado no raster) e depth_severity (seco/fora do raster: nulo)"""
+    depth = sampler.sample(classified.geometry.values, classified.crs)
+    classified['flood_depth_m'] = depth.round(3)
+    classified['depth_severity'] = depth_severity(depth, bands)
+    
+    flooded = int(np.nansum(depth > 0))
+    logger.info(f"  Profundidade > 0: {flooded} cidadãos (máx {np.nanmax(depth, initial=0):.2f} m)")
+    return classified
+
+
+def generate_affected_citizens(gdf, processing_date=None):
     """
     Extrai cidadãos afetados com informações de área atingida
     """
@@ -81,18 +664,20 @@ def generate_affected_citizens(gdf):
     columns_to_keep = [
         'citizen_id', 'name', 'address', 'phone', 'registration_date',
         'geometry', 'affected_by_flooding', 'affected_area_id',
-        'area_name', 'flood_date', 'severity',
+        'affected_area_ids', 'area_name', 'flood_date', 'max_severity',
+        'nearest_area_id', 'distance_to_flood_m', 'risk_band',
+        'flood_depth_m', 'depth_severity',
         'normalized_date', 'data_quality_score'
     ]
     
     affected = affected[[col for col in columns_to_keep if col in affected.columns]]
-    affected['processing_date'] = pd.Timestamp.now()
+    affected['processing_date'] = processing_date or pd.Timestamp.now()
     
     logger.info(f"✓ Gerado: {len(affected)} cidadãos afetados")
     return affected
 
 
-def generate_unaffected_citizens(gdf):
+def generate_unaffected_citizens(gdf, processing_date=None):
     """
     Extrai cidadãos não afetados
     """
@@ -103,18 +688,19 @@ def generate_unaffected_citizens(gdf):
     # Selecionar colunas relevantes
     columns_to_keep = [
         'citizen_id', 'name', 'address', 'phone', 'registration_date',
-        'geometry', 'affected_by_flooding', 'normalized_date',
-        'data_quality_score'
+        'geometry', 'affected_by_flooding', 'nearest_area_id',
+        'distance_to_flood_m', 'risk_band', 'flood_depth_m',
+        'depth_severity', 'normalized_date', 'data_quality_score'
     ]
     
     unaffected = unaffected[[col for col in columns_to_keep if col in unaffected.columns]]
-    unaffected['processing_date'] = pd.Timestamp.now()
+    unaffected['processing_date'] = processing_date or pd.Timestamp.now()
     
     logger.info(f"✓ Gerado: {len(unaffected)} cidadãos não afetados")
     return unaffected
 
 
-def generate_all_citizens_summary(gdf):
+def generate_all_citizens_summary(gdf, processing_date=None):
     """
     Resume todos os cidadãos com status
     """
@@ -126,11 +712,14 @@ def generate_all_citizens_summary(gdf):
     columns_to_keep = [
         'citizen_id', 'name', 'address', 'phone', 'registration_date',
         'geometry', 'affected_by_flooding', 'affected_area_id',
+        'affected_area_ids', 'max_severity',
+        'nearest_area_id', 'distance_to_flood_m', 'risk_band',
+        'flood_depth_m', 'depth_severity',
         'normalized_date', 'data_quality_score'
     ]
     
     all_citizens = all_citizens[[col for col in columns_to_keep if col in all_citizens.columns]]
-    all_citizens['processing_date'] = pd.Timestamp.now()
+    all_citizens['processing_date'] = processing_date or pd.Timestamp.now()
     
     # Adicionar estatísticas
     logger.info(f"  Total avaliado: {len(all_citizens)}")
@@ -140,14 +729,113 @@ def generate_all_citizens_summary(gdf):
     return all_citizens
 
 
-def save_to_gold(gdf, filename):
-    """Salva dados processados na camada Gold"""
-    filepath = Path(LOCAL_GOLD_PATH) / filename
-    filepath.parent.mkdir(parents=True, exist_ok=True)
-    gdf.to_parquet(str(filepath))
-    logger.info(f"✓ Salvo Gold: {filepath}")
+def build_outputs(classified, processing_date):
+    """Separa cidadãos classificados nos 3 outputs da Gold"""
+    return {
+        'affected': generate_affected_citizens(classified, processing_date),
+        'unaffected': generate_unaffected_citizens(classified, processing_date),
+        'all': generate_all_citizens_summary(classified, processing_date),
+    }
+
+
+def split_spatial_shards(gdf, shards):
+    """
+    Divide um lote em até `shards` partes espacialmente coerentes
+
+    Ordena os pontos pela distância na curva de Hilbert e corta em fatias de
+    tamanho igual: cada shard cobre uma região compacta, com um STRtree de
+    pontos compacto e poucos polígonos candidatos. Retorna as posições (no
+    lote) de cada shard.
+    """
+    shards = max(1, min(shards, len(gdf)))
+    order = np.argsort(gdf.geometry.hilbert_distance().to_numpy(), kind='stable')
+    return np.array_split(order, shards)
+
+
+# Estado de cada processo do pool: motor de batimento com os polígonos já preparados
+_worker_matcher = None
+
+
+def _init_join_worker(flooding_gdf, engine, parts_gdf):
+    """Recebe as áreas de enchente uma vez por worker e monta o motor (polígonos preparados/grade)"""
+    global _worker_matcher
+    logger.setLevel(logging.WARNING)
+    _worker_matcher = build_point_matcher(flooding_gdf, engine, parts_gdf)
+
+
+def _match_worker_shard(geometries):
+    """Pares (cidadão, área) do shard; só geometrias entram e só índices saem do worker"""
+    return _worker_matcher(geometries)
+
+
+def resolve_workers(workers):
+    """GOLD_WORKERS: 0 = todos os núcleos"""
+    return workers if workers and workers > 0 else (os.cpu_count() or 1)
+
+
+@contextmanager
+def spatial_join_engine(flooding_gdf, workers=GOLD_WORKERS, engine=None, parts_gdf=None):
+    """
+    Fornece join(batch) -> (point_idx, area_idx), um par por cidadão/área casados
+
+    `engine` escolhe o motor (GOLD_JOIN_ENGINE: 'strtree', 'grid' ou 'raster'); com
+    `parts_gdf` os testes exatos usam as partes subdivididas das áreas.
+    workers=1 faz o batimento no próprio processo. Acima disso, um pool de
+    processos recebe as áreas (e monta o motor) uma única vez; cada lote é
+    dividido em shards cujas geometrias são testadas em paralelo, e só os
+    pares casados voltam para o processo principal.
+    """
+    engine = engine or GOLD_JOIN_ENGINE
+    workers = resolve_workers(workers)
+    if workers == 1:
+        if engine not in INDEXED_ENGINES:
+            matcher = build_point_matcher(flooding_gdf, engine, parts_gdf)
+            def join(batch):
+                point_idx, area_idx = matcher(batch.geometry.values)
+                logger.info(f"✓ Spatial join completado: {len(point_idx)} pares cidadão/área")
+                return point_idx, area_idx
+            yield join
+            return
+        index = INDEXED_ENGINES[engine](flooding_gdf, parts_gdf=parts_gdf)
+        def join(batch):
+            point_idx, area_idx = index.query(batch.geometry.values)
+            logger.info(
+                f"✓ Spatial join ({engine}): {len(point_idx)} pares cidadão/área, "
+                f"{index.last_exact} teste(s) exato(s)"
+            )
+            return point_idx, area_idx
+        yield join
+        return
     
-    # Upload S3 (opcional)
+    logger.info(f"Pool de {workers} processos ({GOLD_SHARDS_PER_WORKER} shard(s) por worker e lote, motor {engine})")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_join_worker, initargs=(flooding_gdf, engine, parts_gdf)) as pool:
+        def join(batch):
+            shards = split_spatial_shards(batch, workers * GOLD_SHARDS_PER_WORKER)
+            geometries = batch.geometry.values
+            matches = pool.map(_match_worker_shard, [geometries[positions] for positions in shards])
+            pairs = [(positions[local[0]], local[1]) for positions, local in zip(shards, matches)]
+            point_idx = np.concatenate([p for p, _ in pairs])
+            area_idx = np.concatenate([a for _, a in pairs])
+            logger.info(f"✓ Spatial join paralelo: {len(point_idx)} pares cidadão/área ({len(shards)} shards)")
+            return point_idx, area_idx
+        yield join
+
+
+class GoldParquetWriter(GeoParquetWriter):
+    """Escrita incremental de um arquivo da Gold (schema GOLD_COLUMN_TYPES), com upload ao fechar"""
+
+    def __init__(self, filename, crs=None):
+        super().__init__(Path(LOCAL_GOLD_PATH) / filename, GOLD_COLUMN_TYPES, crs)
+        self.filename = filename
+
+    def close(self):
+        super().close()
+        logger.info(f"✓ Salvo Gold: {self.filepath} ({self.rows} registros)")
+        upload_to_gold(self.filepath, self.filename)
+
+
+def upload_to_gold(filepath, filename):
+    """Upload S3 (opcional) de um arquivo da Gold"""
     try:
         import boto3
         s3 = boto3.client('s3')
@@ -158,37 +846,614 @@ def save_to_gold(gdf, filename):
         logger.warning(f"⚠ Upload S3 falhou: {e}")
 
 
-def process_gold():
+STATE_CITIZENS_FILE = 'citizens.parquet'
+STATE_FLOODING_FILE = 'flooding_areas.parquet'
+
+
+def geometry_hashes(gdf):
+    """Hash de 64 bits do WKB de cada geometria (detecta cidadão que mudou de lugar)"""
+    wkb = shapely.to_wkb(gdf.geometry.values, hex=True)
+    return pd.util.hash_array(wkb.astype(object)).view('int64')
+
+
+def load_gold_state():
+    """
+    Estado da última execução da Gold (None se não existir)
+
+    Cidadãos ficam em arrays numpy ordenados por citizen_id, com as listas de
+    áreas achatadas (offsets + valores): poucos bytes por cidadão.
+    """
+    citizens_path = Path(GOLD_STATE_PATH) / STATE_CITIZENS_FILE
+    flooding_path = Path(GOLD_STATE_PATH) / STATE_FLOODING_FILE
+    if not (citizens_path.exists() and flooding_path.exists()):
+        return None
+    
+    table = pq.read_table(citizens_path)
+    order = np.argsort(table.column('citizen_id').to_numpy(), kind='stable')
+    table = table.take(order)
+    area_lists = table.column('affected_area_ids').combine_chunks()
+    state = {
+        'citizen_id': table.column('citizen_id').to_numpy(),
+        'geometry_hash': table.column('geometry_hash').to_numpy(),
+        'offsets': area_lists.offsets.to_numpy(),
+        'area_ids': area_lists.values.to_numpy(),
+        'flooding': gpd.read_parquet(flooding_path),
+    }
+    logger.info(f"✓ Estado Gold: {len(state['citizen_id'])} cidadãos, {len(state['flooding'])} polígonos")
+    return state
+
+
+def changed_flood_regions(previous_gdf, current_gdf):
+    """
+    Bboxes dos polígonos incluídos, removidos ou com geometria alterada
+
+    Mudanças só de atributos (nome, data, severidade) não exigem novo batimento:
+    a classificação relê esses atributos da tabela atual de áreas.
+    """
+    previous = pd.Series(shapely.to_wkb(previous_gdf.geometry.values), index=previous_gdf['area_id'].to_numpy())
+    current = pd.Series(shapely.to_wkb(current_gdf.geometry.values), index=current_gdf['area_id'].to_numpy())
+    
+    added = current.index.difference(previous.index)
+    removed = previous.index.difference(current.index)
+    common = current.index.intersection(previous.index)
+    modified = common[current[common].to_numpy() != previous[common].to_numpy()]
+    logger.info(f"  Polígonos: {len(added)} incluídos, {len(removed)} removidos, {len(modified)} alterados")
+    
+    changed = np.concatenate([
+        current_gdf.geometry.values[current_gdf['area_id'].isin(added.union(modified)).to_numpy()],
+        previous_gdf.geometry.values[previous_gdf['area_id'].isin(removed.union(modified)).to_numpy()],
+    ])
+    return shapely.box(*shapely.bounds(changed).T) if len(changed) else np.array([], dtype=object)
+
+
+def carried_forward_pairs(state, citizens_gdf, hashes, dirty_regions, flooding_gdf):
+    """
+    Separa o lote em cidadãos reaproveitados do estado e cidadãos a reclassificar
+
+    Reaproveitado = citizen_id já no estado, mesmo hash de geometria e fora dos
+    bboxes alterados. Retorna (máscara de reaproveitados, point_idx, area_idx)
+    com os pares dos reaproveitados reconstruídos a partir do estado.
+    """
+    n = len(citizens_gdf)
+    ids = citizens_gdf['citizen_id'].to_numpy()
+    if len(state['citizen_id']):
+        slot = np.minimum(np.searchsorted(state['citizen_id'], ids), len(state['citizen_id']) - 1)
+        carried = (state['citizen_id'][slot] == ids) & (state['geometry_hash'][slot] == hashes)
+    else:
+        slot = np.zeros(n, dtype=np.intp)
+        carried = np.zeros(n, dtype=bool)
+    
+    if len(dirty_regions):
+        in_region, _ = shapely.STRtree(dirty_regions).query(citizens_gdf.geometry.values, predicate='intersects')
+        carried[in_region] = False
+    
+    positions = np.flatnonzero(carried)
+    owners, value_idx = expand_csr(state['offsets'], slot[positions])
+    point_idx = positions[owners]
+    
+    # area_id do estado -> posição na tabela atual de áreas
+    area_positions = pd.Series(np.arange(len(flooding_gdf)), index=flooding_gdf['area_id'].to_numpy())
+    area_idx = area_positions.reindex(state['area_ids'][value_idx]).to_numpy()
+    present = ~np.isnan(area_idx)
+    return carried, point_idx[present], area_idx[present].astype(np.intp)
+
+
+class GoldStateWriter:
+    """Grava o novo estado incremental (substitui o anterior só ao final)"""
+
+    def __init__(self, flooding_gdf):
+        self.path = Path(GOLD_STATE_PATH)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.flooding_gdf = flooding_gdf
+        self._tmp = self.path / f"{STATE_CITIZENS_FILE}.tmp"
+        self._writer = None
+
+    def write(self, classified, hashes):
+        table = pa.table({
+            'citizen_id': pa.array(classified['citizen_id'].to_numpy(), type=pa.int64()),
+            'geometry_hash': pa.array(hashes, type=pa.int64()),
+            'affected_area_ids': pa.array(classified['affected_area_ids'], type=pa.list_(pa.int32())),
+        })
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(str(self._tmp), table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        self.flooding_gdf[['area_id', self.flooding_gdf.geometry.name]].to_parquet(
+            str(self.path / STATE_FLOODING_FILE)
+        )
+        os.replace(self._tmp, self.path / STATE_CITIZENS_FILE)
+        logger.info(f"✓ Estado Gold salvo: {self.path}")
+
+
+# ====== HISTÓRICO DE EVENTOS (BATIMENTO ESPAÇO-TEMPORAL) ======
+
+# Partições do histórico: <GOLD_HISTORY_PATH>/event_date=AAAA-MM-DD/part-0.parquet
+HISTORY_PARTITIONING = ds.partitioning(pa.schema([('event_date', pa.date32())]), flavor='hive')
+HISTORY_SCHEMA = pa.schema([
+    ('citizen_id', pa.int64()),
+    ('area_id', pa.int64()),
+    ('area_name', pa.string()),
+    ('severity', pa.string()),
+])
+
+
+def flood_event_dates(flooding_gdf):
+    """Data do evento (flood_date sem hora) de cada área, como 'AAAA-MM-DD' (None se sem data)"""
+    dates = pd.to_datetime(flooding_gdf['flood_date']).dt.normalize()
+    return dates.dt.strftime('%Y-%m-%d').where(dates.notna(), None).to_numpy(dtype=object)
+
+
+def _fingerprint(hashes):
+    """Combina hashes de linhas (uint64) num hex independente da ordem"""
+    return format(int(np.sum(hashes, dtype=np.uint64)), '016x')
+
+
+def event_fingerprints(flooding_gdf, event_dates):
+    """Impressão digital de cada evento: área, nome, severidade e WKB dos seus polígonos"""
+    content = pd.DataFrame({
+        'area_id': flooding_gdf['area_id'].to_numpy(),
+        'area_name': flooding_gdf['area_name'].astype(object).to_numpy(),
+        'severity': flooding_gdf['severity'].astype(object).to_numpy(),
+        'geometry': shapely.to_wkb(flooding_gdf.geometry.values, hex=True).astype(object),
+    })
+    hashes = pd.util.hash_pandas_object(content, index=False).to_numpy()
+    return {date: _fingerprint(hashes[event_dates == date]) for date in sorted(set(event_dates))}
+
+
+def citizens_fingerprint(filename):
+    """
+    Impressão digital da população (citizen_id + WKB), lida sem decodificar geometrias
+
+    Percorre o arquivo em lotes de GOLD_BATCH_SIZE acumulando a soma dos hashes
+    (a mesma de _fingerprint): a memória fica limitada a um lote.
+    """
+    parquet = pq.ParquetFile(Path(LOCAL_SILVER_PATH) / filename)
+    total = np.zeros(1, dtype=np.uint64)  # soma com módulo 2**64, como em _fingerprint
+    for batch in parquet.iter_batches(batch_size=GOLD_BATCH_SIZE, columns=['citizen_id', 'geometry']):
+        content = pd.DataFrame({
+            'citizen_id': batch.column('citizen_id').to_numpy(zero_copy_only=False),
+            'geometry': batch.column('geometry').to_numpy(zero_copy_only=False),
+        })
+        total += np.sum(pd.util.hash_pandas_object(content, index=False).to_numpy(), dtype=np.uint64)
+    return _fingerprint(total)
+
+
+def flood_event_rows(citizens_gdf, flooding_gdf, event_dates, point_idx, area_idx):
+    """Linhas do histórico (cidadão × área) e a data do evento de cada uma"""
+    rows = pd.DataFrame({
+        'citizen_id': citizens_gdf['citizen_id'].to_numpy()[point_idx],
+        'area_id': flooding_gdf['area_id'].to_numpy()[area_idx],
+        'area_name': flooding_gdf['area_name'].astype(object).to_numpy()[area_idx],
+        'severity': flooding_gdf['severity'].astype(object).to_numpy()[area_idx],
+    })
+    return rows, event_dates[area_idx]
+
+
+class FloodHistoryWriter:
+    """
+    Grava uma partição por evento recalculado (substitui a anterior só ao final)
+
+    Cada evento é escrito num arquivo oculto da própria partição, renomeado
+    em close(); eventos sem nenhum cidadão ganham uma partição vazia.
+    """
+
+    def __init__(self, path, event_dates):
+        self.path = Path(path)
+        self.event_dates = list(event_dates)
+        self.rows = 0
+        self._writers = {}
+
+    def _tmp(self, date):
+        partition = self.path / f"event_date={date}"
+        partition.mkdir(parents=True, exist_ok=True)
+        return partition / '.part-0.parquet.tmp'
+
+    def write(self, rows, dates):
+        for date in np.unique(dates):
+            table = pa.Table.from_pandas(rows[dates == date], schema=HISTORY_SCHEMA, preserve_index=False)
+            if date not in self._writers:
+                self._writers[date] = pq.ParquetWriter(str(self._tmp(date)), HISTORY_SCHEMA)
+            self._writers[date].write_table(table)
+            self.rows += len(table)
+
+    def close(self):
+        for date in self.event_dates:
+            if date in self._writers:
+                self._writers.pop(date).close()
+            else:
+                pq.write_table(HISTORY_SCHEMA.empty_table(), str(self._tmp(date)))
+            os.replace(self._tmp(date), self.path / f"event_date={date}" / 'part-0.parquet')
+
+
+def process_flood_history(batch_size=GOLD_BATCH_SIZE, workers=GOLD_WORKERS):
+    """
+    Histórico de eventos por cidadão: batimento espaço-temporal incremental
+
+    Cada flood_date distinta é um evento (fatia temporal dos polígonos). Um
+    manifesto guarda a impressão digital de cada evento e da população; só
+    eventos novos ou alterados são batidos contra os cidadãos (todos, se a
+    população mudou) e regravados, os demais ficam como estão. Retorna um
+    resumo com as contagens.
+    """
+    logger.info("=" * 60)
+    logger.info("GOLD PROCESSOR - Histórico de eventos")
+    logger.info("=" * 60)
+    
+    flooding_silver = load_from_silver(f"silver_flooding_areas_porto_alegre.parquet")
+    flooding_parts = load_flood_parts(flooding_silver)
+    event_dates = flood_event_dates(flooding_silver)
+    undated = pd.isna(event_dates)
+    if undated.any():
+        logger.warning(f"⚠ {int(undated.sum())} área(s) sem flood_date fora do histórico")
+        flooding_silver = flooding_silver[~undated].reset_index(drop=True)
+        event_dates = event_dates[~undated]
+    
+    history_path = Path(GOLD_HISTORY_PATH)
+    history_path.mkdir(parents=True, exist_ok=True)
+    manifest_path = history_path / FLOOD_HISTORY_MANIFEST_FILE
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    
+    citizens = citizens_fingerprint(f"silver_citizens_data.parquet")
+    events = event_fingerprints(flooding_silver, event_dates)
+    previous = manifest.get('events', {}) if manifest.get('citizens') == citizens else {}
+    dirty = [date for date, fingerprint in events.items() if previous.get(date) != fingerprint]
+    removed = sorted(set(manifest.get('events', {})) - set(events))
+    
+    for date in removed:
+        shutil.rmtree(history_path / f"event_date={date}", ignore_errors=True)
+    
+    writer = FloodHistoryWriter(history_path, dirty)
+    if dirty:
+        logger.info(f"Eventos a recalcular: {len(dirty)} de {len(events)} ({', '.join(dirty)})")
+        in_dirty = np.isin(event_dates, dirty)
+        dirty_flooding = flooding_silver[in_dirty].reset_index(drop=True)
+        dirty_dates = event_dates[in_dirty]
+        dirty_parts = None if flooding_parts is None else \
+            flooding_parts[flooding_parts['area_id'].isin(dirty_flooding['area_id'])]
+        
+        with spatial_join_engine(dirty_flooding, workers, parts_gdf=dirty_parts) as join:
+            for citizens_batch in iter_silver_batches(f"silver_citizens_data.parquet", batch_size):
+                point_idx, area_idx = join(citizens_batch)
+                writer.write(*flood_event_rows(citizens_batch, dirty_flooding, dirty_dates, point_idx, area_idx))
+    writer.close()
+    
+    tmp = manifest_path.with_suffix('.tmp')
+    tmp.write_text(json.dumps({'citizens': citizens, 'events': events}, indent=2))
+    os.replace(tmp, manifest_path)
+    
+    summary = {'events': len(events), 'recomputed': len(dirty), 'removed': len(removed), 'rows': writer.rows}
+    logger.info(
+        f"✓ Histórico: {summary['events']} evento(s), {summary['recomputed']} recalculado(s), "
+        f"{summary['removed']} removido(s), {summary['rows']} linha(s) gravada(s)"
+    )
+    return summary
+
+
+def load_flood_history(start=None, end=None, columns=None):
+    """
+    Lê o histórico de eventos (cidadão × área × event_date) entre `start` e `end`
+
+    O filtro de datas poda partições inteiras; só os eventos do intervalo são lidos.
+    """
+    dataset = ds.dataset(GOLD_HISTORY_PATH, format='parquet', partitioning=HISTORY_PARTITIONING)
+    predicate = None
+    if start is not None:
+        predicate = ds.field('event_date') >= pd.Timestamp(start).date()
+    if end is not None:
+        until = ds.field('event_date') <= pd.Timestamp(end).date()
+        predicate = until if predicate is None else predicate & until
+    return dataset.to_table(columns=columns, filter=predicate).to_pandas(date_as_object=False)
+
+
+def citizens_affected_between(start=None, end=None):
+    """Cidadãos atingidos por algum evento no intervalo: nº de eventos, primeiro e último"""
+    history = load_flood_history(start, end, columns=['citizen_id', 'event_date'])
+    return history.groupby('citizen_id')['event_date'].agg(
+        events='nunique', first_event='min', last_event='max'
+    ).reset_index()
+
+
+def process_gold(batch_size=GOLD_BATCH_SIZE, workers=GOLD_WORKERS, mode=GOLD_MODE):
     """
     Orquestrador: processamento geoespacial completo
+
+    Os polígonos das áreas de enchente são preparados uma vez (por worker);
+    os cidadãos são lidos da Silver, classificados (incluindo área mais
+    próxima, distância e faixa de risco) e anexados aos 3 arquivos Gold lote
+    a lote. Retorna um resumo com as contagens.
+
+    mode='incremental' refaz o batimento só dos cidadãos afetados pelas
+    mudanças desde a última execução (sem estado, cai para 'full'); a
+    distância à área mais próxima é recalculada para todos (O(n·log m)).
     """
     logger.info("=" * 60)
     logger.info("GOLD PROCESSOR - Batimento geográfico")
     logger.info("=" * 60)
     
-    # Carregar dados normalizados da Silver
+    # Áreas de enchente são poucas: carregadas inteiras, preparadas uma vez
     flooding_silver = load_from_silver(f"silver_flooding_areas_porto_alegre.parquet")
-    citizens_silver = load_from_silver(f"silver_citizens_data.parquet")
+    flooding_parts = load_flood_parts(flooding_silver)
+    nearest_index = NearestFloodIndex(flooding_silver)
+    logger.info(f"✓ Áreas de enchente carregadas: {len(flooding_silver)} áreas")
+    
+    state = load_gold_state() if mode == 'incremental' else None
+    if mode == 'incremental' and state is None:
+        logger.warning("⚠ Sem estado Gold anterior: processamento completo")
+    dirty_regions = changed_flood_regions(state['flooding'], flooding_silver) if state else None
+    state_writer = GoldStateWriter(flooding_silver)
     
-    # Realizar batimento geográfico
-    spatial_joined = perform_spatial_join(flooding_silver, citizens_silver)
-    classified = classify_citizens(spatial_joined, flooding_silver)
+    writers = {
+        'affected': GoldParquetWriter(AFFECTED_CITIZENS_FILE, flooding_silver.crs),
+        'unaffected': GoldParquetWriter(UNAFFECTED_CITIZENS_FILE, flooding_silver.crs),
+        'all': GoldParquetWriter(ALL_CITIZENS_FILE, flooding_silver.crs),
+    }
+    processing_date = pd.Timestamp.now()
+    batches = 0
+    reclassified = 0
     
-    # Gerar outputs
-    affected = generate_affected_citizens(classified)
-    unaffected = generate_unaffected_citizens(classified)
-    all_summary = generate_all_citizens_summary(classified)
+    if FLOOD_DEPTH_RASTER:
+        depth_severity(np.array([]))  # valida GOLD_DEPTH_BANDS antes de processar
+    depth_source = FloodDepthSampler(FLOOD_DEPTH_RASTER) if FLOOD_DEPTH_RASTER else nullcontext()
     
-    # Salvar em Gold
-    save_to_gold(affected, AFFECTED_CITIZENS_FILE)
-    save_to_gold(unaffected, UNAFFECTED_CITIZENS_FILE)
-    save_to_gold(all_summary, ALL_CITIZENS_FILE)
+    with spatial_join_engine(flooding_silver, workers, parts_gdf=flooding_parts) as join, \
+            depth_source as depth_sampler:
+        for citizens_batch in iter_silver_batches(f"silver_citizens_data.parquet", batch_size):
+            batches += 1
+            logger.info(f"Lote {batches}: {len(citizens_batch)} cidadãos")
+            hashes = geometry_hashes(citizens_batch)
+            
+            # Batimento geográfico (só dos cidadãos que mudaram, no modo incremental)
+            if state:
+                carried, point_idx, area_idx = carried_forward_pairs(
+                    state, citizens_batch, hashes, dirty_regions, flooding_silver
+                )
+                dirty = np.flatnonzero(~carried)
+                if len(dirty):
+                    dirty_points, dirty_areas = join(citizens_batch.iloc[dirty])
+                    point_idx = np.concatenate([point_idx, dirty[dirty_points]])
+                    area_idx = np.concatenate([area_idx, dirty_areas])
+                reclassified += len(dirty)
+            else:
+                point_idx, area_idx = join(citizens_batch)
+                reclassified += len(citizens_batch)
+            
+            # Classificação e anexação dos outputs em Gold
+            classified = classify_citizens(citizens_batch, flooding_silver, point_idx, area_idx)
+            classified = add_flood_proximity(classified, flooding_silver, nearest_index)
+            if depth_sampler is not None:
+                classified = add_flood_depth(classified, depth_sampler)
+            state_writer.write(classified, hashes)
+            for name, gdf in build_outputs(classified, processing_date).items():
+                writers[name].write(gdf)
+    
+    for writer in writers.values():
+        writer.close()
+    state_writer.close()
+    if depth_sampler is not None:
+        logger.info(f"✓ Raster de profundidade: {depth_sampler.blocks_read} bloco(s) lido(s)")
+    
+    summary = {
+        'batches': batches,
+        'affected': writers['affected'].rows,
+        'unaffected': writers['unaffected'].rows,
+        'total': writers['all'].rows,
+        'reclassified': reclassified,
+    }
+    if GOLD_FLOOD_HISTORY:
+        summary['history'] = process_flood_history(batch_size, workers)
     
     logger.info("=" * 60)
-    logger.info("✓ Gold layer pronta!")
+    logger.info(
+        f"✓ Gold layer pronta! ({batches} lote(s), {summary['total']} avaliados, "
+        f"{reclassified} reclassificados)"
+    )
     logger.info("=" * 60)
     
-    return affected, unaffected, all_summary
+    return summary
+
+
+def scaling_report(worker_counts, batch_size=GOLD_BATCH_SIZE):
+    """
+    Relatório de escalabilidade: throughput do batimento por número de workers
+
+    Classifica a Silver inteira (sem gravar a Gold) para cada contagem de
+    workers, incluindo a subida do pool, e registra tempo, cidadãos/s, speedup
+    e eficiência em relação a 1 worker.
+    """
+    flooding_silver = load_from_silver(f"silver_flooding_areas_porto_alegre.parquet")
+    flooding_parts = load_flood_parts(flooding_silver)
+    processing_date = pd.Timestamp.now()
+    gold_logger_level = logger.level
+    report = []
+    
+    for workers in worker_counts:
+        workers = resolve_workers(workers)
+        citizens = 0
+        logger.setLevel(logging.WARNING)
+        started = time.perf_counter()
+        with spatial_join_engine(flooding_silver, workers, parts_gdf=flooding_parts) as join:
+            for citizens_batch in iter_silver_batches(f"silver_citizens_data.parquet", batch_size):
+                citizens += len(citizens_batch)
+                classified = classify_citizens(citizens_batch, flooding_silver, *join(citizens_batch))
+                build_outputs(classified, processing_date)
+        elapsed = time.perf_counter() - started
+        logger.setLevel(gold_logger_level)
+        report.append({'workers': workers, 'citizens': citizens, 'seconds': elapsed})
+    
+    baseline = next((row['seconds'] for row in report if row['workers'] == 1), report[0]['seconds'])
+    logger.info("=" * 60)
+    logger.info("ESCALABILIDADE - Batimento geográfico paralelo")
+    logger.info(f"{'workers':>8} {'tempo (s)':>10} {'cidadãos/s':>12} {'speedup':>8} {'eficiência':>10}")
+    for row in report:
+        row['throughput'] = row['citizens'] / row['seconds'] if row['seconds'] else 0.0
+        row['speedup'] = baseline / row['seconds'] if row['seconds'] else 0.0
+        row['efficiency'] = row['speedup'] / row['workers']
+        logger.info(
+            f"{row['workers']:>8} {row['seconds']:>10.2f} {row['throughput']:>12.0f} "
+            f"{row['speedup']:>7.2f}x {row['efficiency']:>9.0%}"
+        )
+    logger.info("=" * 60)
+    return report
+
+
+def benchmark_join_engines(batch_size=GOLD_BATCH_SIZE, engines=('strtree', 'grid', 'raster')):
+    """
+    Compara os motores de batimento com o gpd.sjoin simples sobre a mesma Silver
+
+    Mede construção do índice e tempo de batimento (sem classificação nem
+    escrita) e confere se cada motor produz exatamente os mesmos pares
+    cidadão/área do sjoin.
+    """
+    flooding_silver = load_from_silver(f"silver_flooding_areas_porto_alegre.parquet")
+    batches = list(iter_silver_batches(f"silver_citizens_data.parquet", batch_size))
+    citizens = sum(len(batch) for batch in batches)
+    
+    def as_pairs(results):
+        """Pares de todos os lotes como chaves int64 ordenadas (fora da medição de tempo)"""
+        keys, offset = [], 0
+        for batch, (point_idx, area_idx) in zip(batches, results):
+            keys.append((point_idx.astype(np.int64) + offset) * len(flooding_silver) + area_idx)
+            offset += len(batch)
+        return np.sort(np.concatenate(keys)) if keys else np.array([], dtype=np.int64)
+    
+    started = time.perf_counter()
+    results = []
+    for batch in batches:
+        joined = gpd.sjoin(batch, flooding_silver, how='left', predicate='within')
+        matched = joined['index_right'].notna().to_numpy()
+        positions = batch.index.get_indexer(joined.index[matched])
+        results.append((positions, joined['index_right'].to_numpy()[matched].astype(np.intp)))
+    report = [{'engine': 'gpd.sjoin', 'build': 0.0, 'seconds': time.perf_counter() - started, 'exact': citizens, 'match': True}]
+    expected = as_pairs(results)
+    
+    for engine in engines:
+        started = time.perf_counter()
+        flooding = flooding_silver.copy()
+        flooding.geometry = shapely.from_wkb(shapely.to_wkb(flooding.geometry.values))  # sem preparo prévio
+        index = INDEXED_ENGINES[engine](flooding) if engine in INDEXED_ENGINES else None
+        flood = FloodPolygons(flooding)
+        build = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        results, exact = [], 0
+        for batch in batches:
+            if index is not None:
+                results.append(index.query(batch.geometry.values))
+                exact += index.last_exact
+            else:
+                results.append(match_points_within(flood, batch.geometry.values))
+                exact += len(batch)
+        report.append({
+            'engine': engine, 'build': build, 'seconds': time.perf_counter() - started,
+            'exact': exact, 'match': np.array_equal(as_pairs(results), expected),
+        })
+    
+    logger.info("=" * 60)
+    logger.info(f"MOTORES DE BATIMENTO - {citizens} cidadãos, {len(flooding_silver)} áreas")
+    logger.info(f"{'motor':>10} {'índice (s)':>10} {'batimento (s)':>13} {'cidadãos/s':>12} {'exatos':>8} {'pares ok':>8}")
+    for row in report:
+        row['throughput'] = citizens / row['seconds'] if row['seconds'] else 0.0
+        logger.info(
+            f"{row['engine']:>10} {row['build']:>10.2f} {row['seconds']:>13.2f} {row['throughput']:>12.0f} "
+            f"{row['exact'] / max(citizens, 1):>8.1%} {'sim' if row['match'] else 'NÃO':>8}"
+        )
+    logger.info("=" * 60)
+    return report
+
+
+def benchmark_subdivision(vertices=20000, max_vertices=(64, 256, 1024), batch_size=GOLD_BATCH_SIZE):
+    """
+    Compara o batimento contra um polígono inteiro e contra suas partes
+
+    Gera um polígono sintético de `vertices` vértices (contorno irregular sobre
+    a extensão dos cidadãos da Silver), subdivide com cada limite de
+    `max_vertices` e mede subdivisão e batimento, conferindo os pares.
+    """
+    from etl.silver_processor import subdivide_flooding_areas
+    
+    batches = list(iter_silver_batches(f"silver_citizens_data.parquet", batch_size))
+    citizens = sum(len(batch) for batch in batches)
+    xmin, ymin, xmax, ymax = shapely.total_bounds(np.concatenate([batch.geometry.values for batch in batches]))
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    radius = 0.45 * (1 + 0.3 * np.sin(angles * 37) + 0.1 * np.random.default_rng(0).random(vertices))
+    ring = np.column_stack([
+        (xmin + xmax) / 2 + radius * (xmax - xmin) / 2 * np.cos(angles),
+        (ymin + ymax) / 2 + radius * (ymax - ymin) / 2 * np.sin(angles),
+    ])
+    flooding = gpd.GeoDataFrame({'area_id': [1]}, geometry=[shapely.make_valid(shapely.Polygon(ring))],
+                                crs=batches[0].crs if batches else None)
+    
+    def run(flood):
+        started = time.perf_counter()
+        pairs = set()
+        offset = 0
+        for batch in batches:
+            point_idx, area_idx = match_points_within(flood, batch.geometry.values)
+            pairs |= set(zip((point_idx + offset).tolist(), area_idx.tolist()))
+            offset += len(batch)
+        return pairs, time.perf_counter() - started
+    
+    expected, seconds = run(FloodPolygons(flooding))
+    report = [{'max_vertices': 0, 'parts': 1, 'build': 0.0, 'seconds': seconds, 'match': True}]
+    for limit in max_vertices:
+        started = time.perf_counter()
+        parts = subdivide_flooding_areas(flooding, limit)
+        flood = FloodPolygons(flooding, parts)
+        build = time.perf_counter() - started
+        pairs, seconds = run(flood)
+        report.append({'max_vertices': limit, 'parts': len(parts), 'build': build, 'seconds': seconds,
+                       'match': pairs == expected})
+    
+    logger.info("=" * 60)
+    logger.info(f"SUBDIVISÃO - {citizens} cidadãos, polígono de {vertices} vértices ({len(expected)} dentro)")
+    logger.info(f"{'vértices':>10} {'partes':>8} {'subdivisão (s)':>14} {'batimento (s)':>13} {'pares ok':>8}")
+    for row in report:
+        logger.info(
+            f"{row['max_vertices'] or 'inteiro':>10} {row['parts']:>8} {row['build']:>14.2f} "
+            f"{row['seconds']:>13.2f} {'sim' if row['match'] else 'NÃO':>8}"
+        )
+    logger.info("=" * 60)
+    return report
+
+
+def benchmark_depth_sampling(path=FLOOD_DEPTH_RASTER, batch_size=GOLD_BATCH_SIZE, check_points=2000):
+    """
+    Mede a amostragem do raster de profundidade sobre a Silver inteira
+
+    Registra tempo, blocos lidos e blocos do raster, e confere os primeiros
+    `check_points` cidadãos contra o dataset.sample do rasterio (ponto a ponto).
+    """
+    started = time.perf_counter()
+    citizens, matches = 0, True
+    with FloodDepthSampler(path) as sampler:
+        for citizens_batch in iter_silver_batches(f"silver_citizens_data.parquet", batch_size):
+            depth = sampler.sample(citizens_batch.geometry.values, citizens_batch.crs)
+            if citizens == 0 and check_points:
+                points = citizens_batch.geometry.iloc[:check_points]
+                if citizens_batch.crs is not None and sampler.dataset.crs is not None:
+                    points = points.to_crs(sampler.dataset.crs)
+                expected = np.array([
+                    value[0] for value in sampler.dataset.sample(zip(points.x, points.y), masked=True)
+                ], dtype=object)
+                expected = np.array([np.nan if value is np.ma.masked else float(value) for value in expected])
+                expected = expected * sampler.scale + sampler.offset
+                matches = np.allclose(depth[:len(expected)], expected, equal_nan=True, rtol=1e-6)
+            citizens += len(citizens_batch)
+        seconds = time.perf_counter() - started
+        total_blocks = sampler.blocks_x * -(-sampler.dataset.height // sampler.block_height)
+        blocks_read = sampler.blocks_read
+    
+    logger.info("=" * 60)
+    logger.info(f"PROFUNDIDADE - {citizens} cidadãos em {seconds:.2f}s ({citizens / max(seconds, 1e-9):.0f}/s)")
+    logger.info(f"  Blocos lidos: {blocks_read} de {total_blocks} no raster")
+    logger.info(f"  Confere com dataset.sample: {'sim' if matches else 'NÃO'}")
+    logger.info("=" * 60)
+    return {'citizens': citizens, 'seconds': seconds, 'blocks_read': blocks_read,
+            'total_blocks': total_blocks, 'match': matches}
 
 
 if __name__ == '__main__':
@@ -196,4 +1461,22 @@ if __name__ == '__main__':
         level=logging.INFO,
         format='%(asctime)s - %(levelname)s - %(message)s'
     )
-    process_gold()
+    # Escalabilidade: python etl/gold_processor.py scaling 1 2 4 8 16
+    # Motores: python etl/gold_processor.py engines
+    # Subdivisão: python etl/gold_processor.py subdivide 20000
+    # Histórico: python etl/gold_processor.py history [início fim]
+    # Raster de profundidade: python etl/gold_processor.py depth flood_depth.tif
+    if sys.argv[1:2] == ['scaling']:
+        scaling_report([int(n) for n in sys.argv[2:]] or [1, 2, 4, 8, 16])
+    elif sys.argv[1:2] == ['engines']:
+        benchmark_join_engines()
+    elif sys.argv[1:2] == ['history']:
+        process_flood_history()
+        if sys.argv[2:]:
+            print(citizens_affected_between(*sys.argv[2:4]).to_string(index=False))
+    elif sys.argv[1:2] == ['depth']:
+        benchmark_depth_sampling(*sys.argv[2:3])
+    elif sys.argv[1:2] == ['subdivide']:
+        benchmark_subdivision(*[int(n) for n in sys.argv[2:3]])
+    else:
+        process_gold()
@@ -5,17 +5,39 @@ Cria tabelas no PostGIS:
 - flooding_areas - polígonos de enchentes
 - citizens - pontos de cidadãos
 - citizens_affected_by_flood - vista com cidadãos afetados
+
+Métodos de carga (POSTGIS_LOAD_METHOD):
+- copy   - COPY binário em lotes a partir dos GeoParquets (geometria em EWKB)
+- insert - um INSERT por linha (legado, mantido para benchmark)
+
+Modos de recarga (POSTGIS_LOAD_MODE):
+- replace - DELETE + recarga nas tabelas publicadas
+- swap    - carga em tabelas de staging, índices + ANALYZE, rename atômico
+- upsert  - diferencial por citizen_id (row_hash), envia só o que mudou
 """
 
+import io
+import json
+import struct
+import sys
+import time
+
 import geopandas as gpd
+import numpy as np
+import pandas as pd
 import psycopg2
+import pyarrow.parquet as pq
+import shapely
 from psycopg2.extras import execute_values
 import logging
 from pathlib import Path
 from config import (
-    LOCAL_GOLD_PATH, RDS_HOST, RDS_PORT, RDS_DATABASE,
-    RDS_USER, RDS_PASSWORD,
-    AFFECTED_CITIZENS_FILE, UNAFFECTED_CITIZENS_FILE, ALL_CITIZENS_FILE
+    LOCAL_GOLD_PATH, LOCAL_SILVER_PATH, RDS_HOST, RDS_PORT, RDS_DATABASE,
+    RDS_USER, RDS_PASSWORD, FLOODING_AREAS_FILE,
+    POSTGIS_LOAD_METHOD, POSTGIS_COPY_BATCH_SIZE, POSTGIS_LOAD_MODE,
+    POSTGIS_SWAP_LOCK_TIMEOUT, POSTGIS_SWAP_RETRIES,
+    AFFECTED_CITIZENS_FILE, UNAFFECTED_CITIZENS_FILE, ALL_CITIZENS_FILE,
+    FLOOD_SUBDIVIDE_MAX_VERTICES, GOLD_HISTORY_PATH, FLOOD_HISTORY_MANIFEST_FILE
 )
 
 logger = logging.getLogger(__name__)
@@ -38,41 +60,194 @@ def get_db_connection():
         return None
 
 
+# DDL parametrizado pelo nome da tabela (usado também pelas tabelas de staging)
+FLOODING_AREAS_DDL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        area_id SERIAL PRIMARY KEY,
+        area_name VARCHAR(255),
+        flood_date DATE,
+        severity VARCHAR(50),
+        affected_population INTEGER,
+        geometry GEOMETRY(POLYGON, 4326),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+CITIZENS_DDL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        citizen_id INTEGER PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        address TEXT,
+        phone VARCHAR(20),
+        registration_date DATE,
+        geometry GEOMETRY(POINT, 4326),
+        affected_by_flooding BOOLEAN DEFAULT FALSE,
+        nearest_area_id INTEGER,
+        distance_to_flood_m DOUBLE PRECISION,
+        risk_band VARCHAR(50),
+        row_hash BIGINT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Partes de até FLOOD_SUBDIVIDE_MAX_VERTICES vértices de cada área (ST_Subdivide),
+# recalculadas a cada carga; joins espaciais testam as partes em vez do polígono inteiro
+FLOODING_AREA_PARTS_DDL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        part_id SERIAL PRIMARY KEY,
+        area_id INTEGER NOT NULL,
+        geometry GEOMETRY(POLYGON, 4326)
+    )
+"""
+
+# Histórico de eventos por cidadão (Gold GOLD_HISTORY_PATH); a PK começa por event_date
+# (consultas por intervalo de datas) e idx_citizen_flood_events_citizen serve o histórico
+# de um cidadão. flood_event_loads guarda a impressão digital de cada evento carregado.
+CITIZEN_FLOOD_EVENTS_DDL = """
+    CREATE TABLE IF NOT EXISTS citizen_flood_events (
+        event_date DATE NOT NULL,
+        area_id INTEGER NOT NULL,
+        citizen_id INTEGER NOT NULL,
+        area_name VARCHAR(255),
+        severity VARCHAR(50),
+        PRIMARY KEY (event_date, area_id, citizen_id)
+    )
+"""
+
+FLOOD_EVENT_LOADS_DDL = """
+    CREATE TABLE IF NOT EXISTS flood_event_loads (
+        event_date DATE PRIMARY KEY,
+        fingerprint VARCHAR(64) NOT NULL,
+        loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Uma linha por carga concluída; o run_id é a versão do dataset lida pelo Flask
+# (mesmo esquema sugerido em postgis_setup.sql)
+PIPELINE_RUNS_DDL = """
+    CREATE TABLE IF NOT EXISTS pipeline_runs (
+        run_id SERIAL PRIMARY KEY,
+        run_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        total_citizens INTEGER,
+        affected_citizens INTEGER,
+        unaffected_citizens INTEGER,
+        processing_time_seconds DECIMAL,
+        status VARCHAR(20)
+    )
+"""
+
+# Resumos por carga, preenchidos por refresh_statistics()
+FLOOD_AREA_STATS_DDL = """
+    CREATE TABLE IF NOT EXISTS flood_area_stats (
+        run_id INTEGER NOT NULL,
+        area_id INTEGER NOT NULL,
+        area_name VARCHAR(255),
+        severity VARCHAR(50),
+        citizens INTEGER,
+        PRIMARY KEY (run_id, area_id)
+    )
+"""
+
+SEVERITY_STATS_DDL = """
+    CREATE TABLE IF NOT EXISTS severity_stats (
+        run_id INTEGER NOT NULL,
+        severity VARCHAR(50) NOT NULL,
+        citizens INTEGER,
+        PRIMARY KEY (run_id, severity)
+    )
+"""
+
+GEOM_INDEX_DDL = "CREATE INDEX IF NOT EXISTS idx_{table}_geom ON {table} USING GIST(geometry)"
+
+# Tabelas recarregadas a cada execução: nome -> DDL
+LOADED_TABLES = {
+    'flooding_areas': FLOODING_AREAS_DDL,
+    'flooding_area_parts': FLOODING_AREA_PARTS_DDL,
+    'citizens': CITIZENS_DDL,
+}
+
+# Sequências SERIAL das tabelas recarregadas: nome -> coluna (<tabela>_<coluna>_seq)
+LOADED_TABLE_SEQUENCES = {
+    'flooding_areas': 'area_id',
+    'flooding_area_parts': 'part_id',
+}
+
+# Índices secundários das tabelas recarregadas: nome -> {sufixo: DDL}; o índice
+# idx_{table}_{sufixo} é criado também na staging e renomeado no swap
+LOADED_TABLE_INDEXES = {
+    'flooding_areas': {
+        'geom': GEOM_INDEX_DDL,
+        'flood_date': "CREATE INDEX IF NOT EXISTS idx_{table}_flood_date ON {table} (flood_date)",
+    },
+    'flooding_area_parts': {
+        'geom': GEOM_INDEX_DDL,
+        'area': "CREATE INDEX IF NOT EXISTS idx_{table}_area ON {table} (area_id)",
+    },
+    'citizens': {
+        'geom': GEOM_INDEX_DDL,
+    },
+}
+
+# Views (e materialized views) que dependem, direta ou indiretamente, das
+# tabelas dadas, com a definição atual e a profundidade na cadeia de dependências
+DEPENDENT_VIEWS_SQL = """
+    WITH RECURSIVE deps (oid, depth) AS (
+        SELECT DISTINCT v.oid, 1
+        FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        JOIN pg_class v ON v.oid = r.ev_class
+        WHERE d.refobjid = ANY(%s::regclass[]) AND v.relkind IN ('v', 'm')
+        UNION
+        SELECT v.oid, deps.depth + 1
+        FROM deps
+        JOIN pg_depend d ON d.refobjid = deps.oid
+        JOIN pg_rewrite r ON r.oid = d.objid
+        JOIN pg_class v ON v.oid = r.ev_class
+        WHERE v.relkind IN ('v', 'm') AND v.oid <> deps.oid
+    )
+    SELECT format('%%I.%%I', n.nspname, c.relname), c.relkind = 'm', pg_get_viewdef(c.oid), MAX(deps.depth)
+    FROM deps
+    JOIN pg_class c ON c.oid = deps.oid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    GROUP BY n.nspname, c.relname, c.relkind, c.oid
+    ORDER BY MAX(deps.depth)
+"""
+
+
 def create_tables(conn):
     """Cria tabelas if not exists"""
     cursor = conn.cursor()
     
     sql_commands = [
         # Tabela de áreas de enchente
-        """
-        CREATE TABLE IF NOT EXISTS flooding_areas (
-            area_id SERIAL PRIMARY KEY,
-            area_name VARCHAR(255),
-            flood_date DATE,
-            severity VARCHAR(50),
-            affected_population INTEGER,
-            geometry GEOMETRY(POLYGON, 4326),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """,
+        FLOODING_AREAS_DDL.format(table='flooding_areas'),
         
         # Tabela de cidadãos
-        """
-        CREATE TABLE IF NOT EXISTS citizens (
-            citizen_id INTEGER PRIMARY KEY,
-            name VARCHAR(255) NOT NULL,
-            address TEXT,
-            phone VARCHAR(20),
-            registration_date DATE,
-            geometry GEOMETRY(POINT, 4326),
-            affected_by_flooding BOOLEAN DEFAULT FALSE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """,
+        CITIZENS_DDL.format(table='citizens'),
+        
+        # Hash de conteúdo para carga diferencial (tabelas anteriores à coluna)
+        "ALTER TABLE citizens ADD COLUMN IF NOT EXISTS row_hash BIGINT",
+        
+        # Proximidade calculada na Gold (área mais próxima, distância em metros, faixa de risco)
+        "ALTER TABLE citizens ADD COLUMN IF NOT EXISTS nearest_area_id INTEGER",
+        "ALTER TABLE citizens ADD COLUMN IF NOT EXISTS distance_to_flood_m DOUBLE PRECISION",
+        "ALTER TABLE citizens ADD COLUMN IF NOT EXISTS risk_band VARCHAR(50)",
+        
+        # Partes subdivididas das áreas (join espacial com polígonos de muitos vértices)
+        FLOODING_AREA_PARTS_DDL.format(table='flooding_area_parts'),
+        
+        # Índices espaciais e secundários das tabelas recarregadas
+        *(ddl.format(table=table) for table, indexes in LOADED_TABLE_INDEXES.items() for ddl in indexes.values()),
         
-        # Índices espaciais
-        "CREATE INDEX IF NOT EXISTS idx_flooding_areas_geom ON flooding_areas USING GIST(geometry)",
-        "CREATE INDEX IF NOT EXISTS idx_citizens_geom ON citizens USING GIST(geometry)",
+        # Histórico de eventos (consultas por intervalo de datas e por cidadão)
+        CITIZEN_FLOOD_EVENTS_DDL,
+        FLOOD_EVENT_LOADS_DDL,
+        "CREATE INDEX IF NOT EXISTS idx_citizen_flood_events_citizen ON citizen_flood_events (citizen_id, event_date)",
+        
+        # Histórico de cargas (versão do dataset) e resumos
+        PIPELINE_RUNS_DDL,
+        FLOOD_AREA_STATS_DDL,
+        SEVERITY_STATS_DDL,
     ]
     
     for sql in sql_commands:
@@ -98,8 +273,9 @@ def load_affected_citizens_to_postgis(conn, filepath):
     
     for idx, row in gdf.iterrows():
         sql = """
-            INSERT INTO citizens (citizen_id, name, address, phone, registration_date, geometry, affected_by_flooding)
-            VALUES (%s, %s, %s, %s, %s, ST_GeomFromText(%s, 4326), %s)
+            INSERT INTO citizens (citizen_id, name, address, phone, registration_date, geometry, affected_by_flooding,
+                                  nearest_area_id, distance_to_flood_m, risk_band)
+            VALUES (%s, %s, %s, %s, %s, ST_GeomFromText(%s, 4326), %s, %s, %s, %s)
             ON CONFLICT (citizen_id) DO UPDATE SET affected_by_flooding = TRUE
         """
         
@@ -112,7 +288,10 @@ def load_affected_citizens_to_postgis(conn, filepath):
             str(row['phone']),
             row['registration_date'],
             geom_wkt,
-            True
+            True,
+            None if pd.isna(row.get('nearest_area_id')) else int(row['nearest_area_id']),
+            None if pd.isna(row.get('distance_to_flood_m')) else float(row['distance_to_flood_m']),
+            row.get('risk_band'),
         ))
     
     conn.commit()
@@ -132,8 +311,9 @@ def load_unaffected_citizens_to_postgis(conn, filepath):
     
     for idx, row in gdf.iterrows():
         sql = """
-            INSERT INTO citizens (citizen_id, name, address, phone, registration_date, geometry, affected_by_flooding)
-            VALUES (%s, %s, %s, %s, %s, ST_GeomFromText(%s, 4326), %s)
+            INSERT INTO citizens (citizen_id, name, address, phone, registration_date, geometry, affected_by_flooding,
+                                  nearest_area_id, distance_to_flood_m, risk_band)
+            VALUES (%s, %s, %s, %s, %s, ST_GeomFromText(%s, 4326), %s, %s, %s, %s)
             ON CONFLICT (citizen_id) DO UPDATE SET affected_by_flooding = FALSE
         """
         
@@ -146,7 +326,10 @@ def load_unaffected_citizens_to_postgis(conn, filepath):
             str(row['phone']),
             row['registration_date'],
             geom_wkt,
-            False
+            False,
+            None if pd.isna(row.get('nearest_area_id')) else int(row['nearest_area_id']),
+            None if pd.isna(row.get('distance_to_flood_m')) else float(row['distance_to_flood_m']),
+            row.get('risk_band'),
         ))
     
     conn.commit()
@@ -155,25 +338,28 @@ def load_unaffected_citizens_to_postgis(conn, filepath):
 
 
 def query_statistics(conn):
-    """Retorna estatísticas do banco de dados"""
+    """
+    Retorna estatísticas do banco de dados
+
+    Lê o resumo da última carga em pipeline_runs (custo constante); as contagens
+    são calculadas uma única vez por refresh_statistics() no fim da carga.
+    """
     cursor = conn.cursor()
-    
-    stats = {}
-    
-    # Total de cidadãos
-    cursor.execute("SELECT COUNT(*) FROM citizens")
-    stats['total_citizens'] = cursor.fetchone()[0]
-    
-    # Cidadãos afetados
-    cursor.execute("SELECT COUNT(*) FROM citizens WHERE affected_by_flooding = TRUE")
-    stats['affected_citizens'] = cursor.fetchone()[0]
-    
-    # Cidadãos não afetados
-    cursor.execute("SELECT COUNT(*) FROM citizens WHERE affected_by_flooding = FALSE")
-    stats['unaffected_citizens'] = cursor.fetchone()[0]
-    
+    cursor.execute("""
+        SELECT total_citizens, affected_citizens, unaffected_citizens
+        FROM pipeline_runs
+        ORDER BY run_id DESC
+        LIMIT 1
+    """)
+    row = cursor.fetchone()
     cursor.close()
-    return stats
+    
+    total, affected, unaffected = row if row else (0, 0, 0)
+    return {
+        'total_citizens': total,
+        'affected_citizens': affected,
+        'unaffected_citizens': unaffected,
+    }
 
 
 def load_flooding_areas_to_postgis(conn):
@@ -182,8 +368,7 @@ def load_flooding_areas_to_postgis(conn):
     
     try:
         # Carregar GeoDataFrame da Silver
-        from config import LOCAL_SILVER_PATH
-        silver_path = Path(LOCAL_SILVER_PATH) / "silver_flooding_areas_porto_alegre.parquet"
+        silver_path = Path(LOCAL_SILVER_PATH) / f"silver_{FLOODING_AREAS_FILE}"
         
         gdf = gpd.read_parquet(str(silver_path))
         cursor = conn.cursor()
@@ -196,11 +381,12 @@ def load_flooding_areas_to_postgis(conn):
             geom_wkt = row.geometry.wkt
             
             sql = """
-                INSERT INTO flooding_areas (area_name, flood_date, severity, affected_population, geometry)
-                VALUES (%s, %s, %s, %s, ST_GeomFromText(%s, 4326))
+                INSERT INTO flooding_areas (area_id, area_name, flood_date, severity, affected_population, geometry)
+                VALUES (%s, %s, %s, %s, %s, ST_GeomFromText(%s, 4326))
             """
             
             cursor.execute(sql, (
+                int(row['area_id']),
                 str(row.get('area_name', f'Area_{idx}')),
                 row.get('flood_date', None),
                 str(row.get('severity', 'unknown')),
@@ -218,10 +404,602 @@ def load_flooding_areas_to_postgis(conn):
         return 0
 
 
-def load_to_postgis():
-    """Orquestrador: carrega dados no PostGIS"""
+def refresh_flood_area_parts(conn, max_vertices=FLOOD_SUBDIVIDE_MAX_VERTICES, table='flooding_area_parts',
+                             source='flooding_areas'):
+    """
+    Recalcula `table` (flooding_area_parts) a partir de `source` com ST_Subdivide
+
+    Mesma subdivisão da Silver (partes de até `max_vertices` vértices; 0 copia
+    os polígonos inteiros). O GiST sobre as partes tem envelopes justos, então
+    o join com citizens testa poucos vértices por ponto. No modo swap as partes
+    são geradas em flooding_area_parts_staging e publicadas junto com as demais
+    tabelas; nos modos in-place a tabela publicada é esvaziada e refeita na
+    mesma transação.
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"DELETE FROM {table}")
+    if max_vertices > 0:
+        cursor.execute(f"""
+            INSERT INTO {table} (area_id, geometry)
+            SELECT area_id, ST_Subdivide(geometry, %s) FROM {source}
+        """, (max(max_vertices, 5),))
+    else:
+        cursor.execute(f"""
+            INSERT INTO {table} (area_id, geometry)
+            SELECT area_id, geometry FROM {source}
+        """)
+    cursor.execute(f"ANALYZE {table}")
+    conn.commit()
+    cursor.close()
+
+
+# Pares área/cidadão via partes: ST_Contains na parte, e ST_Within no polígono
+# inteiro só para pontos sobre a borda da parte (cortes da subdivisão); repetido
+# na contagem por área do postgis_setup.sql
+FLOOD_MATCHES_CTE = """
+    WITH matches AS (
+        SELECT DISTINCT p.area_id, c.citizen_id
+        FROM flooding_area_parts p
+        JOIN citizens c ON ST_Intersects(p.geometry, c.geometry)
+        JOIN flooding_areas f ON f.area_id = p.area_id
+        WHERE ST_Contains(p.geometry, c.geometry) OR ST_Within(c.geometry, f.geometry)
+    )
+"""
+
+
+def refresh_statistics(conn, elapsed):
+    """
+    Registra a carga em pipeline_runs e recalcula as tabelas de resumo
+
+    Em uma transação:
+    - totais (afetados / não afetados) em uma única varredura de citizens
+    - cidadãos por área de enchente (flood_area_stats) e por severidade
+      (severity_stats), via join espacial indexado nas partes subdivididas
+
+    O novo run_id é a versão do dataset lida pelo Flask (invalida caches);
+    os endpoints leem esses resumos em vez de agregar citizens.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO pipeline_runs
+            (total_citizens, affected_citizens, unaffected_citizens, processing_time_seconds, status)
+        SELECT
+            COUNT(*),
+            COUNT(*) FILTER (WHERE affected_by_flooding),
+            COUNT(*) FILTER (WHERE NOT affected_by_flooding),
+            %s,
+            'success'
+        FROM citizens
+        RETURNING run_id
+    """, (round(elapsed, 3),))
+    run_id = cursor.fetchone()[0]
+    
+    cursor.execute("""
+        INSERT INTO flood_area_stats (run_id, area_id, area_name, severity, citizens)
+    """ + FLOOD_MATCHES_CTE + """
+        SELECT %s, f.area_id, f.area_name, f.severity, COUNT(m.citizen_id)
+        FROM flooding_areas f
+        LEFT JOIN matches m ON m.area_id = f.area_id
+        GROUP BY f.area_id, f.area_name, f.severity
+    """, (run_id,))
+    
+    cursor.execute("""
+        INSERT INTO severity_stats (run_id, severity, citizens)
+    """ + FLOOD_MATCHES_CTE + """
+        SELECT %s, COALESCE(f.severity, 'unknown'), COUNT(DISTINCT m.citizen_id)
+        FROM matches m
+        JOIN flooding_areas f ON f.area_id = m.area_id
+        GROUP BY COALESCE(f.severity, 'unknown')
+    """, (run_id,))
+    
+    conn.commit()
+    cursor.close()
+    return run_id
+
+
+# ====== CARGA EM LOTE (COPY BINÁRIO) ======
+
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+PGCOPY_TRAILER = struct.pack('!h', -1)
+PGCOPY_NULL = struct.pack('!i', -1)
+PG_EPOCH = np.datetime64('2000-01-01', 'D')
+SRID = 4326
+
+CITIZEN_COLUMNS = [
+    ('citizen_id', 'int4'),
+    ('name', 'text'),
+    ('address', 'text'),
+    ('phone', 'text'),
+    ('registration_date', 'date'),
+    ('geometry', 'geometry'),
+    ('nearest_area_id', 'int4'),
+    ('distance_to_flood_m', 'float8'),
+    ('risk_band', 'text'),
+]
+
+# Colunas gravadas em citizens pelas cargas via COPY
+CITIZEN_LOAD_COLUMNS = [name for name, _ in CITIZEN_COLUMNS] + ['affected_by_flooding', 'row_hash']
+
+FLOODING_AREA_COLUMNS = [
+    ('area_id', 'int4'),
+    ('area_name', 'text'),
+    ('flood_date', 'date'),
+    ('severity', 'text'),
+    ('affected_population', 'int4'),
+    ('geometry', 'geometry'),
+]
+
+
+def _encode_column(values, kind):
+    """Codifica uma coluna (array) no formato binário do COPY: [int32 tamanho][bytes]"""
+    if kind == 'geometry':
+        geoms = shapely.from_wkb(values)
+        geoms = shapely.set_srid(geoms, SRID)
+        ewkb = shapely.to_wkb(geoms, include_srid=True)
+        return [PGCOPY_NULL if b is None else struct.pack('!i', len(b)) + b for b in ewkb]
+
+    series = pd.Series(values)
+    isnull = series.isna().to_numpy()
+
+    if kind == 'int4':
+        raw = [struct.pack('!ii', 4, v) for v in series.fillna(0).astype('int64').tolist()]
+    elif kind == 'int8':
+        raw = [struct.pack('!iq', 8, v) for v in series.fillna(0).astype('int64').tolist()]
+    elif kind == 'float8':
+        raw = [struct.pack('!id', 8, v) for v in series.fillna(0).astype('float64').tolist()]
+    elif kind == 'date':
+        days = (pd.to_datetime(series).to_numpy().astype('datetime64[D]') - PG_EPOCH).astype('int64')
+        raw = [struct.pack('!ii', 4, v) for v in np.where(isnull, 0, days).tolist()]
+    elif kind == 'bool':
+        raw = [b'\x00\x00\x00\x01\x01' if v else b'\x00\x00\x00\x01\x00' for v in series.tolist()]
+    else:
+        raw = []
+        for v in series.fillna('').astype(str).tolist():
+            data = v.encode('utf-8')
+            raw.append(struct.pack('!i', len(data)) + data)
+
+    return [PGCOPY_NULL if null else field for field, null in zip(raw, isnull)]
+
+
+def build_copy_payload(columns):
+    """
+    Monta o payload binário do COPY a partir de colunas já extraídas
+
+    Args:
+        columns: lista de (valores, tipo) na ordem das colunas da tabela
+    """
+    encoded = [_encode_column(values, kind) for values, kind in columns]
+    field_count = struct.pack('!h', len(encoded))
+
+    buf = io.BytesIO()
+    buf.write(PGCOPY_HEADER)
+    for fields in zip(*encoded):
+        buf.write(field_count)
+        buf.write(b''.join(fields))
+    buf.write(PGCOPY_TRAILER)
+    buf.seek(0)
+    return buf
+
+
+def iter_geoparquet_batches(filepath, columns, batch_size):
+    """Lê um GeoParquet em lotes Arrow (geometria continua em WKB)"""
+    parquet_file = pq.ParquetFile(filepath)
+    available = set(parquet_file.schema_arrow.names)
+    read_columns = [col for col in columns if col in available]
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=read_columns):
+        yield batch
+
+
+def _batch_columns(batch, spec, num_rows, defaults=None):
+    """Extrai as colunas do lote na ordem de `spec` (colunas ausentes viram default/NULL)"""
+    defaults = defaults or {}
+    names = batch.schema.names
+    columns = []
+    for name, kind in spec:
+        if name in names:
+            values = batch.column(names.index(name)).to_numpy(zero_copy_only=False)
+        else:
+            values = np.full(num_rows, defaults.get(name), dtype=object)
+        columns.append((values, kind))
+    return columns
+
+
+def _citizen_batch_columns(batch, affected):
+    """
+    Colunas de um lote de cidadãos na ordem de CITIZEN_LOAD_COLUMNS
+
+    Acrescenta affected_by_flooding e row_hash, um hash de 64 bits do conteúdo
+    da linha (atributos + WKB + status) usado pela carga diferencial.
+    """
+    columns = _batch_columns(batch, CITIZEN_COLUMNS, batch.num_rows)
+    columns.append((np.full(batch.num_rows, affected), 'bool'))
+
+    content = pd.DataFrame({
+        name: pd.Series(values, dtype=object if kind in ('text', 'geometry') else None)
+        for (name, kind), (values, _) in zip(CITIZEN_COLUMNS + [('affected_by_flooding', 'bool')], columns)
+    })
+    row_hash = pd.util.hash_pandas_object(content, index=False).to_numpy().view('int64')
+    columns.append((row_hash, 'int8'))
+    return columns
+
+
+def copy_citizens_to_postgis(conn, sources, batch_size=POSTGIS_COPY_BATCH_SIZE, table='citizens'):
+    """
+    Carrega cidadãos via COPY binário
+
+    Os lotes vão para uma tabela temporária e são consolidados em `table`
+    com um único INSERT ... SELECT (DISTINCT ON elimina citizen_id repetido).
+
+    Args:
+        conn: conexão psycopg2
+        sources: lista de (caminho do GeoParquet, affected_by_flooding)
+        batch_size: linhas por lote de COPY
+        table: tabela de destino (citizens ou staging)
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        CREATE TEMP TABLE citizens_load (LIKE {table} INCLUDING DEFAULTS)
+        ON COMMIT DROP
+    """)
+
+    column_names = CITIZEN_LOAD_COLUMNS
+    copy_sql = (
+        f"COPY citizens_load ({', '.join(column_names)}) "
+        f"FROM STDIN WITH (FORMAT binary)"
+    )
+
+    total = 0
+    for filepath, affected in sources:
+        logger.info(f"COPY {Path(filepath).name} (lotes de {batch_size})...")
+        for batch in iter_geoparquet_batches(filepath, [n for n, _ in CITIZEN_COLUMNS], batch_size):
+            columns = _citizen_batch_columns(batch, affected)
+            cursor.copy_expert(copy_sql, build_copy_payload(columns))
+            total += batch.num_rows
+
+    cursor.execute(f"DELETE FROM {table}")
+    cursor.execute(f"""
+        INSERT INTO {table} ({', '.join(column_names)})
+        SELECT DISTINCT ON (citizen_id) {', '.join(column_names)}
+        FROM citizens_load
+        ORDER BY citizen_id, affected_by_flooding DESC
+    """)
+    loaded = cursor.rowcount
+
+    conn.commit()
+    cursor.close()
+    logger.info(f"✓ COPY: {total} linhas lidas, {loaded} cidadãos carregados")
+    return loaded
+
+
+def copy_flooding_areas_to_postgis(conn, batch_size=POSTGIS_COPY_BATCH_SIZE, table='flooding_areas'):
+    """Carrega áreas de enchente da Silver via COPY binário"""
+    logger.info(f"Carregando áreas de enchente para PostGIS (COPY → {table})...")
+
+    try:
+        silver_path = Path(LOCAL_SILVER_PATH) / f"silver_{FLOODING_AREAS_FILE}"
+        cursor = conn.cursor()
+
+        cursor.execute(f"DELETE FROM {table}")
+
+        column_names = [name for name, _ in FLOODING_AREA_COLUMNS]
+        copy_sql = (
+            f"COPY {table} ({', '.join(column_names)}) "
+            f"FROM STDIN WITH (FORMAT binary)"
+        )
+
+        total = 0
+        for batch in iter_geoparquet_batches(str(silver_path), column_names, batch_size):
+            columns = _batch_columns(
+                batch, FLOODING_AREA_COLUMNS, batch.num_rows,
+                defaults={'severity': 'unknown', 'affected_population': 0}
+            )
+            cursor.copy_expert(copy_sql, build_copy_payload(columns))
+            total += batch.num_rows
+
+        # area_id veio explícito: manter a sequence do SERIAL à frente
+        cursor.execute(f"""
+            SELECT setval(pg_get_serial_sequence('{table}', 'area_id'),
+                          COALESCE(MAX(area_id), 0) + 1, false)
+            FROM {table}
+        """)
+
+        conn.commit()
+        cursor.close()
+        logger.info(f"✓ Carregadas {total} áreas de enchente")
+        return total
+
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"✗ Erro ao carregar áreas de enchente: {e}")
+        return 0
+
+
+# ====== HISTÓRICO DE EVENTOS ======
+
+FLOOD_EVENT_COLUMNS = [
+    ('event_date', 'date'),
+    ('area_id', 'int4'),
+    ('citizen_id', 'int4'),
+    ('area_name', 'text'),
+    ('severity', 'text'),
+]
+
+
+def load_flood_history_to_postgis(conn, batch_size=POSTGIS_COPY_BATCH_SIZE):
+    """
+    Carrega o histórico de eventos da Gold em citizen_flood_events, por evento
+
+    Compara a impressão digital de cada evento no manifesto da Gold com
+    flood_event_loads: só eventos novos/alterados são (re)enviados via COPY
+    e eventos que saíram do histórico são apagados; os demais nem são lidos.
+    """
+    manifest_path = Path(GOLD_HISTORY_PATH) / FLOOD_HISTORY_MANIFEST_FILE
+    if not manifest_path.exists():
+        logger.info("Histórico de eventos ausente na Gold, pulando")
+        return 0
+    manifest = json.loads(manifest_path.read_text())
+    events = {date: f"{manifest['citizens']}:{fingerprint}" for date, fingerprint in manifest['events'].items()}
+    
+    cursor = conn.cursor()
+    cursor.execute("SELECT to_char(event_date, 'YYYY-MM-DD'), fingerprint FROM flood_event_loads")
+    loaded = dict(cursor.fetchall())
+    changed = sorted(date for date, fingerprint in events.items() if loaded.get(date) != fingerprint)
+    stale = sorted((set(loaded) - set(events)) | set(changed))
+    
+    if stale:
+        cursor.execute("DELETE FROM citizen_flood_events WHERE event_date = ANY(%s::date[])", (stale,))
+        cursor.execute("DELETE FROM flood_event_loads WHERE event_date = ANY(%s::date[])", (stale,))
+    
+    column_names = [name for name, _ in FLOOD_EVENT_COLUMNS]
+    copy_sql = f"COPY citizen_flood_events ({', '.join(column_names)}) FROM STDIN WITH (FORMAT binary)"
+    total = 0
+    for date in changed:
+        filepath = Path(GOLD_HISTORY_PATH) / f"event_date={date}" / 'part-0.parquet'
+        for batch in pq.ParquetFile(filepath).iter_batches(batch_size=batch_size):
+            columns = _batch_columns(batch, FLOOD_EVENT_COLUMNS[1:], batch.num_rows)
+            cursor.copy_expert(copy_sql, build_copy_payload(
+                [(np.full(batch.num_rows, np.datetime64(date)), 'date')] + columns
+            ))
+            total += batch.num_rows
+        cursor.execute(
+            "INSERT INTO flood_event_loads (event_date, fingerprint) VALUES (%s, %s)",
+            (date, events[date])
+        )
+    if changed:
+        cursor.execute("ANALYZE citizen_flood_events")
+    
+    conn.commit()
+    cursor.close()
+    logger.info(
+        f"✓ Histórico: {len(changed)} evento(s) carregado(s) ({total} linhas), "
+        f"{len(events) - len(changed)} inalterado(s), {len(stale) - len(changed)} removido(s)"
+    )
+    return total
+
+
+# ====== CARGA DIFERENCIAL (UPSERT POR citizen_id) ======
+
+def fetch_citizen_hashes(conn):
+    """Lê (citizen_id, row_hash) do banco via COPY TO STDOUT"""
+    buf = io.StringIO()
+    cursor = conn.cursor()
+    cursor.copy_expert("COPY (SELECT citizen_id, row_hash FROM citizens) TO STDOUT", buf)
+    cursor.close()
+    buf.seek(0)
+    current = pd.read_csv(
+        buf, sep='\t', header=None, names=['citizen_id', 'row_hash'],
+        na_values=['\\N'], dtype={'citizen_id': 'int64', 'row_hash': 'Int64'}
+    )
+    return current.set_index('citizen_id')['row_hash']
+
+
+def upsert_citizens_to_postgis(conn, sources, batch_size=POSTGIS_COPY_BATCH_SIZE):
+    """
+    Carga diferencial de cidadãos: envia apenas linhas inseridas, alteradas ou removidas
+
+    1. Calcula row_hash de cada linha da Gold (primeira ocorrência por citizen_id)
+    2. Compara com (citizen_id, row_hash) já gravados no banco
+    3. Reenvia via COPY só as linhas novas/alteradas (INSERT ... ON CONFLICT)
+       e remove os citizen_id que saíram da Gold
+
+    Linhas com row_hash nulo (carregadas pelo caminho legado) contam como alteradas.
+
+    Args:
+        conn: conexão psycopg2
+        sources: lista de (caminho do GeoParquet, affected_by_flooding)
+        batch_size: linhas por lote de COPY
+    """
+    # 1) Hashes da nova Gold
+    ids, hashes = [], []
+    for filepath, affected in sources:
+        for batch in iter_geoparquet_batches(filepath, [n for n, _ in CITIZEN_COLUMNS], batch_size):
+            columns = _citizen_batch_columns(batch, affected)
+            ids.append(columns[0][0].astype('int64'))
+            hashes.append(columns[-1][0])
+    ids = np.concatenate(ids) if ids else np.array([], dtype='int64')
+    hashes = np.concatenate(hashes) if hashes else np.array([], dtype='int64')
+    unique_ids, first = np.unique(ids, return_index=True)
+
+    # 2) Diff contra o banco
+    current = fetch_citizen_hashes(conn)
+    matched = current.reindex(unique_ids)
+    is_new = matched.isna().to_numpy()
+    changed = (matched != hashes[first]).fillna(True).to_numpy(dtype=bool)
+    deleted_ids = current.index[~current.index.isin(unique_ids)].to_numpy()
+
+    send = np.zeros(len(ids), dtype=bool)
+    send[first[changed]] = True
+
+    inserted, updated = int(is_new.sum()), int((changed & ~is_new).sum())
+    logger.info(
+        f"  Diff: {inserted} novos, {updated} alterados, {len(deleted_ids)} removidos, "
+        f"{len(unique_ids) - inserted - updated} inalterados"
+    )
+
+    cursor = conn.cursor()
+
+    # 3) Enviar somente o delta
+    if send.any():
+        cursor.execute("""
+            CREATE TEMP TABLE citizens_load (LIKE citizens INCLUDING DEFAULTS)
+            ON COMMIT DROP
+        """)
+        copy_sql = (
+            f"COPY citizens_load ({', '.join(CITIZEN_LOAD_COLUMNS)}) "
+            f"FROM STDIN WITH (FORMAT binary)"
+        )
+        offset = 0
+        for filepath, affected in sources:
+            for batch in iter_geoparquet_batches(filepath, [n for n, _ in CITIZEN_COLUMNS], batch_size):
+                mask = send[offset:offset + batch.num_rows]
+                offset += batch.num_rows
+                if not mask.any():
+                    continue
+                columns = [(values[mask], kind) for values, kind in _citizen_batch_columns(batch, affected)]
+                cursor.copy_expert(copy_sql, build_copy_payload(columns))
+
+        updates = ', '.join(f"{col} = EXCLUDED.{col}" for col in CITIZEN_LOAD_COLUMNS[1:])
+        cursor.execute(f"""
+            INSERT INTO citizens ({', '.join(CITIZEN_LOAD_COLUMNS)})
+            SELECT {', '.join(CITIZEN_LOAD_COLUMNS)} FROM citizens_load
+            ON CONFLICT (citizen_id) DO UPDATE SET {updates}
+        """)
+
+    if len(deleted_ids):
+        cursor.execute("CREATE TEMP TABLE citizens_delete (citizen_id INTEGER) ON COMMIT DROP")
+        cursor.copy_expert(
+            "COPY citizens_delete (citizen_id) FROM STDIN WITH (FORMAT binary)",
+            build_copy_payload([(deleted_ids, 'int4')])
+        )
+        cursor.execute("""
+            DELETE FROM citizens c
+            USING citizens_delete d
+            WHERE c.citizen_id = d.citizen_id
+        """)
+
+    conn.commit()
+    cursor.close()
+    logger.info(f"✓ Upsert: {int(send.sum())} linhas enviadas, {len(deleted_ids)} removidas")
+    return {'inserted': inserted, 'updated': updated, 'deleted': len(deleted_ids)}
+
+
+# ====== RECARGA VIA STAGING + SWAP ATÔMICO ======
+
+def create_staging_tables(conn):
+    """Recria as tabelas <tabela>_staging vazias (sem índice espacial)"""
+    cursor = conn.cursor()
+    for table, ddl in LOADED_TABLES.items():
+        staging = f"{table}_staging"
+        cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        cursor.execute(ddl.format(table=staging))
+    conn.commit()
+    cursor.close()
+    logger.info("✓ Tabelas de staging criadas")
+
+
+def index_staging_tables(conn):
+    """Cria os índices de LOADED_TABLE_INDEXES e roda ANALYZE nas tabelas de staging já carregadas"""
+    cursor = conn.cursor()
+    for table, indexes in LOADED_TABLE_INDEXES.items():
+        staging = f"{table}_staging"
+        for ddl in indexes.values():
+            cursor.execute(ddl.format(table=staging))
+        cursor.execute(f"ANALYZE {staging}")
+    conn.commit()
+    cursor.close()
+    logger.info("✓ Índices (GiST e secundários) + ANALYZE nas tabelas de staging")
+
+
+def swap_staging_tables(conn):
+    """
+    Troca as tabelas publicadas pelas de staging em uma única transação
+
+    Leitores veem a versão antiga ou a nova, nunca uma carga parcial.
+    A tabela antiga é descartada inteira (sem DELETE), então a recarga
+    não deixa tuplas mortas para o VACUUM. O lock exclusivo é curto e
+    limitado por POSTGIS_SWAP_LOCK_TIMEOUT; em caso de timeout a troca
+    é tentada novamente.
+
+    Views que dependem das tabelas (ex.: v_citizens_summary do
+    postgis_setup.sql) impediriam o DROP: na mesma transação elas são
+    descartadas e recriadas com a definição atual sobre as tabelas novas
+    (GRANTs e comentários dessas views não são preservados).
+    """
+    for attempt in range(1, POSTGIS_SWAP_RETRIES + 1):
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SET LOCAL lock_timeout = %s", (POSTGIS_SWAP_LOCK_TIMEOUT,))
+            cursor.execute(DEPENDENT_VIEWS_SQL, (list(LOADED_TABLES),))
+            views = cursor.fetchall()
+            for view, materialized, _, _ in reversed(views):
+                cursor.execute(f"DROP {'MATERIALIZED VIEW' if materialized else 'VIEW'} IF EXISTS {view}")
+            
+            for table, indexes in LOADED_TABLE_INDEXES.items():
+                staging = f"{table}_staging"
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+                cursor.execute(f"ALTER TABLE {staging} RENAME TO {table}")
+                cursor.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {staging}_pkey TO {table}_pkey")
+                for suffix in indexes:
+                    cursor.execute(f"ALTER INDEX idx_{staging}_{suffix} RENAME TO idx_{table}_{suffix}")
+            for table, column in LOADED_TABLE_SEQUENCES.items():
+                cursor.execute(
+                    f"ALTER SEQUENCE IF EXISTS {table}_staging_{column}_seq RENAME TO {table}_{column}_seq"
+                )
+            
+            for view, materialized, definition, _ in views:
+                cursor.execute(f"CREATE {'MATERIALIZED VIEW' if materialized else 'VIEW'} {view} AS {definition}")
+            conn.commit()
+            if views:
+                logger.info(f"✓ {len(views)} view(s) dependente(s) recriada(s): {', '.join(v[0] for v in views)}")
+            logger.info("✓ Swap atômico concluído (staging → produção)")
+            return True
+        except psycopg2.errors.LockNotAvailable:
+            conn.rollback()
+            logger.warning(f"⚠ Lock indisponível para o swap (tentativa {attempt}/{POSTGIS_SWAP_RETRIES})")
+            time.sleep(attempt)
+        finally:
+            cursor.close()
+
+    raise RuntimeError("Não foi possível obter lock para o swap das tabelas")
+
+
+def load_with_staging_swap(conn, affected_path, unaffected_path):
+    """Carrega Silver/Gold em tabelas de staging e publica com swap atômico"""
+    create_staging_tables(conn)
+
+    if not copy_flooding_areas_to_postgis(conn, table='flooding_areas_staging'):
+        raise RuntimeError("Staging de áreas de enchente vazio - swap abortado")
+    copy_citizens_to_postgis(conn, [
+        (str(affected_path), True),
+        (str(unaffected_path), False),
+    ], table='citizens_staging')
+    refresh_flood_area_parts(conn, table='flooding_area_parts_staging', source='flooding_areas_staging')
+
+    index_staging_tables(conn)
+    swap_staging_tables(conn)
+
+
+def load_to_postgis(method=None, mode=None):
+    """
+    Orquestrador: carrega dados no PostGIS
+
+    Args:
+        method: 'copy' ou 'insert' (padrão: POSTGIS_LOAD_METHOD)
+        mode: 'replace' (recarga in-place), 'swap' (staging + rename atômico)
+              ou 'upsert' (diferencial por citizen_id); swap e upsert sempre
+              usam COPY (padrão: POSTGIS_LOAD_MODE)
+    """
+    method = method or POSTGIS_LOAD_METHOD
+    mode = mode or POSTGIS_LOAD_MODE
+    if method not in ('copy', 'insert'):
+        raise ValueError(f"Método de carga inválido: {method}")
+    if mode not in ('replace', 'swap', 'upsert'):
+        raise ValueError(f"Modo de carga inválido: {mode}")
+    if mode in ('swap', 'upsert'):
+        method = 'copy'
+
     logger.info("=" * 60)
-    logger.info("POSTGIS LOADER - Importando dados no banco")
+    logger.info(f"POSTGIS LOADER - Importando dados no banco (modo: {mode}, método: {method})")
     logger.info("=" * 60)
     
     # Conectar
@@ -234,20 +1012,42 @@ def load_to_postgis():
         # Criar tabelas
         create_tables(conn)
         
-        # Carregar dados de enchentes PRIMEIRO
-        load_flooding_areas_to_postgis(conn)
-        
-        # Carregar dados de cidadãos
+        started = time.perf_counter()
         affected_path = Path(LOCAL_GOLD_PATH) / AFFECTED_CITIZENS_FILE
         unaffected_path = Path(LOCAL_GOLD_PATH) / UNAFFECTED_CITIZENS_FILE
         
-        load_affected_citizens_to_postgis(conn, str(affected_path))
-        load_unaffected_citizens_to_postgis(conn, str(unaffected_path))
+        if mode == 'swap':
+            load_with_staging_swap(conn, affected_path, unaffected_path)
+        elif mode == 'upsert':
+            copy_flooding_areas_to_postgis(conn)
+            upsert_citizens_to_postgis(conn, [
+                (str(affected_path), True),
+                (str(unaffected_path), False),
+            ])
+        elif method == 'copy':
+            copy_flooding_areas_to_postgis(conn)
+            copy_citizens_to_postgis(conn, [
+                (str(affected_path), True),
+                (str(unaffected_path), False),
+            ])
+        else:
+            # Carregar dados de enchentes PRIMEIRO
+            load_flooding_areas_to_postgis(conn)
+            
+            # Carregar dados de cidadãos
+            load_affected_citizens_to_postgis(conn, str(affected_path))
+            load_unaffected_citizens_to_postgis(conn, str(unaffected_path))
+        
+        if mode != 'swap':
+            refresh_flood_area_parts(conn)
+        load_flood_history_to_postgis(conn)
+        elapsed = time.perf_counter() - started
         
         # Retornar estatísticas
+        run_id = refresh_statistics(conn, elapsed)
         stats = query_statistics(conn)
         logger.info("=" * 60)
-        logger.info("✓ Dados carregados no PostGIS!")
+        logger.info(f"✓ Dados carregados no PostGIS! ({mode}/{method}: {elapsed:.2f}s, run_id={run_id})")
         logger.info(f"  Total: {stats['total_citizens']} cidadãos")
         logger.info(f"  Afetados: {stats['affected_citizens']}")
         logger.info(f"  Não afetados: {stats['unaffected_citizens']}")
@@ -267,4 +1067,5 @@ if __name__ == '__main__':
         level=logging.INFO,
         format='%(asctime)s - %(levelname)s - %(message)s'
     )
-    load_to_postgis()
+    # Benchmark: python etl/postgis_loader.py [copy|insert] [replace|swap|upsert]
+    load_to_postgis(*sys.argv[1:3])
@@ -7,16 +7,23 @@ Normaliza dados, valida geometrias e padroniza tipos de dados.
 Suporta:
   - CSV com colunas de latitude/longitude → GeoParquet com geometria Point
   - GeoJSON → GeoParquet com preservação de geometrias
-  - Múltiplos arquivos de entrada
+  - GeoParquet da Bronze → GeoParquet normalizado
+  - Múltiplos arquivos de entrada (um por dataset, escolhido por CONVERTER_FORMAT_PRIORITY)
 """
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
+import shapely
 from pathlib import Path
+import json
 import logging
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from typing import Optional, List
-import pyarrow.parquet as pq
 
 # Adicionar diretório pai ao path para imports
 import sys
@@ -25,11 +32,260 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from config import (
     SAMPLE_DATA_DIR, S3_SILVER_PREFIX,
     AWS_S3_SILVER_BUCKET, USE_MINIO, USE_S3, STORAGE_MODE,
-    AWS_ENDPOINT_URL, LOCAL_SILVER_PATH, LOCAL_BRONZE_PATH
+    AWS_ENDPOINT_URL, LOCAL_SILVER_PATH, LOCAL_BRONZE_PATH,
+    FLOODING_AREAS_FILE, CITIZENS_FILE,
+    CONVERTER_SCHEMA_FILE, CONVERTER_SCHEMA_SAMPLE_ROWS, CONVERTER_WORKERS,
+    CONVERTER_FORMAT_PRIORITY
 )
 
 logger = logging.getLogger(__name__)
 
+# Tipos poligonais (Polygon, MultiPolygon): reparados com o método 'structure', que
+# preserva o tipo e descarta partes colapsadas; demais tipos usam 'linework'
+POLYGONAL_TYPE_IDS = (3, 6)
+# Tipos com partes (Multi* e GeometryCollection)
+MULTIPART_TYPE_IDS = (4, 5, 6, 7)
+
+
+# Tipos do schema: 'datetime', 'string' (minúsculas), 'text' (texto livre, preservado)
+# ou qualquer dtype do pandas ('Int64', 'float64', 'boolean', ...). Inteiros usam sempre o
+# dtype anulável: um id vazio vira <NA> em vez de derrubar a conversão do arquivo
+STRING_LOWER_MAX_LEN = 100
+
+# Schemas declarados por dataset (stem do arquivo); os demais são inferidos
+DECLARED_SCHEMAS = {
+    Path(FLOODING_AREAS_FILE).stem: {
+        'area_id': 'Int64',
+        'area_name': 'string',
+        'flood_date': 'datetime',
+        'severity': 'string',
+        'affected_population': 'Int64',
+    },
+    Path(CITIZENS_FILE).stem: {
+        'citizen_id': 'Int64',
+        'name': 'string',
+        'address': 'string',
+        'phone': 'string',
+        'registration_date': 'datetime',
+    },
+}
+
+
+def nullable_integer(kind: str) -> str:
+    """Dtype inteiro anulável equivalente ('int64' -> 'Int64', 'uint8' -> 'UInt8'); outros tipos inalterados"""
+    if kind.startswith('uint'):
+        return 'UInt' + kind[4:]
+    if kind.startswith('int'):
+        return 'Int' + kind[3:]
+    return kind
+
+
+def infer_column_type(sample: pd.Series) -> str:
+    """
+    Infere o tipo de uma coluna a partir de uma amostra
+
+    Texto só vira 'datetime' se todos os valores não nulos da amostra forem datas;
+    texto curto (< STRING_LOWER_MAX_LEN) vira 'string' e texto longo vira 'text'.
+    Colunas com valores mistos ficam como 'object' (sem conversão).
+    """
+    if not (pd.api.types.is_object_dtype(sample) or pd.api.types.is_string_dtype(sample)):
+        return nullable_integer(str(sample.dtype))
+
+    values = sample.dropna()
+    if len(values) == 0 or pd.api.types.infer_dtype(values, skipna=True) != 'string':
+        return 'object'
+    with warnings.catch_warnings():
+        # Texto que não é data cai no parser elemento a elemento (dateutil), que avisa a cada coluna
+        warnings.simplefilter('ignore', UserWarning)
+        parsed = pd.to_datetime(values, errors='coerce')
+    if parsed.notna().all():
+        return 'datetime'
+    return 'string' if values.str.len().max() < STRING_LOWER_MAX_LEN else 'text'
+
+
+def infer_schema(gdf: gpd.GeoDataFrame, sample_rows: int = CONVERTER_SCHEMA_SAMPLE_ROWS) -> dict:
+    """Infere o schema ({coluna: tipo}) das primeiras sample_rows linhas"""
+    sample = gdf.head(sample_rows)
+    return {
+        col: infer_column_type(sample[col])
+        for col in gdf.columns if col != gdf.geometry.name
+    }
+
+
+def apply_schema(gdf: gpd.GeoDataFrame, schema: dict) -> gpd.GeoDataFrame:
+    """
+    Aplica o schema com um único cast vetorizado por coluna
+
+    Colunas ausentes do schema (ou 'object') são mantidas como estão. Inteiros
+    (inclusive 'int64' de um cache antigo) viram o dtype anulável; valores vazios
+    ou não numéricos viram <NA>.
+    """
+    for col, kind in schema.items():
+        if col not in gdf.columns or kind == 'object':
+            continue
+        values = gdf[col]
+        kind = nullable_integer(kind)
+        if kind == 'datetime':
+            gdf[col] = pd.to_datetime(values, errors='coerce')
+        elif kind in ('string', 'text'):
+            if not pd.api.types.is_string_dtype(values):
+                values = values.astype('string')
+            gdf[col] = values.str.lower() if kind == 'string' else values
+        elif str(values.dtype) != kind and pd.api.types.is_integer_dtype(kind):
+            gdf[col] = pd.to_numeric(values, errors='coerce').astype(kind)
+        elif str(values.dtype) != kind:
+            gdf[col] = values.astype(kind)
+    return gdf
+
+
+class SchemaRegistry:
+    """
+    Schemas por dataset: declarados em DECLARED_SCHEMAS ou inferidos uma vez de uma
+    amostra e guardados em cache (JSON na Silver). O cache é refeito quando as colunas
+    do arquivo de origem mudam.
+    """
+
+    def __init__(self, cache_file: Path, declared: Optional[dict] = None,
+                 sample_rows: int = CONVERTER_SCHEMA_SAMPLE_ROWS):
+        self.cache_file = Path(cache_file)
+        self.declared = DECLARED_SCHEMAS if declared is None else declared
+        self.sample_rows = sample_rows
+        self._cache = None
+
+    def _load_cache(self) -> dict:
+        if self._cache is None:
+            try:
+                self._cache = json.loads(self.cache_file.read_text())
+            except (OSError, ValueError):
+                self._cache = {}
+        return self._cache
+
+    def _save_cache(self, dataset: str) -> None:
+        # Relê o arquivo e grava só a entrada do dataset: workers da conversão paralela
+        # compartilham o cache e não devem sobrescrever os schemas uns dos outros
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            on_disk = json.loads(self.cache_file.read_text())
+        except (OSError, ValueError):
+            on_disk = {}
+        on_disk[dataset] = self._cache[dataset]
+        self._cache = on_disk
+        tmp = self.cache_file.with_suffix(f'.{os.getpid()}.tmp')
+        tmp.write_text(json.dumps(on_disk, indent=2, sort_keys=True))
+        tmp.replace(self.cache_file)
+
+    def get(self, dataset: str, gdf: gpd.GeoDataFrame) -> dict:
+        """
+        Retorna o schema do dataset (declarado, em cache ou inferido agora)
+
+        Args:
+            dataset: Nome do dataset (stem do arquivo de origem)
+            gdf: GeoDataFrame lido, usado para inferir o schema se necessário
+
+        Returns:
+            Dicionário {coluna: tipo}
+        """
+        if dataset in self.declared:
+            return self.declared[dataset]
+
+        columns = [col for col in gdf.columns if col != gdf.geometry.name]
+        cache = self._load_cache()
+        cached = cache.get(dataset)
+        if cached and cached.get('source_columns') == columns:
+            return cached['columns']
+
+        schema = infer_schema(gdf, self.sample_rows)
+        cache[dataset] = {'source_columns': columns, 'columns': schema}
+        self._save_cache(dataset)
+        logger.info(f"✓ Schema inferido para '{dataset}': {schema}")
+        return schema
+
+
+def make_valid_polygonal(geoms: np.ndarray) -> np.ndarray:
+    """
+    Repara polígonos mantendo só as partes poligonais
+
+    Usa make_valid(method='structure', keep_collapsed=False) (Shapely >= 2.1);
+    nas versões anteriores, sem `method`, repara com o make_valid padrão
+    ('linework') e extrai as partes poligonais do resultado. Sem nenhuma parte
+    poligonal o resultado é um polígono vazio.
+
+    Args:
+        geoms: Array de Polygon/MultiPolygon inválidos
+
+    Returns:
+        Array de Polygon/MultiPolygon válidos (ou vazios)
+    """
+    try:
+        return shapely.make_valid(geoms, method='structure', keep_collapsed=False)
+    except TypeError:
+        pass
+
+    parts, owners = shapely.get_parts(shapely.make_valid(geoms), return_index=True)
+    while np.isin(shapely.get_type_id(parts), MULTIPART_TYPE_IDS).any():
+        parts, index = shapely.get_parts(parts, return_index=True)
+        owners = owners[index]
+    keep = shapely.get_type_id(parts) == 3
+    parts, owners = parts[keep], owners[keep]
+
+    fixed = np.array([shapely.Polygon()] * len(geoms), dtype=object)
+    rows, owners, counts = np.unique(owners, return_inverse=True, return_counts=True)
+    if len(rows):
+        fixed[rows] = shapely.multipolygons(parts, indices=owners)
+        single = rows[counts == 1]
+        fixed[single] = shapely.get_geometry(fixed[single], 0)
+    return fixed
+
+
+def repair_geometries(gdf: gpd.GeoDataFrame) -> tuple:
+    """
+    Repara geometrias de forma vetorizada (Shapely 2) e descarta linhas sem geometria
+
+    Geometrias nulas, vazias ou com coordenadas NaN (lat/lon ausente no CSV) são
+    descartadas; is_valid é avaliado uma única vez e make_valid roda apenas nas
+    linhas inválidas. Reparos que resultam em geometria vazia também são descartados.
+
+    Args:
+        gdf: GeoDataFrame a reparar
+
+    Returns:
+        Tupla (GeoDataFrame reparado, contagens {'missing', 'invalid', 'repaired', 'dropped'})
+    """
+    geoms = gdf.geometry.values.to_numpy()
+    # bounds é NaN para nulo, vazio e ponto com coordenadas NaN
+    missing = np.isnan(shapely.bounds(geoms)).any(axis=1)
+    invalid = ~missing & ~shapely.is_valid(geoms)
+
+    invalid_idx = np.flatnonzero(invalid)
+    unrepaired = np.zeros(len(geoms), dtype=bool)
+    if len(invalid_idx):
+        geoms = geoms.copy()
+        bad = geoms[invalid_idx]
+        polygonal = np.isin(shapely.get_type_id(bad), POLYGONAL_TYPE_IDS)
+        fixed = np.empty(len(bad), dtype=object)
+        fixed[polygonal] = make_valid_polygonal(bad[polygonal])
+        fixed[~polygonal] = shapely.make_valid(bad[~polygonal])
+        geoms[invalid_idx] = fixed
+        unrepaired[invalid_idx] = shapely.is_empty(fixed)
+
+    drop = missing | unrepaired
+    counts = {
+        'missing': int(missing.sum()),
+        'invalid': len(invalid_idx),
+        'repaired': len(invalid_idx) - int(unrepaired.sum()),
+        'dropped': int(drop.sum()),
+    }
+    if len(invalid_idx):
+        gdf = gdf.set_geometry(gpd.GeoSeries(geoms, index=gdf.index, crs=gdf.crs))
+    if counts['dropped']:
+        gdf = gdf[~drop]
+    return gdf, counts
+
+
+def resolve_workers(workers: int) -> int:
+    """CONVERTER_WORKERS: 0 = todos os núcleos"""
+    return workers if workers and workers > 0 else (os.cpu_count() or 1)
+
 
 class CSVGeoJSONToGeoParquetConverter:
     """Converter para CSV/GeoJSON → GeoParquet"""
@@ -41,6 +297,7 @@ class CSVGeoJSONToGeoParquetConverter:
         # Lista de diretórios para busca (ordem de preferência)
         self.data_dirs = [self.data_dir, self.bronze_path]
         self.silver_path = Path(LOCAL_SILVER_PATH)
+        self.schemas = SchemaRegistry(self.silver_path / CONVERTER_SCHEMA_FILE)
         
     def convert_csv_to_geodataframe(self, csv_file: str, lat_col: str = 'latitude', 
                                     lon_col: str = 'longitude', crs: str = 'EPSG:4326') -> gpd.GeoDataFrame:
@@ -87,13 +344,30 @@ class CSVGeoJSONToGeoParquetConverter:
         gdf = gpd.read_file(geojson_file)
         return gdf
     
-    def normalize_dataframe(self, gdf: gpd.GeoDataFrame, source_type: str) -> gpd.GeoDataFrame:
+    def convert_geoparquet_to_geodataframe(self, parquet_file: str) -> gpd.GeoDataFrame:
+        """
+        Lê GeoParquet da Bronze como GeoDataFrame
+        
+        Args:
+            parquet_file: Caminho do arquivo GeoParquet
+            
+        Returns:
+            GeoDataFrame
+        """
+        logger.info(f"Lendo GeoParquet: {parquet_file}")
+        return gpd.read_parquet(parquet_file)
+    
+    def normalize_dataframe(self, gdf: gpd.GeoDataFrame, source_type: str,
+                            repair_stats: Optional[dict] = None,
+                            dataset: Optional[str] = None) -> gpd.GeoDataFrame:
         """
         Normaliza GeoDataFrame (tipos de dados, timestamps, validação)
         
         Args:
             gdf: GeoDataFrame a normalizar
             source_type: Tipo de fonte ('csv' ou 'geojson')
+            repair_stats: Dicionário opcional preenchido com as contagens do reparo de geometrias
+            dataset: Nome do dataset no registro de schemas (sem ele, o schema é inferido sem cache)
             
         Returns:
             GeoDataFrame normalizado
@@ -101,27 +375,18 @@ class CSVGeoJSONToGeoParquetConverter:
         logger.info(f"Normalizando {source_type.upper()} (linhas: {len(gdf)})")
         
         # Validar geometrias
-        gdf['geometry'] = gdf['geometry'].apply(lambda x: x if x.is_valid else x.buffer(0))
-        
-        # Padronizar tipos de dados
-        for col in gdf.columns:
-            if col == 'geometry':
-                continue
-                
-            # Detectar e converter datas
-            if gdf[col].dtype == 'object':
-                try:
-                    gdf[col] = pd.to_datetime(gdf[col], errors='coerce')
-                    # Se a conversão funcionou para alguns valores, manter como datetime
-                    if gdf[col].notna().sum() > 0:
-                        logger.debug(f"Coluna '{col}' convertida para datetime")
-                        continue
-                except:
-                    pass
-            
-            # Converter strings para lowercase (padronização)
-            if gdf[col].dtype == 'object' and gdf[col].str.len().max() < 100:
-                gdf[col] = gdf[col].apply(lambda x: x.lower() if isinstance(x, str) else x)
+        gdf, counts = repair_geometries(gdf)
+        if counts['invalid'] or counts['dropped']:
+            logger.warning(
+                f"⚠ Geometrias: {counts['repaired']}/{counts['invalid']} inválidas reparadas, "
+                f"{counts['missing']} ausentes, {counts['dropped']} linhas descartadas"
+            )
+        if repair_stats is not None:
+            repair_stats.update(counts)
+        
+        # Padronizar tipos de dados (schema declarado ou inferido de uma amostra)
+        schema = self.schemas.get(dataset, gdf) if dataset else infer_schema(gdf)
+        gdf = apply_schema(gdf, schema)
         
         # Adicionar metadados
         gdf['_processed_date'] = datetime.now().isoformat()
@@ -143,19 +408,24 @@ class CSVGeoJSONToGeoParquetConverter:
         output_path = Path(output_file)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        gdf.to_parquet(output_file)
+        # Grava em arquivo temporário e troca: leitores (e outros workers) nunca veem um arquivo parcial
+        tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+        gdf.to_parquet(tmp_path)
+        tmp_path.replace(output_path)
         
         # Verificar e logar informações
         file_size = Path(output_file).stat().st_size / (1024 * 1024)
         logger.info(f"GeoParquet salvo com sucesso: {file_size:.2f} MB")
     
-    def process_csv_file(self, csv_file: str, output_file: str) -> gpd.GeoDataFrame:
+    def process_csv_file(self, csv_file: str, output_file: str,
+                         repair_stats: Optional[dict] = None) -> gpd.GeoDataFrame:
         """
         Processa um arquivo CSV completo (leitura, normalização, salvamento)
         
         Args:
             csv_file: Arquivo CSV de entrada
             output_file: Arquivo GeoParquet de saída
+            repair_stats: Dicionário opcional preenchido com as contagens do reparo de geometrias
             
         Returns:
             GeoDataFrame processado
@@ -166,7 +436,7 @@ class CSVGeoJSONToGeoParquetConverter:
         gdf = self.convert_csv_to_geodataframe(csv_file)
         
         # Normalizar
-        gdf = self.normalize_dataframe(gdf, 'csv')
+        gdf = self.normalize_dataframe(gdf, 'csv', repair_stats, Path(csv_file).stem)
         
         # Salvar
         self.save_to_geoparquet(gdf, output_file)
@@ -174,13 +444,15 @@ class CSVGeoJSONToGeoParquetConverter:
         logger.info(f"CSV processado: {len(gdf)} registros")
         return gdf
     
-    def process_geojson_file(self, geojson_file: str, output_file: str) -> gpd.GeoDataFrame:
+    def process_geojson_file(self, geojson_file: str, output_file: str,
+                             repair_stats: Optional[dict] = None) -> gpd.GeoDataFrame:
         """
         Processa um arquivo GeoJSON completo (leitura, normalização, salvamento)
         
         Args:
             geojson_file: Arquivo GeoJSON de entrada
             output_file: Arquivo GeoParquet de saída
+            repair_stats: Dicionário opcional preenchido com as contagens do reparo de geometrias
             
         Returns:
             GeoDataFrame processado
@@ -191,7 +463,7 @@ class CSVGeoJSONToGeoParquetConverter:
         gdf = self.convert_geojson_to_geodataframe(geojson_file)
         
         # Normalizar
-        gdf = self.normalize_dataframe(gdf, 'geojson')
+        gdf = self.normalize_dataframe(gdf, 'geojson', repair_stats, Path(geojson_file).stem)
         
         # Salvar
         self.save_to_geoparquet(gdf, output_file)
@@ -199,64 +471,144 @@ class CSVGeoJSONToGeoParquetConverter:
         logger.info(f"GeoJSON processado: {len(gdf)} registros")
         return gdf
     
-    def process_all_files(self) -> dict:
+    def process_geoparquet_file(self, parquet_file: str, output_file: str,
+                                repair_stats: Optional[dict] = None) -> gpd.GeoDataFrame:
         """
-        Processa todos os arquivos CSV/GeoJSON encontrados no diretório de dados
+        Processa um arquivo GeoParquet completo (leitura, normalização, salvamento)
         
+        Args:
+            parquet_file: Arquivo GeoParquet de entrada
+            output_file: Arquivo GeoParquet de saída
+            repair_stats: Dicionário opcional preenchido com as contagens do reparo de geometrias
+            
         Returns:
-            Dicionário com resultados (arquivo → GeoDataFrame)
+            GeoDataFrame processado
         """
-        results = {}
+        logger.info(f"Processando GeoParquet: {parquet_file}")
         
-        # Processar CSVs — buscar em múltiplos diretórios (SAMPLE_DATA_DIR e bronze local)
-        csv_files = []
-        for d in self.data_dirs:
-            if d.exists():
-                csv_files.extend(list(Path(d).glob('*.csv')))
-        logger.info(f"Encontrados {len(csv_files)} arquivos CSV")
+        gdf = self.convert_geoparquet_to_geodataframe(parquet_file)
+        gdf = self.normalize_dataframe(gdf, 'parquet', repair_stats, Path(parquet_file).stem)
+        self.save_to_geoparquet(gdf, output_file)
         
-        for csv_file in csv_files:
-            try:
-                output_file = self.silver_path / f"{csv_file.stem}.parquet"
-                gdf = self.process_csv_file(str(csv_file), str(output_file))
-                results[csv_file.name] = {
-                    'status': 'success',
-                    'geodataframe': gdf,
-                    'records': len(gdf),
-                    'output': str(output_file)
-                }
-            except Exception as e:
-                logger.error(f"Erro processando {csv_file.name}: {str(e)}")
-                results[csv_file.name] = {
-                    'status': 'error',
-                    'error': str(e)
-                }
-        
-        # Processar GeoJSONs
-        # Processar GeoJSONs — buscar em múltiplos diretórios (SAMPLE_DATA_DIR e bronze local)
-        geojson_files = []
-        for d in self.data_dirs:
-            if d.exists():
-                geojson_files.extend(list(Path(d).glob('*.geojson')))
-        logger.info(f"Encontrados {len(geojson_files)} arquivos GeoJSON")
-        
-        for geojson_file in geojson_files:
-            try:
-                output_file = self.silver_path / f"{geojson_file.stem}.parquet"
-                gdf = self.process_geojson_file(str(geojson_file), str(output_file))
-                results[geojson_file.name] = {
-                    'status': 'success',
-                    'geodataframe': gdf,
-                    'records': len(gdf),
-                    'output': str(output_file)
-                }
-            except Exception as e:
-                logger.error(f"Erro processando {geojson_file.name}: {str(e)}")
-                results[geojson_file.name] = {
-                    'status': 'error',
-                    'error': str(e)
-                }
+        logger.info(f"GeoParquet processado: {len(gdf)} registros")
+        return gdf
+    
+    def resolve_sources(self, format_priority: Optional[List[str]] = None) -> tuple:
+        """
+        Escolhe um arquivo de origem por dataset (stem) em SAMPLE_DATA_DIR e na Bronze local
+
+        O bronze_loader grava o mesmo dataset em GeoParquet, CSV e GeoJSON, e todos iriam
+        para o mesmo arquivo na Silver; só o formato de maior prioridade é convertido
+        (empate: diretório na ordem de self.data_dirs).
+
+        Args:
+            format_priority: Formatos em ordem de preferência (padrão: CONVERTER_FORMAT_PRIORITY)
+
+        Returns:
+            Tupla (arquivos escolhidos, maiores primeiro; {arquivo ignorado: arquivo escolhido})
+        """
+        format_priority = format_priority or CONVERTER_FORMAT_PRIORITY
+        by_stem = {}
+        for fmt in format_priority:
+            for d in self.data_dirs:
+                if d.exists():
+                    for f in sorted(Path(d).glob(f'*.{fmt}')):
+                        by_stem.setdefault(f.stem, []).append(f)
+
+        selected, skipped = [], {}
+        for candidates in by_stem.values():
+            chosen = candidates[0]
+            selected.append(chosen)
+            for other in candidates[1:]:
+                skipped[str(other)] = str(chosen)
+        selected.sort(key=lambda f: f.stat().st_size, reverse=True)
+        return selected, skipped
+    
+    def convert_file(self, source_file: Path, keep_geodataframe: bool = True) -> dict:
+        """
+        Converte um arquivo de origem para a Silver, capturando erros e medindo o tempo
+        
+        Args:
+            source_file: Arquivo GeoParquet, CSV ou GeoJSON de entrada
+            keep_geodataframe: Incluir o GeoDataFrame no resultado (desligado nos workers
+                para não serializar os dados de volta ao processo principal)
+            
+        Returns:
+            Resultado do arquivo no formato de process_all_files
+        """
+        source_file = Path(source_file)
+        output_file = self.silver_path / f"{source_file.stem}.parquet"
+        start = time.perf_counter()
+        process = {
+            '.parquet': self.process_geoparquet_file,
+            '.csv': self.process_csv_file,
+            '.geojson': self.process_geojson_file,
+        }[source_file.suffix.lower()]
+        try:
+            repair_stats = {}
+            gdf = process(str(source_file), str(output_file), repair_stats)
+            result = {
+                'status': 'success',
+                'records': len(gdf),
+                'geometry_repair': repair_stats,
+                'output': str(output_file)
+            }
+            if keep_geodataframe:
+                result['geodataframe'] = gdf
+        except Exception as e:
+            logger.error(f"Erro processando {source_file.name}: {str(e)}")
+            result = {
+                'status': 'error',
+                'error': str(e)
+            }
+        result['seconds'] = round(time.perf_counter() - start, 3)
+        return result
+    
+    def process_all_files(self, workers: int = CONVERTER_WORKERS) -> dict:
+        """
+        Processa um arquivo por dataset (ver resolve_sources); cópias em outros formatos
+        entram no resultado com status 'skipped'
         
+        Args:
+            workers: Processos em paralelo (1 = sequencial, 0 = todos os núcleos); no modo
+                paralelo os resultados não trazem o GeoDataFrame
+            
+        Returns:
+            Dicionário com resultados (arquivo → resultado)
+        """
+        source_files, skipped = self.resolve_sources()
+        for fmt in CONVERTER_FORMAT_PRIORITY:
+            count = sum(1 for f in source_files if f.suffix.lower() == f'.{fmt}')
+            logger.info(f"Encontrados {count} arquivo(s) {fmt.upper()}")
+        for source, chosen in skipped.items():
+            logger.info(f"  Ignorado {Path(source).name}: dataset já convertido a partir de {Path(chosen).name}")
+        results = {
+            Path(source).name: {'status': 'skipped', 'selected': Path(chosen).name}
+            for source, chosen in skipped.items()
+        }
+        
+        workers = min(resolve_workers(workers), max(1, len(source_files)))
+        if workers == 1:
+            results.update({f.name: self.convert_file(f) for f in source_files})
+            return results
+        
+        logger.info(f"Pool de {workers} processos para {len(source_files)} arquivo(s) (maiores primeiro)")
+        by_file = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_convert_worker) as pool:
+            # O pool consome a fila na ordem de submissão: os maiores arquivos começam primeiro
+            futures = {pool.submit(_convert_file_worker, str(f)): f for f in source_files}
+            for future in as_completed(futures):
+                source_file = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Erro processando {source_file.name}: {str(e)}")
+                    result = {'status': 'error', 'error': str(e)}
+                by_file[source_file] = result
+                if result['status'] == 'success':
+                    logger.info(f"✓ {source_file.name}: {result['records']} registros em {result['seconds']:.1f}s")
+        
+        results.update({f.name: by_file[f] for f in source_files})
         return results
     
     def get_summary(self, results: dict) -> dict:
@@ -269,16 +621,39 @@ class CSVGeoJSONToGeoParquetConverter:
         Returns:
             Resumo com estatísticas
         """
+        converted = {name: r for name, r in results.items() if r['status'] != 'skipped'}
         summary = {
-            'total_files': len(results),
+            'total_files': len(converted),
             'successful': sum(1 for r in results.values() if r['status'] == 'success'),
             'failed': sum(1 for r in results.values() if r['status'] == 'error'),
             'total_records': sum(r.get('records', 0) for r in results.values() if r['status'] == 'success'),
+            'timings': {name: r.get('seconds') for name, r in converted.items()},
+            'skipped': {name: r['selected'] for name, r in results.items() if r['status'] == 'skipped'},
+            'geometry_repair': {
+                key: sum(r.get('geometry_repair', {}).get(key, 0) for r in results.values())
+                for key in ('missing', 'invalid', 'repaired', 'dropped')
+            },
             'details': results
         }
         return summary
 
 
+# Conversor de cada processo do pool
+_worker_converter = None
+
+
+def _init_convert_worker():
+    """Cria o conversor uma vez por worker"""
+    global _worker_converter
+    logger.setLevel(logging.WARNING)
+    _worker_converter = CSVGeoJSONToGeoParquetConverter()
+
+
+def _convert_file_worker(source_file: str) -> dict:
+    """Converte um arquivo no worker; só o resumo (sem GeoDataFrame) volta ao processo principal"""
+    return _worker_converter.convert_file(Path(source_file), keep_geodataframe=False)
+
+
 def run_conversion():
     """Executa conversão CSV/GeoJSON → GeoParquet"""
     
@@ -297,7 +672,15 @@ def run_conversion():
     logger.info(f"Total de arquivos: {summary['total_files']}")
     logger.info(f"Sucesso: {summary['successful']}")
     logger.info(f"Falhas: {summary['failed']}")
+    logger.info(f"Ignorados (outro formato do mesmo dataset): {len(summary['skipped'])}")
     logger.info(f"Total de registros: {summary['total_records']}")
+    slowest = sorted(((t, name) for name, t in summary['timings'].items() if t is not None), reverse=True)
+    logger.info("Arquivos mais lentos:")
+    for seconds, name in slowest[:5]:
+        logger.info(f"  {name}: {seconds:.1f}s")
+    repair = summary['geometry_repair']
+    logger.info(f"Geometrias: {repair['repaired']}/{repair['invalid']} inválidas reparadas, "
+                f"{repair['missing']} ausentes, {repair['dropped']} linhas descartadas")
     logger.info("=" * 80)
     
     return summary
@@ -317,5 +700,7 @@ if __name__ == '__main__':
     for filename, result in summary['details'].items():
         if result['status'] == 'success':
             logger.info(f"✓ {filename}: {result['records']} registros → {result['output']}")
+        elif result['status'] == 'skipped':
+            logger.info(f"- {filename}: ignorado (usado {result['selected']})")
         else:
             logger.error(f"✗ {filename}: {result['error']}")
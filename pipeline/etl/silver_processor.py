@@ -7,17 +7,37 @@ Silver Processor - Normaliza dados da camada Bronze para Silver
 """
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import shapely
 import logging
+from pathlib import Path
 from config import (
     SAMPLE_DATA_DIR, FLOODING_AREAS_FILE, CITIZENS_FILE,
+    FLOODING_AREA_PARTS_FILE, FLOOD_SUBDIVIDE_MAX_VERTICES,
+    SILVER_BATCH_SIZE, SILVER_DEDUP_BITMAP_MAX_ID,
     AWS_S3_SILVER_BUCKET, S3_SILVER_PREFIX,
     LOCAL_BRONZE_PATH, LOCAL_SILVER_PATH, USE_MINIO,
     AWS_ENDPOINT_URL, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY
 )
+from etl.geoparquet import GeoParquetWriter, iter_geoparquet_batches
 
 logger = logging.getLogger(__name__)
 
+# Tipos Arrow dos cidadãos da Silver: o schema não depende dos valores do
+# 1º lote (um lote com name/address só nulos não fixa a coluna como null)
+SILVER_CITIZEN_COLUMN_TYPES = {
+    'citizen_id': pa.int64(),
+    'name': pa.string(),
+    'address': pa.string(),
+    'phone': pa.string(),
+    'registration_date': pa.timestamp('us'),
+    'geometry_valid': pa.bool_(),
+    'normalized_date': pa.timestamp('us'),
+    'data_quality_score': pa.float64(),
+}
+
 
 def load_from_bronze(filename):
     """Carrega arquivos da camada Bronze (local ou S3)
@@ -33,6 +53,62 @@ def load_from_bronze(filename):
     return gdf
 
 
+def iter_bronze_batches(filename, batch_size=SILVER_BATCH_SIZE):
+    """Lê um GeoParquet da Bronze em lotes de até `batch_size` linhas (ver iter_geoparquet_batches)"""
+    return iter_geoparquet_batches(Path(LOCAL_BRONZE_PATH) / filename, batch_size)
+
+
+class SeenIds:
+    """
+    Ids já vistos em lotes anteriores, em memória limitada
+
+    Ids em [0, max_id) ficam num bitmap de 1 bit por id, que cresce até o
+    maior id visto (10M ids = 1.25 MB; teto de max_id / 8 bytes); ids fora
+    dessa faixa vão para um array ordenado (8 bytes por id), com um aviso
+    quando ele passa de OTHERS_WARN ids.
+    """
+
+    OTHERS_WARN = 1_000_000
+
+    def __init__(self, max_id=SILVER_DEDUP_BITMAP_MAX_ID):
+        self.max_id = max_id
+        self.bits = np.zeros(0, dtype=np.uint8)
+        self.others = np.array([], dtype=np.int64)
+        self._warned = False
+
+    def add_new(self, ids):
+        """Marca os ids como vistos; True só na 1ª ocorrência de id ainda não visto"""
+        ids = np.asarray(ids, dtype=np.int64)
+        new = np.zeros(len(ids), dtype=bool)
+        new[np.unique(ids, return_index=True)[1]] = True
+        in_bitmap = (ids >= 0) & (ids < self.max_id)
+        
+        idx = np.flatnonzero(in_bitmap)
+        if len(idx):
+            values = ids[idx]
+            needed = int(values.max() >> 3) + 1
+            if needed > len(self.bits):
+                grown = min(max(needed, 2 * len(self.bits)), (self.max_id >> 3) + 1)
+                self.bits = np.concatenate([self.bits, np.zeros(grown - len(self.bits), dtype=np.uint8)])
+            seen = (self.bits[values >> 3] >> (values & 7).astype(np.uint8)) & 1
+            new[idx] &= seen == 0
+            marked = values[new[idx]]
+            np.bitwise_or.at(self.bits, marked >> 3, np.left_shift(1, marked & 7).astype(np.uint8))
+        
+        idx = np.flatnonzero(~in_bitmap)
+        if len(idx):
+            values = ids[idx]
+            new[idx] &= ~np.isin(values, self.others)
+            self.others = np.union1d(self.others, values[new[idx]])
+            if len(self.others) > self.OTHERS_WARN and not self._warned:
+                self._warned = True
+                logger.warning(
+                    f"  ⚠ {len(self.others)} citizen_id fora de [0, {self.max_id}) no dedup "
+                    f"({self.others.nbytes / 2 ** 20:.0f} MB); ajuste SILVER_DEDUP_BITMAP_MAX_ID"
+                )
+        return new
+
+
 def normalize_flooding_areas(gdf):
     """Normaliza dados de áreas de enchente"""
     logger.info("Normalizando áreas de enchente...")
@@ -63,8 +139,13 @@ def normalize_flooding_areas(gdf):
     return gdf
 
 
-def normalize_citizens(gdf):
-    """Normaliza dados de cidadãos"""
+def normalize_citizens(gdf, seen_ids=None, normalized_date=None):
+    """
+    Normaliza dados de cidadãos
+
+    Com `seen_ids` (SeenIds) descarta também citizen_id já vistos em lotes
+    anteriores; `normalized_date` fixa a data de controle entre lotes.
+    """
     logger.info("Normalizando dados de cidadãos...")
     
     gdf = gdf.copy()
@@ -77,8 +158,11 @@ def normalize_citizens(gdf):
         logger.warning(f"  ⚠ Encontradas {invalid_count} geometrias inválidas")
         gdf = gdf[gdf['geometry_valid']].copy()
     
-    # Remover duplicatas
-    gdf = gdf.drop_duplicates(subset=['citizen_id'])
+    # Remover duplicatas (também entre lotes, no modo streaming)
+    if seen_ids is None:
+        gdf = gdf.drop_duplicates(subset=['citizen_id'])
+    else:
+        gdf = gdf[seen_ids.add_new(gdf['citizen_id'].to_numpy())]
     
     # Tratar nulos
     gdf['phone'] = gdf['phone'].fillna('N/A')
@@ -90,21 +174,77 @@ def normalize_citizens(gdf):
     gdf['address'] = gdf['address'].str.strip() if gdf['address'].dtype == 'object' else gdf['address']
     
     # Adicionar campos de controle
-    gdf['normalized_date'] = pd.Timestamp.now()
+    gdf['normalized_date'] = normalized_date or pd.Timestamp.now()
     gdf['data_quality_score'] = 1.0
     
     logger.info(f"✓ Normalizado: {len(gdf)} registros válidos")
     return gdf
 
 
+def subdivide_flooding_areas(gdf, max_vertices=FLOOD_SUBDIVIDE_MAX_VERTICES, max_depth=16):
+    """
+    Subdivide os polígonos de enchente em partes de até `max_vertices` vértices
+
+    Equivalente ao ST_Subdivide do PostGIS: partes maiores que o limite são
+    cortadas ao meio no eixo maior do envelope, recursivamente. Retorna um
+    GeoDataFrame (area_id, part_id, geometry) cuja união por area_id é a área
+    original; o batimento Gold testa os pontos contra essas partes.
+    """
+    logger.info(f"Subdividindo áreas de enchente (até {max_vertices} vértices por parte)...")
+    
+    geometries, owners = shapely.get_parts(gdf.geometry.values, return_index=True)
+    area_ids = gdf['area_id'].to_numpy()[owners]
+    done_geometries, done_ids = [], []
+    
+    for depth in range(max_depth + 1):
+        keep = (shapely.get_type_id(geometries) == 3) & ~shapely.is_empty(geometries)
+        geometries, area_ids = geometries[keep], area_ids[keep]
+        small = shapely.get_num_coordinates(geometries) <= max_vertices
+        if depth == max_depth:
+            small[:] = True
+        done_geometries.append(geometries[small])
+        done_ids.append(area_ids[small])
+        geometries, area_ids = geometries[~small], area_ids[~small]
+        if len(geometries) == 0:
+            break
+        
+        # Corta cada parte grande em duas pelo meio do eixo maior do envelope
+        xmin, ymin, xmax, ymax = shapely.bounds(geometries).T
+        wide = (xmax - xmin) >= (ymax - ymin)
+        xmid = np.where(wide, (xmin + xmax) / 2, xmax)
+        ymid = np.where(wide, ymax, (ymin + ymax) / 2)
+        first = shapely.box(xmin, ymin, xmid, ymid)
+        second = shapely.box(np.where(wide, xmid, xmin), np.where(wide, ymin, ymid), xmax, ymax)
+        halves = np.concatenate([
+            shapely.intersection(geometries, first),
+            shapely.intersection(geometries, second),
+        ])
+        geometries, owners = shapely.get_parts(halves, return_index=True)
+        area_ids = np.concatenate([area_ids, area_ids])[owners]
+    
+    parts = gpd.GeoDataFrame(
+        {'area_id': np.concatenate(done_ids).astype('int64')},
+        geometry=np.concatenate(done_geometries),
+        crs=gdf.crs,
+    ).sort_values('area_id', kind='stable').reset_index(drop=True)
+    parts['part_id'] = np.arange(len(parts), dtype='int64')
+    parts = parts[['area_id', 'part_id', 'geometry']]
+    
+    logger.info(f"✓ Subdividido: {len(gdf)} áreas → {len(parts)} partes")
+    return parts
+
+
 def save_to_silver(gdf, filename):
     """Salva dados normalizados na camada Silver (local ou S3)"""
     # Salvar localmente na pasta silver (volume)
     filepath = f"{LOCAL_SILVER_PATH}/{filename}"
     gdf.to_parquet(filepath)
     logger.info(f"✓ Salvo Silver: {filepath}")
+    upload_to_silver(filepath, filename)
+
 
-    # Upload S3/MinIO (opcional) - somente quando configurado
+def upload_to_silver(filepath, filename):
+    """Upload S3/MinIO (opcional) de um arquivo da Silver - somente quando configurado"""
     if USE_MINIO or (AWS_S3_SILVER_BUCKET and AWS_S3_SILVER_BUCKET != ''):
         try:
             import boto3
@@ -126,8 +266,49 @@ def save_to_silver(gdf, filename):
             logger.warning(f"⚠ Upload S3 falhou: {e}")
 
 
-def process_silver():
-    """Orquestrador: normaliza todos os dados da Bronze"""
+class SilverParquetWriter(GeoParquetWriter):
+    """Escrita incremental de um arquivo de cidadãos da Silver (schema SILVER_CITIZEN_COLUMN_TYPES), com upload ao fechar"""
+
+    def __init__(self, filename, crs='EPSG:4326'):
+        super().__init__(Path(LOCAL_SILVER_PATH) / filename, SILVER_CITIZEN_COLUMN_TYPES, crs)
+        self.filename = filename
+
+    def close(self):
+        super().close()
+        logger.info(f"✓ Salvo Silver: {self.filepath} ({self.rows} registros)")
+        upload_to_silver(str(self.filepath), self.filename)
+
+
+def stream_citizens_to_silver(batch_size=SILVER_BATCH_SIZE):
+    """
+    Normaliza os cidadãos da Bronze lote a lote, gravando a Silver incrementalmente
+
+    A memória de pico depende do lote e do bitmap de ids (dedup entre lotes),
+    não do tamanho do arquivo. Retorna as contagens.
+    """
+    seen_ids = SeenIds()
+    writer = SilverParquetWriter(f"silver_{CITIZENS_FILE}")
+    normalized_date = pd.Timestamp.now()
+    batches = read = 0
+    
+    for citizens_batch in iter_bronze_batches(CITIZENS_FILE, batch_size):
+        batches += 1
+        read += len(citizens_batch)
+        citizens_silver = normalize_citizens(citizens_batch, seen_ids, normalized_date)
+        writer.write(citizens_silver)
+    writer.close()
+    
+    return {'batches': batches, 'read': read, 'citizens': writer.rows}
+
+
+def process_silver(batch_size=SILVER_BATCH_SIZE):
+    """
+    Orquestrador: normaliza todos os dados da Bronze
+
+    Áreas de enchente (poucas) são normalizadas em memória; cidadãos em lotes
+    de `batch_size` (0 = arquivo inteiro em memória). Retorna um resumo com
+    as contagens.
+    """
     logger.info("=" * 60)
     logger.info("SILVER PROCESSOR - Normalizando dados")
     logger.info("=" * 60)
@@ -136,17 +317,27 @@ def process_silver():
     flooding_bronze = load_from_bronze(FLOODING_AREAS_FILE)
     flooding_silver = normalize_flooding_areas(flooding_bronze)
     save_to_silver(flooding_silver, f"silver_{FLOODING_AREAS_FILE}")
+    if FLOOD_SUBDIVIDE_MAX_VERTICES > 0:
+        save_to_silver(subdivide_flooding_areas(flooding_silver), FLOODING_AREA_PARTS_FILE)
     
     # Processar dados de cidadãos
-    citizens_bronze = load_from_bronze(CITIZENS_FILE)
-    citizens_silver = normalize_citizens(citizens_bronze)
-    save_to_silver(citizens_silver, f"silver_{CITIZENS_FILE}")
+    if batch_size:
+        summary = stream_citizens_to_silver(batch_size)
+    else:
+        citizens_bronze = load_from_bronze(CITIZENS_FILE)
+        citizens_silver = normalize_citizens(citizens_bronze)
+        save_to_silver(citizens_silver, f"silver_{CITIZENS_FILE}")
+        summary = {'batches': 1, 'read': len(citizens_bronze), 'citizens': len(citizens_silver)}
+    summary['flooding_areas'] = len(flooding_silver)
     
     logger.info("=" * 60)
-    logger.info("✓ Silver layer pronta!")
+    logger.info(
+        f"✓ Silver layer pronta! ({summary['batches']} lote(s), {summary['citizens']} cidadãos "
+        f"de {summary['read']} lidos)"
+    )
     logger.info("=" * 60)
     
-    return flooding_silver, citizens_silver
+    return summary
 
 
 if __name__ == '__main__':
@@ -64,13 +64,13 @@ def main():
         logger.info(f"  Total de registros convertidos: {conversion_summary['total_records']}")
         
         logger.info("\n[2b/6] SILVER - Normalizando dados gerados...")
-        flooding_silver, citizens_silver = process_silver()
-        logger.info(f"✓ Silver: {len(flooding_silver)} áreas + {len(citizens_silver)} cidadãos")
+        silver_summary = process_silver()
+        logger.info(f"✓ Silver: {silver_summary['flooding_areas']} áreas + {silver_summary['citizens']} cidadãos")
         
         # GOLD: Processamento geoespacial
         logger.info("\n[3/6] GOLD - Batimento geográfico...")
-        affected, unaffected, all_summary = process_gold()
-        logger.info(f"✓ Gold: {len(affected)} afetados + {len(unaffected)} não afetados")
+        gold_summary = process_gold()
+        logger.info(f"✓ Gold: {gold_summary['affected']} afetados + {gold_summary['unaffected']} não afetados")
         
         # POSTGIS: Carregar banco de dados
         logger.info("\n[4/6] POSTGIS - Importar dados...")
@@ -82,10 +82,10 @@ def main():
         logger.info("\n[5/6] RESUMO FINAL")
         logger.info("=" * 70)
         logger.info(f"✓ PIPELINE CONCLUÍDO COM SUCESSO!")
-        logger.info(f"  Cidadãos Atingidos: {len(affected)}")
-        logger.info(f"  Cidadãos Não Atingidos: {len(unaffected)}")
-        logger.info(f"  Total Avaliado: {len(all_summary)}")
-        logger.info(f"  Percentual Atingido: {(len(affected)/len(all_summary)*100):.1f}%")
+        logger.info(f"  Cidadãos Atingidos: {gold_summary['affected']}")
+        logger.info(f"  Cidadãos Não Atingidos: {gold_summary['unaffected']}")
+        logger.info(f"  Total Avaliado: {gold_summary['total']}")
+        logger.info(f"  Percentual Atingido: {(gold_summary['affected']/max(gold_summary['total'], 1)*100):.1f}%")
         logger.info(f"\nArquivos Gold gerados:")
         logger.info(f"  1. {AFFECTED_CITIZENS_FILE}")
         logger.info(f"  2. {UNAFFECTED_CITIZENS_FILE}")
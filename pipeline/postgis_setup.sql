@@ -57,24 +57,69 @@ SELECT ST_AsText(ST_Extent(geometry)) as bbox FROM citizens;
 
 -- 5. Análises espaciais
 
--- Contar cidadãos por area de enchente
+-- Contar cidadãos por area de enchente (via partes subdivididas, ver flooding_area_parts).
+-- Mesmo predicado de FLOOD_MATCHES_CTE (etl/postgis_loader.py): ST_Contains na parte e,
+-- para pontos sobre os cortes entre partes, ST_Within no polígono inteiro; as contagens
+-- batem com flood_area_stats da última carga
+WITH matches AS (
+    SELECT DISTINCT p.area_id, c.citizen_id
+    FROM flooding_area_parts p
+    JOIN citizens c ON ST_Intersects(p.geometry, c.geometry)
+    JOIN flooding_areas f ON f.area_id = p.area_id
+    WHERE ST_Contains(p.geometry, c.geometry) OR ST_Within(c.geometry, f.geometry)
+)
 SELECT 
     fa.area_name,
-    COUNT(c.citizen_id) as affected_count
+    COUNT(m.citizen_id) as affected_count
 FROM flooding_areas fa
-LEFT JOIN citizens c ON ST_Contains(fa.geometry, c.geometry)
-WHERE c.affected_by_flooding = TRUE
-GROUP BY fa.area_name;
+LEFT JOIN matches m ON m.area_id = fa.area_id
+GROUP BY fa.area_id, fa.area_name
+ORDER BY fa.area_id;
 
--- Distância mínima de cada cidadão para área de enchente
+-- Distância mínima de cada cidadão para área de enchente (calculada na Gold:
+-- nearest_area_id, distance_to_flood_m em metros e risk_band)
 SELECT 
     c.citizen_id,
     c.name,
-    MIN(ST_Distance(c.geometry::geography, fa.geometry::geography)) as min_distance_meters
+    c.nearest_area_id,
+    c.distance_to_flood_m as min_distance_meters,
+    c.risk_band
 FROM citizens c
-CROSS JOIN flooding_areas fa
-GROUP BY c.citizen_id, c.name
-ORDER BY min_distance_meters
+WHERE NOT c.affected_by_flooding
+ORDER BY c.distance_to_flood_m
+LIMIT 10;
+
+-- Cidadãos por faixa de risco
+SELECT risk_band, COUNT(*) as citizens
+FROM citizens
+GROUP BY risk_band
+ORDER BY MIN(distance_to_flood_m);
+
+-- Recalcular no banco sem CROSS JOIN: vizinho mais próximo pelo índice GiST (<-> ordena em graus)
+SELECT 
+    c.citizen_id,
+    nearest.area_id,
+    ST_Distance(c.geometry::geography, nearest.geometry::geography) as min_distance_meters
+FROM citizens c
+CROSS JOIN LATERAL (
+    SELECT p.area_id, p.geometry
+    FROM flooding_area_parts p
+    ORDER BY p.geometry <-> c.geometry
+    LIMIT 1
+) nearest
+LIMIT 10;
+
+-- Histórico de eventos: quem foi atingido entre duas datas e por quantos eventos
+-- (usa a PK de citizen_flood_events, que começa por event_date)
+SELECT 
+    e.citizen_id,
+    COUNT(DISTINCT e.event_date) as events,
+    MIN(e.event_date) as first_event,
+    MAX(e.event_date) as last_event
+FROM citizen_flood_events e
+WHERE e.event_date BETWEEN DATE '2024-05-01' AND DATE '2024-06-30'
+GROUP BY e.citizen_id
+ORDER BY events DESC
 LIMIT 10;
 
 -- 6. Criar view para dashboard Flask
@@ -103,26 +148,21 @@ WHERE affected_by_flooding = FALSE;
 -- 7. Consultar view
 SELECT * FROM v_citizens_summary;
 
--- 8. Criar tabela de estatísticas (opcional)
-
-CREATE TABLE IF NOT EXISTS pipeline_runs (
-    run_id SERIAL PRIMARY KEY,
-    run_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    total_citizens INTEGER,
-    affected_citizens INTEGER,
-    unaffected_citizens INTEGER,
-    processing_time_seconds DECIMAL,
-    status VARCHAR(20)
-);
-
--- Inserir registro de execução
-INSERT INTO pipeline_runs (total_citizens, affected_citizens, unaffected_citizens, status)
-SELECT 
-    COUNT(*),
-    COUNT(*) FILTER (WHERE affected_by_flooding = TRUE),
-    COUNT(*) FILTER (WHERE affected_by_flooding = FALSE),
-    'success'
-FROM citizens;
+-- 8. Estatísticas por carga
+-- pipeline_runs, flood_area_stats e severity_stats são criadas e preenchidas
+-- pelo pipeline (etl/postgis_loader.py::refresh_statistics) ao fim de cada
+-- carga; cada run_id também é a versão do dataset usada pelo Flask.
+
+-- Resumo por área de enchente da última carga
+SELECT s.area_id, s.area_name, s.severity, s.citizens
+FROM flood_area_stats s
+WHERE s.run_id = (SELECT MAX(run_id) FROM pipeline_runs)
+ORDER BY s.area_id;
+
+-- Resumo por severidade da última carga
+SELECT s.severity, s.citizens
+FROM severity_stats s
+WHERE s.run_id = (SELECT MAX(run_id) FROM pipeline_runs);
 
 -- Consultar histórico
 SELECT * FROM pipeline_runs ORDER BY run_date DESC;
@@ -0,0 +1,113 @@
+"""
+Fixtures dos testes da pipeline
+
+config.py lê o ambiente na importação: os caminhos das camadas apontam para
+um diretório temporário antes de qualquer import de etl.*, e cada teste que
+grava arquivos redireciona os caminhos dos módulos para o seu tmp_path.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+
+PIPELINE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PIPELINE_DIR))
+
+_DATA_DIR = Path(tempfile.mkdtemp(prefix='esteira-tests-'))
+for _layer in ('bronze', 'silver', 'gold'):
+    os.environ[f'LOCAL_{_layer.upper()}_PATH'] = str(_DATA_DIR / _layer)
+os.environ['GOLD_STATE_PATH'] = str(_DATA_DIR / 'gold' / '_state')
+os.environ['GOLD_HISTORY_PATH'] = str(_DATA_DIR / 'gold' / 'history')
+os.environ['FLOOD_DEPTH_RASTER'] = ''
+
+
+def make_flooding_areas():
+    """Três áreas: duas sobrepostas (1 e 2) e uma isolada (3), com severidades diferentes"""
+    return gpd.GeoDataFrame(
+        {
+            'area_id': np.array([1, 2, 3], dtype='int64'),
+            'area_name': ['Partenon', 'Centro', 'Sarandi'],
+            'flood_date': pd.to_datetime(['2024-05-03', '2024-05-03', '2024-06-10']),
+            'severity': ['high', 'very_high', 'low'],
+            'affected_population': np.array([2500, 5000, 800], dtype='int64'),
+        },
+        geometry=[
+            shapely.box(-51.30, -30.10, -51.20, -30.00),
+            shapely.box(-51.25, -30.05, -51.15, -29.95),
+            shapely.box(-51.10, -29.90, -51.05, -29.85),
+        ],
+        crs='EPSG:4326',
+    )
+
+
+def make_citizens(x, y, start_id=0):
+    """Cidadãos da Silver nas coordenadas dadas"""
+    n = len(x)
+    return gpd.GeoDataFrame(
+        {
+            'citizen_id': np.arange(start_id, start_id + n, dtype='int64'),
+            'name': [f'Citizen_{i}' for i in range(start_id, start_id + n)],
+            'address': 'Rua 1, Porto Alegre',
+            'phone': '51 99999-0000',
+            'registration_date': pd.Timestamp('2024-01-01'),
+            'normalized_date': pd.Timestamp('2024-07-01'),
+            'data_quality_score': 1.0,
+        },
+        geometry=shapely.points(x, y),
+        crs='EPSG:4326',
+    )
+
+
+@pytest.fixture
+def flooding_areas():
+    return make_flooding_areas()
+
+
+@pytest.fixture
+def gold_env(tmp_path, monkeypatch):
+    """Silver/Gold do gold_processor em tmp_path, sem upload, histórico nem raster"""
+    from etl import gold_processor
+
+    paths = {layer: tmp_path / layer for layer in ('silver', 'gold')}
+    for path in paths.values():
+        path.mkdir()
+    monkeypatch.setattr(gold_processor, 'LOCAL_SILVER_PATH', str(paths['silver']))
+    monkeypatch.setattr(gold_processor, 'LOCAL_GOLD_PATH', str(paths['gold']))
+    monkeypatch.setattr(gold_processor, 'GOLD_STATE_PATH', str(paths['gold'] / '_state'))
+    monkeypatch.setattr(gold_processor, 'GOLD_FLOOD_HISTORY', False)
+    monkeypatch.setattr(gold_processor, 'FLOOD_DEPTH_RASTER', None)
+    monkeypatch.setattr(gold_processor, 'upload_to_gold', lambda filepath, filename: None)
+    return paths
+
+
+@pytest.fixture
+def silver_env(tmp_path, monkeypatch):
+    """Bronze/Silver do silver_processor em tmp_path, sem upload"""
+    from etl import silver_processor
+
+    paths = {layer: tmp_path / layer for layer in ('bronze', 'silver')}
+    for path in paths.values():
+        path.mkdir()
+    monkeypatch.setattr(silver_processor, 'LOCAL_BRONZE_PATH', str(paths['bronze']))
+    monkeypatch.setattr(silver_processor, 'LOCAL_SILVER_PATH', str(paths['silver']))
+    monkeypatch.setattr(silver_processor, 'upload_to_silver', lambda filepath, filename: None)
+    return paths
+
+
+@pytest.fixture(scope='session')
+def flask_app_module():
+    """app.py do Flask (papel presentation do Ansible), importado pelo caminho"""
+    import importlib.util
+
+    path = PIPELINE_DIR / 'ansible' / 'roles' / 'presentation' / 'files' / 'app.py'
+    spec = importlib.util.spec_from_file_location('esteira_flask_app', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
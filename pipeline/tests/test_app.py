@@ -0,0 +1,510 @@
+import json
+
+import pytest
+
+
+def test_versioned_cache_keeps_entries_while_version_unknown(flask_app_module):
+    cache = flask_app_module.VersionedCache(max_entries=2)
+    cache.get(3, 'a')
+    cache.put(3, 'a', b'tile')
+
+    # Banco offline (versão None): nem esvazia nem consulta o cache
+    assert cache.get(None, 'a') is None
+    cache.put(None, 'b', b'other')
+    assert cache.stats()['version'] == 3
+    assert cache.get(3, 'a') == b'tile'
+    assert cache.get(3, 'b') is None
+
+    cache.get(4, 'a')
+    assert cache.stats()['entries'] == 0
+
+
+def test_versioned_cache_bounded_by_total_bytes(flask_app_module):
+    cache = flask_app_module.VersionedCache(max_entries=10, max_bytes=10)
+    cache.get(1, 'a')
+    for key in 'abc':
+        cache.put(1, key, b'x' * 4)
+
+    # 12 bytes > 10: o menos usado (a) sai
+    assert cache.stats()['bytes'] == 8
+    assert cache.get(1, 'a') is None
+    assert cache.get(1, 'b') == b'xxxx'
+
+    # Substituir uma chave recontabiliza o tamanho; valor maior que o limite não entra
+    cache.put(1, 'b', b'x')
+    assert cache.stats()['bytes'] == 5
+    cache.put(1, 'big', b'x' * 11)
+    assert cache.get(1, 'big') is None
+    assert cache.stats()['entries'] == 2
+
+    cache.get(2, 'b')
+    assert cache.stats()['bytes'] == 0
+
+
+def test_streamed_response_cache_respects_total_bytes(flask_app_module, monkeypatch):
+    app = flask_app_module
+    monkeypatch.setattr(app, 'response_cache', app.VersionedCache(8, 100, sizeof=lambda value: len(value[0])))
+    app.response_cache.get(5, 'warm')
+    for i in range(3):
+        list(app._cache_stream([b'x' * 20, 'y' * 20], 5, f'/api/geojson?page={i}', 'application/json'))
+
+    stats = app.response_cache.stats()
+    assert (stats['entries'], stats['bytes']) == (2, 80)
+    assert app.response_cache.get(5, '/api/geojson?page=0') is None
+    assert app.response_cache.get(5, '/api/geojson?page=2') == (b'x' * 20 + b'y' * 20, 'application/json')
+
+
+@pytest.fixture
+def stats_client(flask_app_module, monkeypatch):
+    """Cliente do Flask com /api/stats sem banco: versão controlada pelo teste"""
+    app = flask_app_module
+    state = {'version': 5, 'queries': 0}
+
+    def fetch_summary_stats(conn):
+        state['queries'] += 1
+        return {'run_id': None, 'total': 10, 'affected': 4}
+
+    monkeypatch.setattr(app, 'get_dataset_version', lambda: state['version'])
+    monkeypatch.setattr(app, 'get_db_connection', lambda: object())
+    monkeypatch.setattr(app, 'release_db_connection', lambda conn: None)
+    monkeypatch.setattr(app, 'fetch_summary_stats', fetch_summary_stats)
+    monkeypatch.setattr(app, 'response_cache', app.VersionedCache(8))
+    return app.app.test_client(), state
+
+
+def test_versioned_etag_and_not_modified(stats_client):
+    client, state = stats_client
+
+    first = client.get('/api/stats')
+    assert first.status_code == 200
+    assert first.headers['ETag'] == '"v5"'
+    assert first.headers['X-Response-Cache'] == 'MISS'
+    assert first.get_json()['total'] == 10
+
+    cached = client.get('/api/stats')
+    assert cached.headers['X-Response-Cache'] == 'HIT'
+    assert cached.get_data() == first.get_data()
+
+    not_modified = client.get('/api/stats', headers={'If-None-Match': '"v5"'})
+    assert not_modified.status_code == 304
+    assert not_modified.headers['ETag'] == '"v5"'
+    assert not_modified.get_data() == b''
+    assert state['queries'] == 1
+
+    # Nova carga: o ETag antigo não vale mais e o cache é refeito
+    state['version'] = 6
+    reloaded = client.get('/api/stats', headers={'If-None-Match': '"v5"'})
+    assert reloaded.status_code == 200
+    assert reloaded.headers['ETag'] == '"v6"'
+    assert reloaded.headers['X-Response-Cache'] == 'MISS'
+    assert state['queries'] == 2
+
+
+def test_versioned_without_version_skips_etag_and_cache(stats_client, flask_app_module):
+    client, state = stats_client
+    client.get('/api/stats')
+
+    state['version'] = None
+    response = client.get('/api/stats', headers={'If-None-Match': '"v5"'})
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    assert state['queries'] == 2
+    assert flask_app_module.response_cache.stats()['entries'] == 1
+
+
+class FakeConnection:
+    """Conexão psycopg2 fictícia: só o que o pool usa"""
+
+    def __init__(self):
+        self.closed = 0
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def fake_pool(flask_app_module, monkeypatch):
+    """Pool de 2 conexões fictícias com timeout curto, instalado como db_pool do app"""
+    pool = flask_app_module.ConnectionPool(maxconn=2, timeout=0.05, idle_check=30)
+    monkeypatch.setattr(pool, '_connect', FakeConnection)
+    monkeypatch.setattr(flask_app_module, 'db_pool', pool)
+    return pool
+
+
+def test_pool_checkout_and_release(fake_pool):
+    first = fake_pool.getconn()
+    second = fake_pool.getconn()
+    assert first is not second
+    assert fake_pool.stats()['in_use'] == 2
+
+    fake_pool.putconn(first)
+    assert first.rollbacks == 1
+    assert fake_pool.stats()['idle'] == 1
+
+    # Devolvida é reaproveitada; devolução repetida é ignorada
+    assert fake_pool.getconn() is first
+    fake_pool.putconn(second)
+    fake_pool.putconn(second)
+    stats = fake_pool.stats()
+    assert (stats['size'], stats['in_use'], stats['idle'], stats['checkouts']) == (2, 1, 1, 3)
+
+
+def test_pool_exhausted_raises_timeout(flask_app_module, fake_pool):
+    held = [fake_pool.getconn(), fake_pool.getconn()]
+    with pytest.raises(flask_app_module.PoolTimeout):
+        fake_pool.getconn()
+    assert fake_pool.stats()['timeouts'] == 1
+
+    fake_pool.putconn(held[0])
+    assert fake_pool.getconn() is held[0]
+
+
+def test_pool_exhausted_returns_503_with_retry_after(flask_app_module, fake_pool, monkeypatch):
+    app = flask_app_module
+    monkeypatch.setitem(app._dataset_version, 'value', None)
+    held = [fake_pool.getconn(), fake_pool.getconn()]
+
+    for path in ('/api/stats', '/health', '/api/lookup?lat=-30.0&lon=-51.2'):
+        response = app.app.test_client().get(path)
+        assert response.status_code == 503, path
+        assert int(response.headers['Retry-After']) >= 1
+        assert response.get_json()['pool']['timeouts'] > 0
+    for conn in held:
+        fake_pool.putconn(conn)
+
+
+class GeoJsonCursor:
+    """Cursor nomeado fictício: entrega `rows` em fetchmany e registra os lotes pedidos"""
+
+    def __init__(self, conn, name, rows, fail_after=None):
+        self.conn = conn
+        self.name = name
+        self.rows = list(rows)
+        self.fail_after = fail_after
+        self.itersize = None
+        self.fetches = []
+        self.closed = False
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append(sql)
+
+    def fetchmany(self, size):
+        if self.fail_after is not None and len(self.fetches) >= self.fail_after:
+            raise RuntimeError('conexão perdida')
+        self.fetches.append(size)
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        self.closed = True
+
+
+class GeoJsonConnection:
+    def __init__(self, rows, fail_after=None):
+        self.rows = rows
+        self.fail_after = fail_after
+        self.executed = []
+        self.cursors = []
+
+    def cursor(self, name=None):
+        cursor = GeoJsonCursor(self, name, self.rows, self.fail_after)
+        self.cursors.append(cursor)
+        return cursor
+
+
+@pytest.fixture
+def geojson_client(flask_app_module, monkeypatch):
+    """Cliente do /api/geojson sem banco, com lotes de 2 linhas"""
+    app = flask_app_module
+    state = {'released': []}
+    monkeypatch.setattr(app, 'get_dataset_version', lambda: None)
+    monkeypatch.setattr(app, 'get_db_connection', lambda: state['conn'])
+    monkeypatch.setattr(app, 'release_db_connection', state['released'].append)
+    monkeypatch.setattr(app, 'GEOJSON_FETCH_SIZE', 2)
+    return app.app.test_client(), state
+
+
+def geojson_feature(i):
+    return (json.dumps({'type': 'Feature', 'properties': {'id': i}, 'geometry': None}),)
+
+
+def test_geojson_streams_from_named_cursor(geojson_client):
+    client, state = geojson_client
+    conn = state['conn'] = GeoJsonConnection([geojson_feature(i) for i in range(5)])
+
+    response = client.get('/api/geojson')
+    assert response.is_streamed
+    body = response.get_json()
+
+    cursor, = conn.cursors
+    assert cursor.name == 'api_geojson'
+    assert cursor.itersize == 2
+    assert cursor.fetches == [2, 2, 2, 2]
+    assert cursor.closed
+    assert body['type'] == 'FeatureCollection'
+    assert [f['properties']['id'] for f in body['features']] == list(range(5))
+    assert state['released'] == [conn]
+
+
+def test_geojson_empty_result_is_valid_collection(geojson_client):
+    client, state = geojson_client
+    state['conn'] = GeoJsonConnection([])
+
+    assert client.get('/api/geojson').get_json() == {'type': 'FeatureCollection', 'features': []}
+
+
+def test_geojson_stream_error_releases_connection(geojson_client):
+    client, state = geojson_client
+    conn = state['conn'] = GeoJsonConnection([geojson_feature(i) for i in range(5)], fail_after=1)
+
+    response = client.get('/api/geojson')
+    with pytest.raises(RuntimeError):
+        response.get_data()
+    assert conn.cursors[0].closed
+    assert state['released'] == [conn]
+
+
+class TileConnection:
+    """Conexão fictícia do /tiles: registra os parâmetros de cada ST_AsMVT"""
+
+    def __init__(self):
+        self.params = []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, sql, params=None):
+        self.params.append(params)
+
+    def fetchone(self):
+        return (memoryview(b'mvt-%d' % len(self.params)),)
+
+
+@pytest.fixture
+def tile_client(flask_app_module, monkeypatch):
+    app = flask_app_module
+    state = {'version': 1, 'conn': TileConnection(), 'released': 0}
+
+    def release(conn):
+        state['released'] += 1
+
+    monkeypatch.setattr(app, 'get_dataset_version', lambda: state['version'])
+    monkeypatch.setattr(app, 'get_db_connection', lambda: state['conn'])
+    monkeypatch.setattr(app, 'release_db_connection', release)
+    monkeypatch.setattr(app, 'tile_cache', app.VersionedCache(8))
+    return app.app.test_client(), state
+
+
+def test_vector_tile_cached_per_dataset_version(tile_client):
+    client, state = tile_client
+
+    first = client.get('/tiles/12/1512/2375.mvt')
+    assert first.status_code == 200
+    assert first.mimetype == 'application/vnd.mapbox-vector-tile'
+    assert first.headers['X-Tile-Cache'] == 'MISS'
+    assert first.get_data() == b'mvt-1'
+    assert state['conn'].params == [{'z': 12, 'x': 1512, 'y': 2375, 'grid': 16}]
+    assert state['released'] == 1
+
+    second = client.get('/tiles/12/1512/2375.mvt')
+    assert second.headers['X-Tile-Cache'] == 'HIT'
+    assert second.get_data() == b'mvt-1'
+    assert len(state['conn'].params) == 1
+
+    # Nova carga: o tile é gerado de novo
+    state['version'] = 2
+    reloaded = client.get('/tiles/12/1512/2375.mvt')
+    assert reloaded.headers['X-Tile-Cache'] == 'MISS'
+    assert reloaded.get_data() == b'mvt-2'
+
+
+def test_vector_tile_clusters_only_below_cluster_zoom(tile_client, flask_app_module):
+    client, state = tile_client
+    z = flask_app_module.TILE_CLUSTER_MAX_ZOOM
+
+    client.get(f'/tiles/{z - 1}/0/0.mvt')
+    client.get(f'/tiles/{z}/0/0.mvt')
+    assert [params['grid'] for params in state['conn'].params] == [16, 1]
+
+
+@pytest.mark.parametrize('path', ['/tiles/2/4/0.mvt', '/tiles/2/0/4.mvt', '/tiles/23/0/0.mvt'])
+def test_vector_tile_out_of_range(tile_client, path):
+    client, state = tile_client
+
+    assert client.get(path).status_code == 404
+    assert state['conn'].params == []
+
+
+class MapConnection:
+    """Conexão fictícia do /map: cidadãos na 1ª consulta, áreas na 2ª"""
+
+    def __init__(self, citizens, areas):
+        self.results = [citizens, areas]
+        self.queries = []
+
+    def cursor(self, cursor_factory=None):
+        return self
+
+    def execute(self, sql, params=None):
+        self.queries.append(' '.join(sql.split()))
+
+    def fetchall(self):
+        return self.results[(len(self.queries) - 1) % 2]
+
+    def close(self):
+        pass
+
+
+MAP_CITIZENS = [
+    {'citizen_id': 1, 'lat': -30.01, 'lon': -51.21, 'affected_by_flooding': True,
+     'name': 'Ana', 'address': 'Rua 1', 'phone': '51'},
+    {'citizen_id': 2, 'lat': -29.9, 'lon': -51.0, 'affected_by_flooding': False,
+     'name': 'Bruno', 'address': 'Rua 2', 'phone': '51'},
+]
+MAP_AREAS = [
+    {'area_id': 1, 'area_name': 'Partenon', 'flood_date': '2024-05-03', 'severity': 'high', 'lat': -30.05, 'lon': -51.25,
+     'geometry': json.dumps({'type': 'Polygon', 'coordinates': [[[-51.3, -30.1], [-51.2, -30.1], [-51.2, -30.0], [-51.3, -30.1]]]})},
+]
+
+
+@pytest.fixture
+def map_client(flask_app_module, monkeypatch):
+    pytest.importorskip('folium')
+    app = flask_app_module
+    state = {'version': 3, 'conn': MapConnection(MAP_CITIZENS, MAP_AREAS)}
+    monkeypatch.setattr(app, 'get_dataset_version', lambda: state['version'])
+    monkeypatch.setattr(app, 'get_db_connection', lambda: state['conn'])
+    monkeypatch.setattr(app, 'release_db_connection', lambda conn: None)
+    monkeypatch.setattr(app, 'map_cache', {})
+    return app.app.test_client(), state
+
+
+def test_map_cluster_mode_sends_compact_points(map_client):
+    client, state = map_client
+
+    response = client.get('/map')
+    html = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert html.count('L.markerClusterGroup') == 2
+    assert '[-30.01, -51.21, 1]' in html and '[-29.9, -51.0, 2]' in html
+    assert 'Bruno' not in html  # sem popup por cidadão no modo cluster
+    assert 'Partenon' in html
+    assert 'ROUND(ST_Y(geometry)::numeric, 6)' in state['conn'].queries[0]
+
+    # HTML em cache por versão: a 2ª requisição não consulta o banco
+    assert client.get('/map').get_data(as_text=True) == html
+    assert len(state['conn'].queries) == 2
+    state['version'] = 4
+    client.get('/map')
+    assert len(state['conn'].queries) == 4
+
+
+def test_map_markers_mode_and_invalid_mode(map_client):
+    client, state = map_client
+
+    html = client.get('/map?mode=markers').get_data(as_text=True)
+    assert 'Bruno' in html and 'ORDER BY citizen_id' in state['conn'].queries[0]
+    assert client.get('/map?mode=heatmap').status_code == 400
+
+
+class LookupConnection:
+    """Conexão fictícia com as áreas de FLOOD_AREA_INDEX_SQL (WKB)"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, sql, params=None):
+        self.queries += 1
+
+    def fetchall(self):
+        return self.rows
+
+
+@pytest.fixture
+def lookup_client(flask_app_module, monkeypatch):
+    import datetime
+
+    shapely = pytest.importorskip('shapely')
+    app = flask_app_module
+    rows = [
+        (1, 'Partenon', 'high', datetime.date(2024, 5, 3), shapely.box(-51.30, -30.10, -51.20, -30.00).wkb),
+        (2, 'Centro', 'very_high', None, shapely.box(-51.25, -30.05, -51.15, -29.95).wkb),
+    ]
+    state = {'version': 7, 'conn': LookupConnection(rows)}
+    monkeypatch.setattr(app, 'get_dataset_version', lambda: state['version'])
+    monkeypatch.setattr(app, 'get_db_connection', lambda: state['conn'])
+    monkeypatch.setattr(app, 'release_db_connection', lambda conn: None)
+    monkeypatch.setattr(app, 'flood_area_index', app.FloodAreaIndex())
+    return app.app.test_client(), state
+
+
+def test_lookup_single_point(lookup_client):
+    client, state = lookup_client
+
+    response = client.get('/api/lookup?lat=-30.02&lon=-51.22')
+    body = response.get_json()
+    assert response.headers['X-Dataset-Version'] == '7'
+    assert body['in_flood_area'] is True
+    assert sorted(area['area_id'] for area in body['areas']) == [1, 2]
+    assert {area['flood_date'] for area in body['areas']} == {'2024-05-03', None}
+
+    assert client.get('/api/lookup?lat=-29.0&lon=-50.0').get_json()['areas'] == []
+    assert client.get('/api/lookup?lat=abc&lon=-50.0').status_code == 400
+    assert client.get('/api/lookup?lat=-95&lon=-50.0').status_code == 400
+
+
+def test_lookup_batch_uses_index_built_once_per_version(lookup_client, flask_app_module, monkeypatch):
+    client, state = lookup_client
+    points = [{'lat': -30.08, 'lon': -51.28, 'id': 'a'}, [-29.97, -51.16], {'lat': -29.0, 'lon': -50.0}]
+
+    body = client.post('/api/lookup', json={'points': points}).get_json()
+    assert body['dataset_version'] == 7
+    assert (body['count'], body['in_flood_area']) == (3, 2)
+    assert [[a['area_id'] for a in r['areas']] for r in body['results']] == [[1], [2], []]
+    assert body['results'][0]['id'] == 'a' and 'id' not in body['results'][1]
+
+    client.post('/api/lookup', json=points)
+    assert state['conn'].queries == 1
+    state['version'] = 8
+    client.get('/api/lookup?lat=-30.0&lon=-51.2')
+    assert state['conn'].queries == 2
+    assert flask_app_module.flood_area_index.stats()['builds'] == 2
+
+    monkeypatch.setattr(flask_app_module, 'LOOKUP_MAX_POINTS', 2)
+    assert client.post('/api/lookup', json={'points': points}).status_code == 413
+    assert client.post('/api/lookup', json={'points': [[1, 2, 3]]}).status_code == 400
+    assert client.post('/api/lookup', data='x').status_code == 400
+
+
+def test_lookup_keeps_last_index_when_database_offline(lookup_client, flask_app_module, monkeypatch):
+    client, state = lookup_client
+    assert client.get('/api/lookup?lat=-30.0&lon=-51.2').status_code == 200
+
+    state['conn'] = None
+    state['version'] = None
+    response = client.get('/api/lookup?lat=-30.0&lon=-51.2')
+    assert response.status_code == 200
+    assert response.headers['X-Dataset-Version'] == '7'
+
+    monkeypatch.setattr(flask_app_module, 'flood_area_index', flask_app_module.FloodAreaIndex())
+    assert client.get('/api/lookup?lat=-30.0&lon=-51.2').status_code == 503
@@ -0,0 +1,167 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+
+from etl.silver import csv_geojson_converter as converter
+
+BOWTIE = 'POLYGON ((0 0, 2 2, 2 0, 0 2, 0 0))'
+SPIKE = 'POLYGON ((0 0, 1 0, 1 1, 0 1, 0 0, -1 -1, 0 0))'
+COLLAPSED = 'POLYGON ((0 0, 1 1, 2 2, 0 0))'
+ORIGINAL_MAKE_VALID = shapely.make_valid
+
+
+def shapely_20_make_valid(geometry, **kwargs):
+    """make_valid do Shapely 2.0, sem os parâmetros method/keep_collapsed"""
+    if kwargs:
+        raise TypeError(f"make_valid() got an unexpected keyword argument '{next(iter(kwargs))}'")
+    return ORIGINAL_MAKE_VALID(geometry)
+
+
+@pytest.mark.parametrize('shapely_20', [False, True])
+def test_repair_geometries_keeps_only_polygonal_parts(monkeypatch, shapely_20):
+    if shapely_20:
+        monkeypatch.setattr(shapely, 'make_valid', shapely_20_make_valid)
+    gdf = gpd.GeoDataFrame(
+        {'id': [1, 2, 3, 4, 5]},
+        geometry=gpd.GeoSeries.from_wkt([BOWTIE, SPIKE, COLLAPSED, 'POINT (1 1)', None]),
+        crs='EPSG:4326',
+    )
+
+    repaired, counts = converter.repair_geometries(gdf)
+
+    assert counts == {'missing': 1, 'invalid': 3, 'repaired': 2, 'dropped': 2}
+    assert repaired['id'].tolist() == [1, 2, 4]
+    geoms = repaired.geometry.values
+    assert shapely.is_valid(geoms).all()
+    assert repaired.geometry.geom_type.tolist() == ['MultiPolygon', 'Polygon', 'Point']
+    assert np.allclose(shapely.area(geoms[:2]), [2.0, 1.0])
+
+
+@pytest.fixture
+def csv_converter(tmp_path):
+    conv = converter.CSVGeoJSONToGeoParquetConverter()
+    conv.schemas = converter.SchemaRegistry(tmp_path / '_schemas.json')
+    return conv
+
+
+def test_csv_with_null_citizen_id_converts(tmp_path, csv_converter):
+    csv_file = tmp_path / 'citizens_data.csv'
+    csv_file.write_text(
+        'citizen_id,name,address,phone,registration_date,latitude,longitude\n'
+        '1,Ana,Rua 1,51 1,2024-01-02,-30.0,-51.2\n'
+        ',Bruno,Rua 2,51 2,2024-01-03,-30.1,-51.1\n'
+        '3,Carla,Rua 3,,2024-01-04,-30.2,-51.0\n'
+    )
+    output = tmp_path / 'citizens_data.parquet'
+
+    gdf = csv_converter.process_csv_file(str(csv_file), str(output))
+
+    assert str(gdf['citizen_id'].dtype) == 'Int64'
+    assert gdf['citizen_id'].isna().tolist() == [False, True, False]
+    assert gpd.read_parquet(output)['citizen_id'].tolist()[::2] == [1, 3]
+
+
+def test_stale_inferred_int_schema_uses_nullable_dtype(tmp_path, csv_converter):
+    # Cache de schema antigo com 'int64' para uma coluna que agora tem vazios
+    (tmp_path / '_schemas.json').write_text(
+        '{"shelters": {"source_columns": ["shelter_id", "capacity"], '
+        '"columns": {"shelter_id": "int64", "capacity": "int64"}}}'
+    )
+    csv_file = tmp_path / 'shelters.csv'
+    csv_file.write_text('shelter_id,capacity,latitude,longitude\n1,100,-30.0,-51.2\n2,,-30.1,-51.1\n')
+
+    gdf = csv_converter.process_csv_file(str(csv_file), str(tmp_path / 'shelters.parquet'))
+
+    assert str(gdf['capacity'].dtype) == 'Int64'
+    assert gdf['capacity'].tolist()[0] == 100 and gdf['capacity'].isna().tolist() == [False, True]
+
+
+def test_inferred_integer_columns_are_nullable():
+    sample = pd.Series([1, 2, 3], dtype='int64')
+    assert converter.infer_column_type(sample) == 'Int64'
+    assert converter.infer_column_type(sample.astype('uint8')) == 'UInt8'
+    assert converter.infer_column_type(sample.astype('float64')) == 'float64'
+
+
+@pytest.fixture
+def source_dirs(tmp_path, monkeypatch):
+    """SAMPLE_DATA_DIR, Bronze e Silver do conversor em tmp_path (herdados pelos workers)"""
+    paths = {name: tmp_path / name for name in ('sample', 'bronze', 'silver')}
+    for path in paths.values():
+        path.mkdir()
+    monkeypatch.setattr(converter, 'SAMPLE_DATA_DIR', str(paths['sample']))
+    monkeypatch.setattr(converter, 'LOCAL_BRONZE_PATH', str(paths['bronze']))
+    monkeypatch.setattr(converter, 'LOCAL_SILVER_PATH', str(paths['silver']))
+    return paths
+
+
+def write_points_csv(path, n, start=0):
+    rows = [f'{i},Nome {i},{-30 + i / 1000},{-51 + i / 1000}' for i in range(start, start + n)]
+    path.write_text('citizen_id,name,latitude,longitude\n' + '\n'.join(rows) + '\n')
+
+
+def test_process_pool_matches_sequential(source_dirs, monkeypatch):
+    write_points_csv(source_dirs['sample'] / 'citizens_data.csv', 300)
+    write_points_csv(source_dirs['sample'] / 'shelters.csv', 40, start=1000)
+    gpd.GeoDataFrame(
+        {'area_id': [1, 2], 'severity': ['high', 'low']},
+        geometry=[shapely.box(0, 0, 1, 1), shapely.box(2, 2, 3, 3)], crs='EPSG:4326',
+    ).to_file(source_dirs['bronze'] / 'areas.geojson', driver='GeoJSON')
+    (source_dirs['bronze'] / 'broken.csv').write_text('id,x\n1,2\n')
+
+    def convert(workers, silver):
+        silver.mkdir(exist_ok=True)
+        monkeypatch.setattr(converter, 'LOCAL_SILVER_PATH', str(silver))
+        results = converter.CSVGeoJSONToGeoParquetConverter().process_all_files(workers=workers)
+        outputs = {
+            f.name: gpd.read_parquet(f).drop(columns=['_processed_date'])
+            for f in sorted(silver.glob('*.parquet'))
+        }
+        return results, outputs
+
+    sequential, expected = convert(1, source_dirs['silver'])
+    parallel, outputs = convert(2, source_dirs['silver'] / 'pool')
+
+    assert list(parallel) == list(sequential)
+    assert {name: r['status'] for name, r in parallel.items()} == {
+        'citizens_data.csv': 'success', 'shelters.csv': 'success',
+        'areas.geojson': 'success', 'broken.csv': 'error',
+    }
+    assert 'geodataframe' in sequential['citizens_data.csv']
+    assert not any('geodataframe' in r for r in parallel.values())
+    assert [r.get('records') for r in parallel.values()] == [r.get('records') for r in sequential.values()]
+    assert list(outputs) == ['areas.parquet', 'citizens_data.parquet', 'shelters.parquet']
+    for name, gdf in expected.items():
+        pd.testing.assert_frame_equal(outputs[name], gdf)
+    assert not list((source_dirs['silver'] / 'pool').glob('.*.tmp'))
+
+
+def test_one_source_per_dataset_by_format_priority(source_dirs, monkeypatch):
+    write_points_csv(source_dirs['sample'] / 'citizens_data.csv', 10)
+    write_points_csv(source_dirs['bronze'] / 'citizens_data.csv', 10)
+    citizens = converter.CSVGeoJSONToGeoParquetConverter().convert_csv_to_geodataframe(
+        str(source_dirs['sample'] / 'citizens_data.csv'))
+    citizens.iloc[:4].to_parquet(source_dirs['bronze'] / 'citizens_data.parquet')
+    write_points_csv(source_dirs['bronze'] / 'shelters.csv', 3)
+
+    conv = converter.CSVGeoJSONToGeoParquetConverter()
+    results = conv.process_all_files(workers=1)
+    summary = conv.get_summary(results)
+
+    # parquet,csv,geojson: o GeoParquet vence; as duas cópias CSV são ignoradas
+    assert results['citizens_data.parquet']['records'] == 4
+    assert results['citizens_data.csv'] == {'status': 'skipped', 'selected': 'citizens_data.parquet'}
+    assert summary['total_files'] == 2 and summary['successful'] == 2
+    assert summary['total_records'] == 7
+    assert sorted(f.name for f in source_dirs['silver'].glob('*.parquet')) == ['citizens_data.parquet', 'shelters.parquet']
+    assert len(gpd.read_parquet(source_dirs['silver'] / 'citizens_data.parquet')) == 4
+
+    # CSV primeiro: empate entre diretórios resolvido pela ordem de data_dirs (SAMPLE_DATA_DIR antes da Bronze)
+    selected, skipped = conv.resolve_sources(['csv', 'parquet'])
+    assert [f.parent.name + '/' + f.name for f in selected if f.stem == 'citizens_data'] == ['sample/citizens_data.csv']
+    assert skipped == {
+        str(source_dirs['bronze'] / 'citizens_data.csv'): str(source_dirs['sample'] / 'citizens_data.csv'),
+        str(source_dirs['bronze'] / 'citizens_data.parquet'): str(source_dirs['sample'] / 'citizens_data.csv'),
+    }
@@ -0,0 +1,64 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import shapely
+
+from etl.geoparquet import GeoParquetWriter, iter_geoparquet_batches
+
+
+def batch(start, n, with_values):
+    return gpd.GeoDataFrame(
+        {
+            'citizen_id': np.arange(start, start + n, dtype='int64'),
+            'area_name': [f'Area {i}' if with_values else None for i in range(n)],
+            'flood_date': pd.to_datetime(['2024-05-03' if with_values else None] * n),
+            'affected_area_ids': [[1, 2] if with_values else None for _ in range(n)],
+            'note': ['x' if with_values else None for _ in range(n)],
+        },
+        geometry=shapely.points(np.arange(start, start + n, dtype=float), np.zeros(n)),
+        crs='EPSG:31982',
+    )
+
+
+def test_writer_first_batch_with_only_null_optional_columns(tmp_path):
+    filepath = tmp_path / 'out.parquet'
+    writer = GeoParquetWriter(filepath, {
+        'citizen_id': pa.int64(),
+        'area_name': pa.string(),
+        'flood_date': pa.timestamp('us'),
+        'affected_area_ids': pa.list_(pa.int64()),
+    })
+    writer.write(batch(0, 3, with_values=False))
+    writer.write(batch(3, 0, with_values=True))
+    writer.write(batch(3, 4, with_values=True))
+    writer.close()
+
+    assert writer.rows == 7
+    schema = pq.read_schema(filepath)
+    assert schema.field('area_name').type == pa.string()
+    assert schema.field('flood_date').type == pa.timestamp('us')
+    assert schema.field('affected_area_ids').type == pa.list_(pa.int64())
+    # Coluna não declarada e só nula no 1º lote: gravada como string
+    assert schema.field('note').type == pa.string()
+    assert pq.ParquetFile(filepath).num_row_groups == 2
+
+    batches = list(iter_geoparquet_batches(filepath, batch_size=5))
+    assert [len(b) for b in batches] == [5, 2]
+    result = pd.concat(batches, ignore_index=True)
+    assert result.crs == 'EPSG:31982'
+    assert result['citizen_id'].tolist() == list(range(7))
+    assert result['area_name'].isna().sum() == 3
+    assert list(result['affected_area_ids'].iloc[-1]) == [1, 2]
+    assert gpd.read_parquet(filepath).geometry.equals(result.geometry)
+
+
+def test_writer_without_batches_writes_empty_file(tmp_path):
+    filepath = tmp_path / 'empty.parquet'
+    writer = GeoParquetWriter(filepath, crs='EPSG:4326')
+    writer.close()
+
+    empty = gpd.read_parquet(filepath)
+    assert len(empty) == 0
+    assert empty.crs == 'EPSG:4326'
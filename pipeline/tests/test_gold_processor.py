@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import shapely
+
+from conftest import make_citizens
+from config import AFFECTED_CITIZENS_FILE, UNAFFECTED_CITIZENS_FILE, ALL_CITIZENS_FILE
+from etl import gold_processor
+
+
+def write_silver(paths, flooding_areas, citizens):
+    flooding_areas.to_parquet(paths['silver'] / 'silver_flooding_areas_porto_alegre.parquet')
+    citizens.to_parquet(paths['silver'] / 'silver_citizens_data.parquet')
+
+
+@pytest.mark.parametrize('engine', ['strtree', 'grid'])
+def test_process_gold_first_batch_without_affected(gold_env, flooding_areas, monkeypatch, engine):
+    # Primeiro lote inteiro fora das áreas: area_name, flood_date e max_severity só nulos
+    monkeypatch.setattr(gold_processor, 'GOLD_JOIN_ENGINE', engine)
+    rng = np.random.default_rng(0)
+    dry = make_citizens(rng.uniform(-50.9, -50.8, 50), rng.uniform(-29.7, -29.6, 50))
+    wet = make_citizens(rng.uniform(-51.29, -51.16, 150), rng.uniform(-30.09, -29.96, 150), start_id=50)
+    write_silver(gold_env, flooding_areas, pd.concat([dry, wet], ignore_index=True))
+
+    summary = gold_processor.process_gold(batch_size=50, workers=1, mode='full')
+
+    assert summary['batches'] == 4
+    assert summary['total'] == 200
+    assert summary['affected'] > 0
+    for filename in (AFFECTED_CITIZENS_FILE, UNAFFECTED_CITIZENS_FILE, ALL_CITIZENS_FILE):
+        schema = pq.read_schema(gold_env['gold'] / filename)
+        for name in schema.names:
+            if name in gold_processor.GOLD_COLUMN_TYPES:
+                assert schema.field(name).type == gold_processor.GOLD_COLUMN_TYPES[name], (filename, name)
+    affected = pq.read_table(gold_env['gold'] / AFFECTED_CITIZENS_FILE)
+    assert affected.num_rows == summary['affected']
+    assert affected.column('max_severity').null_count == 0
+    assert affected.schema.field('flood_date').type == pa.timestamp('us')
+
+
+
+class DryFirstBatchSampler:
+    """Raster de profundidade fictício: seco (NaN) a leste de -51.0, 2 m no resto"""
+
+    blocks_read = 0
+
+    def __init__(self, path):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def sample(self, geometries, crs):
+        x = shapely.get_x(geometries)
+        return np.where(x > -51.0, np.nan, 2.0).astype(np.float32)
+
+
+def test_process_gold_depth_columns_null_in_first_batch(gold_env, flooding_areas, monkeypatch, caplog):
+    monkeypatch.setattr(gold_processor, 'FLOOD_DEPTH_RASTER', 'depth.tif')
+    monkeypatch.setattr(gold_processor, 'FloodDepthSampler', DryFirstBatchSampler)
+    rng = np.random.default_rng(1)
+    dry = make_citizens(rng.uniform(-50.9, -50.8, 20), rng.uniform(-29.7, -29.6, 20))
+    wet = make_citizens(rng.uniform(-51.29, -51.16, 20), rng.uniform(-30.09, -29.96, 20), start_id=20)
+    write_silver(gold_env, flooding_areas, pd.concat([dry, wet], ignore_index=True))
+
+    summary = gold_processor.process_gold(batch_size=20, workers=1, mode='full')
+
+    assert summary['total'] == 40
+    assert 'sem tipo declarado' not in caplog.text
+    table = pq.read_table(gold_env['gold'] / ALL_CITIZENS_FILE)
+    assert table.schema.field('flood_depth_m').type == pa.float64()
+    assert table.schema.field('depth_severity').type == pa.string()
+    severity = table.column('depth_severity').to_pylist()
+    assert severity[:20] == [None] * 20
+    assert set(severity[20:]) == {'high'}
+
+
+def gold_snapshot(paths):
+    """Gold completa (sem processing_date) ordenada por citizen_id, para comparar execuções"""
+    table = pq.read_table(paths['gold'] / ALL_CITIZENS_FILE).drop(['processing_date'])
+    return table.sort_by('citizen_id').to_pylist()
+
+
+def test_incremental_matches_full_after_changes(gold_env, flooding_areas):
+    rng = np.random.default_rng(5)
+    citizens = make_citizens(rng.uniform(-51.32, -51.03, 400), rng.uniform(-30.12, -29.83, 400))
+    write_silver(gold_env, flooding_areas, citizens)
+    gold_processor.process_gold(batch_size=90, workers=1, mode='full')
+
+    def check(flooding, citizens):
+        write_silver(gold_env, flooding, citizens)
+        summary = gold_processor.process_gold(batch_size=90, workers=1, mode='incremental')
+        incremental = gold_snapshot(gold_env)
+        gold_processor.process_gold(batch_size=90, workers=1, mode='full')
+        assert incremental == gold_snapshot(gold_env)
+        return summary
+
+    # Polígono alterado: área 3 ampliada e mais severa; área 1 removida
+    changed = flooding_areas[flooding_areas['area_id'] != 1].copy()
+    changed.loc[changed['area_id'] == 3, 'severity'] = 'very_high'
+    changed.loc[changed['area_id'] == 3, 'geometry'] = shapely.box(-51.12, -29.92, -51.04, -29.84)
+    summary = check(changed.reset_index(drop=True), citizens)
+    assert 0 < summary['reclassified'] < summary['total']
+
+    # Cidadãos alterados: um movido para dentro de uma área, um removido, um novo
+    moved = citizens.drop(index=7).reset_index(drop=True)
+    moved.loc[0, 'geometry'] = shapely.Point(-51.06, -29.86)
+    moved = pd.concat([moved, make_citizens([-51.2], [-30.0], start_id=1000)], ignore_index=True)
+    summary = check(changed.reset_index(drop=True), moved)
+    assert summary['reclassified'] == 2
+    assert summary['total'] == 400
+
+
+@pytest.fixture
+def history_env(gold_env, monkeypatch):
+    monkeypatch.setattr(gold_processor, 'GOLD_HISTORY_PATH', str(gold_env['gold'] / 'history'))
+    return gold_env['gold'] / 'history'
+
+
+def test_flood_history_event_removed_between_runs(gold_env, history_env, flooding_areas):
+    rng = np.random.default_rng(2)
+    citizens = make_citizens(rng.uniform(-51.3, -51.05, 300), rng.uniform(-30.1, -29.85, 300))
+    write_silver(gold_env, flooding_areas, citizens)
+
+    first = gold_processor.process_flood_history(batch_size=100, workers=1)
+    assert first['events'] == 2 and first['recomputed'] == 2
+    assert (history_env / 'event_date=2024-06-10').is_dir()
+
+    # Área 3 (único evento de 2024-06-10) some da Silver: a partição é removida
+    write_silver(gold_env, flooding_areas[flooding_areas['area_id'] != 3], citizens)
+    second = gold_processor.process_flood_history(batch_size=100, workers=1)
+    assert second == {'events': 1, 'recomputed': 0, 'removed': 1, 'rows': 0}
+    assert not (history_env / 'event_date=2024-06-10').exists()
+    assert set(gold_processor.load_flood_history()['area_id']) == {1, 2}
+
+    # Partição já apagada fora do pipeline, mas ainda no manifesto
+    write_silver(gold_env, flooding_areas, citizens)
+    gold_processor.process_flood_history(batch_size=100, workers=1)
+    for filepath in (history_env / 'event_date=2024-06-10').iterdir():
+        filepath.unlink()
+    (history_env / 'event_date=2024-06-10').rmdir()
+    write_silver(gold_env, flooding_areas[flooding_areas['area_id'] != 3], citizens)
+    assert gold_processor.process_flood_history(batch_size=100, workers=1)['removed'] == 1
+
+
+def test_citizens_fingerprint_independent_of_batch_size(gold_env, flooding_areas, monkeypatch):
+    rng = np.random.default_rng(4)
+    write_silver(gold_env, flooding_areas, make_citizens(rng.uniform(-51.3, -51.0, 250), rng.uniform(-30.1, -29.8, 250)))
+
+    fingerprints = set()
+    for batch_size in (7, 100, 1000):
+        monkeypatch.setattr(gold_processor, 'GOLD_BATCH_SIZE', batch_size)
+        fingerprints.add(gold_processor.citizens_fingerprint('silver_citizens_data.parquet'))
+    assert len(fingerprints) == 1
+
+
+def test_nearest_flood_index_matches_brute_force(flooding_areas):
+    rng = np.random.default_rng(6)
+    citizens = make_citizens(rng.uniform(-51.45, -50.9, 300), rng.uniform(-30.25, -29.7, 300))
+    index = gold_processor.NearestFloodIndex(flooding_areas, crs='EPSG:31982')
+
+    nearest, distance = index.query(citizens.geometry.values)
+
+    points = np.asarray(citizens.geometry.to_crs('EPSG:31982').values)
+    polygons = np.asarray(flooding_areas.geometry.to_crs('EPSG:31982').values)
+    brute = shapely.distance(points[:, None], polygons[None, :])
+    outside = brute.min(axis=1) > 0
+    assert outside.sum() > 200
+    np.testing.assert_allclose(distance[outside], brute.min(axis=1)[outside], rtol=1e-9, atol=1e-6)
+    assert (brute[outside, nearest[outside]] <= brute.min(axis=1)[outside] + 1e-6).all()
+
+
+class FixedDistances:
+    """NearestFloodIndex fictício: distâncias dadas, área mais próxima = posição 2"""
+
+    def __init__(self, distance):
+        self.distance = np.asarray(distance, dtype=float)
+
+    def query(self, geometries):
+        return np.full(len(geometries), 2), self.distance[:len(geometries)]
+
+
+def test_add_flood_proximity_bands(flooding_areas):
+    citizens = make_citizens(np.full(6, -50.0), np.full(6, -29.0))
+    # Cidadão 0 dentro da área 2; os demais fora
+    classified = gold_processor.classify_citizens(citizens, flooding_areas, np.array([0]), np.array([1]))
+    distances = [0.0, 199.999, 200.0, 999.0, 5000.0, np.nan]
+
+    result = gold_processor.add_flood_proximity(
+        classified, flooding_areas, FixedDistances(distances[1:]), bands=[200.0, 1000.0],
+    )
+
+    assert result['risk_band'].tolist()[:5] == ['inside', 'within_200m', 'within_1000m', 'within_1000m', 'beyond_1000m']
+    assert pd.isna(result['risk_band'].iloc[5])
+    assert result['distance_to_flood_m'].tolist()[:5] == [0.0, 200.0, 200.0, 999.0, 5000.0]
+    assert np.isnan(result['distance_to_flood_m'].iloc[5])
+    assert result['nearest_area_id'].tolist()[:5] == [2, 3, 3, 3, 3]
+    assert gold_processor.risk_band_labels([]) == ['inside', 'outside']
@@ -0,0 +1,262 @@
+import datetime
+import struct
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from etl import postgis_loader
+
+
+class RecordingConnection:
+    """Conexão fictícia: registra os comandos e responde à consulta de views dependentes"""
+
+    def __init__(self, views):
+        self.views = views
+        self.statements = []
+        self.copies = []
+        self.commits = 0
+
+    def cursor(self):
+        return RecordingCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+class RecordingCursor:
+    rowcount = 0
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append(' '.join(sql.split()))
+
+    def copy_expert(self, sql, payload):
+        self.conn.copies.append((sql, payload))
+
+    def fetchall(self):
+        return self.conn.views
+
+    def close(self):
+        pass
+
+
+def test_index_staging_tables_builds_secondary_indexes():
+    conn = RecordingConnection([])
+
+    postgis_loader.index_staging_tables(conn)
+
+    assert ('CREATE INDEX IF NOT EXISTS idx_flooding_areas_staging_flood_date '
+            'ON flooding_areas_staging (flood_date)') in conn.statements
+    assert sum('USING GIST' in sql for sql in conn.statements) == 3
+    assert 'CREATE INDEX IF NOT EXISTS idx_flooding_area_parts_staging_area ON flooding_area_parts_staging (area_id)' \
+        in conn.statements
+
+
+def test_swap_staging_tables_recreates_dependent_views():
+    views = [
+        ('public.v_citizens_summary', False, ' SELECT count(*) AS count FROM citizens;', 1),
+        ('public.v_summary_total', False, ' SELECT count FROM v_citizens_summary;', 2),
+    ]
+    conn = RecordingConnection(views)
+
+    postgis_loader.swap_staging_tables(conn)
+
+    statements = conn.statements
+    position = statements.index
+    drop_views = [position('DROP VIEW IF EXISTS public.v_summary_total'),
+                  position('DROP VIEW IF EXISTS public.v_citizens_summary')]
+    create_views = [position('CREATE VIEW public.v_citizens_summary AS SELECT count(*) AS count FROM citizens;'),
+                    position('CREATE VIEW public.v_summary_total AS SELECT count FROM v_citizens_summary;')]
+    assert drop_views == sorted(drop_views)
+    assert create_views == sorted(create_views)
+    assert max(drop_views) < position('DROP TABLE IF EXISTS citizens')
+    assert position('ALTER TABLE citizens_staging RENAME TO citizens') < min(create_views)
+    assert 'ALTER INDEX idx_flooding_areas_staging_flood_date RENAME TO idx_flooding_areas_flood_date' in statements
+    assert conn.commits == 1
+
+
+def test_flood_area_parts_built_in_staging_and_swapped():
+    conn = RecordingConnection([])
+
+    postgis_loader.refresh_flood_area_parts(
+        conn, max_vertices=64, table='flooding_area_parts_staging', source='flooding_areas_staging',
+    )
+    built = list(conn.statements)
+    postgis_loader.swap_staging_tables(conn)
+    swapped = conn.statements[len(built):]
+
+    assert built[0] == 'DELETE FROM flooding_area_parts_staging'
+    assert ('INSERT INTO flooding_area_parts_staging (area_id, geometry) '
+            'SELECT area_id, ST_Subdivide(geometry, %s) FROM flooding_areas_staging') in built
+    assert not any(sql.split()[-1] == 'flooding_area_parts' for sql in built)
+    assert 'DROP TABLE IF EXISTS flooding_area_parts' in swapped
+    assert 'ALTER TABLE flooding_area_parts_staging RENAME TO flooding_area_parts' in swapped
+    assert 'ALTER INDEX idx_flooding_area_parts_staging_area RENAME TO idx_flooding_area_parts_area' in swapped
+    assert ('ALTER SEQUENCE IF EXISTS flooding_area_parts_staging_part_id_seq '
+            'RENAME TO flooding_area_parts_part_id_seq') in swapped
+    assert not any(sql.startswith(('DELETE', 'INSERT')) for sql in swapped)
+
+
+def decode_copy_payload(payload, kinds):
+    """Lê um payload COPY binário (cabeçalho, tuplas, trailer) de volta em linhas Python"""
+    data = payload.getvalue()
+    assert data.startswith(postgis_loader.PGCOPY_HEADER)
+    offset = len(postgis_loader.PGCOPY_HEADER)
+    rows = []
+    while True:
+        (field_count,) = struct.unpack_from('!h', data, offset)
+        offset += 2
+        if field_count == -1:
+            break
+        assert field_count == len(kinds)
+        row = []
+        for kind in kinds:
+            (size,) = struct.unpack_from('!i', data, offset)
+            offset += 4
+            if size == -1:
+                row.append(None)
+                continue
+            raw = data[offset:offset + size]
+            offset += size
+            if kind == 'int4':
+                value = struct.unpack('!i', raw)[0]
+            elif kind == 'int8':
+                value = struct.unpack('!q', raw)[0]
+            elif kind == 'float8':
+                value = struct.unpack('!d', raw)[0]
+            elif kind == 'date':
+                value = datetime.date(2000, 1, 1) + datetime.timedelta(days=struct.unpack('!i', raw)[0])
+            elif kind == 'bool':
+                value = raw == b'\x01'
+            elif kind == 'geometry':
+                value = shapely.from_wkb(raw)
+            else:
+                value = raw.decode('utf-8')
+            row.append(value)
+        rows.append(row)
+    assert offset == len(data)
+    return rows
+
+
+def test_citizens_copy_payload_round_trip(tmp_path):
+    gold = gpd.GeoDataFrame(
+        {
+            'citizen_id': np.array([7, 8, 9], dtype='int64'),
+            'name': ['Ana', 'João Ção', None],
+            'address': ['Rua 1', None, 'Av. 2'],
+            'phone': ['51 1', '51 2', None],
+            'registration_date': pd.to_datetime(['2024-01-31', None, '1999-12-31']),
+            'nearest_area_id': pd.array([1, None, 3], dtype='Int64'),
+            'distance_to_flood_m': [0.0, np.nan, 1234.5],
+            'risk_band': ['inside', None, 'beyond_1000m'],
+        },
+        geometry=shapely.points([-51.2, -51.1, -51.0], [-30.0, -29.9, -29.8]),
+        crs='EPSG:4326',
+    )
+    filepath = tmp_path / 'affected_citizens.parquet'
+    gold.to_parquet(filepath)
+
+    batches = list(postgis_loader.iter_geoparquet_batches(
+        str(filepath), [name for name, _ in postgis_loader.CITIZEN_COLUMNS], batch_size=2
+    ))
+    assert [batch.num_rows for batch in batches] == [2, 1]
+    kinds = [kind for _, kind in postgis_loader.CITIZEN_COLUMNS] + ['bool', 'int8']
+    rows = []
+    for batch in batches:
+        columns = postgis_loader._citizen_batch_columns(batch, affected=True)
+        rows += decode_copy_payload(postgis_loader.build_copy_payload(columns), kinds)
+
+    names = postgis_loader.CITIZEN_LOAD_COLUMNS
+    decoded = [dict(zip(names, row)) for row in rows]
+    assert [r['citizen_id'] for r in decoded] == [7, 8, 9]
+    assert [r['name'] for r in decoded] == ['Ana', 'João Ção', None]
+    assert [r['address'] for r in decoded] == ['Rua 1', None, 'Av. 2']
+    assert [r['registration_date'] for r in decoded] == [datetime.date(2024, 1, 31), None, datetime.date(1999, 12, 31)]
+    assert [r['nearest_area_id'] for r in decoded] == [1, None, 3]
+    assert [r['distance_to_flood_m'] for r in decoded] == [0.0, None, 1234.5]
+    assert [r['risk_band'] for r in decoded] == ['inside', None, 'beyond_1000m']
+    assert all(r['affected_by_flooding'] is True for r in decoded)
+    assert len({r['row_hash'] for r in decoded}) == 3
+
+    geometries = np.array([r['geometry'] for r in decoded])
+    assert (shapely.get_srid(geometries) == postgis_loader.SRID).all()
+    assert shapely.equals(geometries, gold.geometry.values).all()
+
+
+def test_row_hash_changes_only_with_content(tmp_path):
+    gold = gpd.GeoDataFrame(
+        {'citizen_id': np.array([1, 2], dtype='int64'), 'name': ['A', 'B'],
+         'address': ['R', 'R'], 'phone': ['1', '1'], 'registration_date': pd.to_datetime(['2024-01-01'] * 2)},
+        geometry=shapely.points([0.0, 1.0], [0.0, 1.0]),
+        crs='EPSG:4326',
+    )
+    filepath = tmp_path / 'citizens.parquet'
+    columns = [name for name, _ in postgis_loader.CITIZEN_COLUMNS]
+
+    def row_hashes(gdf, affected):
+        gdf.to_parquet(filepath)
+        batch = next(postgis_loader.iter_geoparquet_batches(str(filepath), columns, batch_size=10))
+        return postgis_loader._citizen_batch_columns(batch, affected)[-1][0].tolist()
+
+    base = row_hashes(gold, True)
+    assert row_hashes(gold, True) == base
+    assert row_hashes(gold, False) != base
+    moved = gold.copy()
+    moved.loc[1, 'geometry'] = shapely.Point(1.0, 1.5)
+    changed = row_hashes(moved, True)
+    assert changed[0] == base[0] and changed[1] != base[1]
+
+
+def test_create_tables_adds_proximity_columns():
+    conn = RecordingConnection([])
+
+    postgis_loader.create_tables(conn)
+
+    for column in ('nearest_area_id INTEGER', 'distance_to_flood_m DOUBLE PRECISION', 'risk_band VARCHAR(50)'):
+        assert f'ALTER TABLE citizens ADD COLUMN IF NOT EXISTS {column}' in conn.statements
+    assert not any('_staging' in sql for sql in conn.statements)
+
+
+def test_copy_citizens_loads_proximity_columns_and_old_gold(tmp_path):
+    # Gold atual (com proximidade) + Gold antiga sem as colunas: estas vão como NULL
+    current = gpd.GeoDataFrame(
+        {'citizen_id': np.array([1, 2], dtype='int64'), 'name': ['A', 'B'], 'address': ['R', 'R'],
+         'phone': ['1', '2'], 'registration_date': pd.to_datetime(['2024-01-01'] * 2),
+         'nearest_area_id': pd.array([4, 5], dtype='Int64'), 'distance_to_flood_m': [0.0, 250.0],
+         'risk_band': ['inside', 'within_1000m']},
+        geometry=shapely.points([0.0, 1.0], [0.0, 1.0]), crs='EPSG:4326',
+    )
+    old = current.drop(columns=['nearest_area_id', 'distance_to_flood_m', 'risk_band']).iloc[[1]]
+    old['citizen_id'] = np.array([3], dtype='int64')
+    current.to_parquet(tmp_path / 'affected.parquet')
+    old.to_parquet(tmp_path / 'unaffected.parquet')
+    conn = RecordingConnection([])
+
+    postgis_loader.copy_citizens_to_postgis(conn, [
+        (str(tmp_path / 'affected.parquet'), True),
+        (str(tmp_path / 'unaffected.parquet'), False),
+    ], table='citizens_staging')
+
+    names = postgis_loader.CITIZEN_LOAD_COLUMNS
+    kinds = [kind for _, kind in postgis_loader.CITIZEN_COLUMNS] + ['bool', 'int8']
+    assert [sql for sql, _ in conn.copies] == [
+        f"COPY citizens_load ({', '.join(names)}) FROM STDIN WITH (FORMAT binary)"
+    ] * 2
+    rows = [dict(zip(names, row)) for _, payload in conn.copies for row in decode_copy_payload(payload, kinds)]
+    assert [(r['citizen_id'], r['affected_by_flooding']) for r in rows] == [(1, True), (2, True), (3, False)]
+    assert [r['nearest_area_id'] for r in rows] == [4, 5, None]
+    assert [r['distance_to_flood_m'] for r in rows] == [0.0, 250.0, None]
+    assert [r['risk_band'] for r in rows] == ['inside', 'within_1000m', None]
+
+    statements = conn.statements
+    assert statements[0].startswith('CREATE TEMP TABLE citizens_load (LIKE citizens_staging')
+    assert 'DELETE FROM citizens_staging' in statements
+    assert statements[-1].startswith(f"INSERT INTO citizens_staging ({', '.join(names)})")
+    assert conn.commits == 1
@@ -0,0 +1,85 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from conftest import make_citizens
+from config import CITIZENS_FILE
+from etl import silver_processor
+
+
+def test_stream_citizens_first_batch_with_null_columns(silver_env):
+    # Bronze sem as colunas de controle; o 1º lote tem name/address só nulos
+    rng = np.random.default_rng(2)
+    bronze = make_citizens(rng.uniform(-51.3, -51.0, 30), rng.uniform(-30.1, -29.9, 30))
+    bronze = bronze.drop(columns=['normalized_date', 'data_quality_score'])
+    bronze.loc[:9, ['name', 'address']] = None
+    bronze.to_parquet(silver_env['bronze'] / CITIZENS_FILE, row_group_size=10)
+
+    summary = silver_processor.stream_citizens_to_silver(batch_size=10)
+
+    assert summary == {'batches': 3, 'read': 30, 'citizens': 30}
+    filepath = silver_env['silver'] / f"silver_{CITIZENS_FILE}"
+    schema = pq.read_schema(filepath)
+    for name, arrow_type in silver_processor.SILVER_CITIZEN_COLUMN_TYPES.items():
+        assert schema.field(name).type == arrow_type, name
+    silver = gpd.read_parquet(filepath)
+    assert silver.crs == bronze.crs
+    assert silver['name'].isna().sum() == 10
+    assert silver['name'].iloc[10:].tolist() == bronze['name'].iloc[10:].tolist()
+
+
+def test_stream_citizens_without_rows_writes_empty_file(silver_env):
+    make_citizens([], []).to_parquet(silver_env['bronze'] / CITIZENS_FILE)
+
+    summary = silver_processor.stream_citizens_to_silver(batch_size=10)
+
+    assert summary['citizens'] == 0
+    assert len(gpd.read_parquet(silver_env['silver'] / f"silver_{CITIZENS_FILE}")) == 0
+
+
+@pytest.mark.parametrize('max_id', [64, 10_000_000])
+def test_seen_ids_matches_drop_duplicates(max_id):
+    # Ids negativos, acima de max_id, repetidos dentro e entre lotes
+    rng = np.random.default_rng(4)
+    ids = np.concatenate([rng.integers(-50, 200, 3000), rng.integers(2**40, 2**40 + 100, 500)])
+    rng.shuffle(ids)
+    seen = silver_processor.SeenIds(max_id=max_id)
+
+    kept = np.concatenate([ids[start:start + 250][seen.add_new(ids[start:start + 250])]
+                           for start in range(0, len(ids), 250)])
+
+    expected = pd.Series(ids).drop_duplicates().to_numpy()
+    assert kept.tolist() == expected.tolist()
+    assert not seen.add_new(expected).any()
+
+
+def test_seen_ids_memory_bounded_by_max_id(monkeypatch, caplog):
+    seen = silver_processor.SeenIds(max_id=1024)
+    seen.add_new(np.array([10, 20]))
+    assert seen.bits.nbytes == 3  # só até o maior id visto
+
+    seen.add_new(np.arange(0, 5000))
+    assert seen.bits.nbytes <= 1024 // 8 + 1
+    assert len(seen.others) == 5000 - 1024
+
+    monkeypatch.setattr(silver_processor.SeenIds, 'OTHERS_WARN', 4000)
+    seen.add_new(np.arange(5000, 5100))
+    seen.add_new(np.arange(5100, 5200))
+    assert caplog.text.count('SILVER_DEDUP_BITMAP_MAX_ID') == 1
+
+
+def test_stream_citizens_drops_duplicates_across_batches(silver_env):
+    rng = np.random.default_rng(5)
+    bronze = make_citizens(rng.uniform(-51.3, -51.0, 40), rng.uniform(-30.1, -29.9, 40))
+    bronze['citizen_id'] = np.tile(np.arange(20, dtype='int64'), 2)[rng.permutation(40)]
+    bronze.to_parquet(silver_env['bronze'] / CITIZENS_FILE)
+
+    summary = silver_processor.stream_citizens_to_silver(batch_size=7)
+
+    silver = gpd.read_parquet(silver_env['silver'] / f"silver_{CITIZENS_FILE}")
+    expected = bronze.drop_duplicates(subset=['citizen_id'])
+    assert summary['citizens'] == 20
+    assert silver['citizen_id'].tolist() == expected['citizen_id'].tolist()
+    assert silver['name'].tolist() == expected['name'].tolist()
@@ -0,0 +1,102 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+
+from conftest import make_citizens, make_flooding_areas
+from etl import gold_processor
+from etl.silver_processor import subdivide_flooding_areas
+
+ENGINES = ['strtree', 'grid', 'raster']
+
+
+def staircase(x0, y0, steps, size):
+    """Polígono em escada, só com arestas horizontais/verticais: os cortes da subdivisão são exatos"""
+    top = [(x0 + (steps - k) * size, y0 + k * size) for k in range(steps)]
+    coords = [(x0, y0)]
+    for x, y in top:
+        coords += [(x, y), (x, y + size)]
+    coords.append((x0, y0 + steps * size))
+    return shapely.Polygon(coords)
+
+
+@pytest.fixture(scope='module')
+def flooding():
+    """Áreas do conftest + uma escada de muitos vértices (subdividida em várias partes)"""
+    areas = make_flooding_areas()
+    stairs = gpd.GeoDataFrame(
+        {'area_id': [4], 'area_name': ['Ilhas'], 'flood_date': pd.to_datetime(['2024-05-03']),
+         'severity': ['medium'], 'affected_population': [1200]},
+        geometry=[staircase(-51.22, -30.08, steps=12, size=0.005)],
+        crs='EPSG:4326',
+    )
+    return pd.concat([areas, stairs], ignore_index=True)
+
+
+@pytest.fixture(scope='module')
+def citizens(flooding):
+    """Pontos aleatórios + pontos sobre as bordas das áreas, das partes (cortes) e vértices"""
+    rng = np.random.default_rng(3)
+    minx, miny, maxx, maxy = flooding.total_bounds
+    x = rng.uniform(minx - 0.02, maxx + 0.02, 3000)
+    y = rng.uniform(miny - 0.02, maxy + 0.02, 3000)
+    
+    parts = subdivide_flooding_areas(flooding, max_vertices=8)
+    boundaries = shapely.boundary(np.concatenate([flooding.geometry.values, parts.geometry.values]))
+    on_edges = shapely.line_interpolate_point(
+        np.repeat(boundaries, 20), np.tile(np.linspace(0, 1, 20, endpoint=False), len(boundaries)),
+        normalized=True,
+    )
+    vertices = shapely.points(shapely.get_coordinates(flooding.geometry.values))
+    edge_points = np.concatenate([on_edges, vertices])
+    return make_citizens(
+        np.concatenate([x, shapely.get_x(edge_points)]),
+        np.concatenate([y, shapely.get_y(edge_points)]),
+    )
+
+
+def sjoin_pairs(flooding, citizens):
+    joined = gpd.sjoin(citizens.reset_index(drop=True), flooding[['geometry']], predicate='within')
+    return set(zip(joined.index.tolist(), joined['index_right'].tolist()))
+
+
+@pytest.mark.parametrize('use_parts', [False, True])
+@pytest.mark.parametrize('engine', ENGINES)
+def test_engines_match_sjoin(flooding, citizens, engine, use_parts):
+    if engine == 'raster':
+        pytest.importorskip('rasterio')
+    parts = subdivide_flooding_areas(flooding, max_vertices=8) if use_parts else None
+    if use_parts:
+        assert len(parts) > len(flooding)
+
+    matcher = gold_processor.build_point_matcher(flooding, engine, parts)
+    point_idx, area_idx = matcher(citizens.geometry.values)
+
+    on_boundary = shapely.touches(np.asarray(citizens.geometry.values)[:, None], np.asarray(flooding.geometry.values))
+    assert on_boundary.any()
+    pairs = list(zip(point_idx.tolist(), area_idx.tolist()))
+    assert len(pairs) == len(set(pairs))
+    assert set(pairs) == sjoin_pairs(flooding, citizens)
+
+
+def test_overlapping_areas_keep_max_severity(flooding, citizens):
+    point_idx, area_idx = gold_processor.build_point_matcher(flooding, 'strtree')(citizens.geometry.values)
+    classified = gold_processor.classify_citizens(citizens, flooding, point_idx, area_idx)
+
+    # Sobreposição das áreas 1 (high) e 2 (very_high)
+    both = shapely.contains_xy(shapely.box(-51.25, -30.05, -51.20, -30.00), *shapely.get_coordinates(citizens.geometry.values).T)
+    assert both.any()
+    assert set(classified.loc[both, 'max_severity']) == {'very_high'}
+    assert (classified.loc[both, 'affected_area_ids'].map(len) >= 2).all()
+
+
+@pytest.mark.parametrize('engine', ['strtree', 'grid'])
+def test_pool_join_matches_single_process(flooding, citizens, engine):
+    parts = subdivide_flooding_areas(flooding, max_vertices=8)
+    results = []
+    for workers in (1, 2):
+        with gold_processor.spatial_join_engine(flooding, workers, engine=engine, parts_gdf=parts) as join:
+            point_idx, area_idx = join(citizens)
+        results.append(set(zip(point_idx.tolist(), area_idx.tolist())))
+    assert results[0] == results[1] == sjoin_pairs(flooding, citizens)